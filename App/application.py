@@ -1,53 +1,123 @@
-import tkinter as tk
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 
 from .models.diet import Diet, DietComponent
 from .models.fatty_acid import AcidPrediction, PredictionResult
 from .utils.config import AppConfig
-from .services.predictor import AcidPredictor
-from .services.recommender import DietRecommender
-from .services.excel_parser import ExcelParser
+from .utils.profiling import memory_profiler
+from . import core
+from .services.diet_store import DietStore
+from .services.deduplicator import DietDeduplicator, DietGroup, split_known_diets
+from .services.excel_parser import ProgressCallback
 
 class CowDietApp:
     
-    def __init__(self):
-        self.diets: List[Diet] = []
+    def __init__(self, store_path: str = AppConfig.DIET_STORE_PATH):
+        self.store = DietStore(store_path)
         self.current_diet: Optional[Diet] = None
-        self.predictor = AcidPredictor()
-        self.recommender = DietRecommender()
         self.current_prediction: Optional[PredictionResult] = None
+        self._models_future: Optional[Future] = None
+        self._models_executor: Optional[ThreadPoolExecutor] = None
+    
+    def start_loading_models(self) -> Future:
+        """Запускает загрузку моделей в фоне (один раз); результат - (предиктор, рекомендатель).
+
+        Импорт numpy/scipy/sklearn и распаковка моделей не задерживают
+        появление окна; первое обращение к predictor ждет окончания загрузки.
+        """
+        if self._models_future is None:
+            self._models_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='model-load')
+            self._models_future = self._models_executor.submit(self._load_models)
+            self._models_executor.shutdown(wait=False)
+        return self._models_future
+    
+    @staticmethod
+    def _load_models():
+        return core.get_predictor(), core.get_recommender()
+    
+    @property
+    def models_ready(self) -> bool:
+        """Модели загружены и прогноз не будет ждать"""
+        return self._models_future is not None and self._models_future.done()
+    
+    @property
+    def predictor(self):
+        return self.start_loading_models().result()[0]
+    
+    @property
+    def recommender(self):
+        return self.start_loading_models().result()[1]
+    
+    @property
+    def diet_count(self) -> int:
+        """Число рационов в хранилище"""
+        return self.store.count()
+    
+    def list_diets(self, source: Optional[str] = None, limit: Optional[int] = None,
+                   offset: int = 0) -> List[Diet]:
+        """Рационы из хранилища (все или страница limit/offset); читает и разбирает составы"""
+        return self.store.list_diets(source, limit, offset)
         
-    def load_all_diets_from_csv(self, file_path: str) -> List[Diet]:
-        """Загружает все рационы из CSV файла"""
+    def load_all_diets_from_csv(self, file_path: str,
+                                progress: Optional[ProgressCallback] = None) -> List[Diet]:
+        """Загружает все рационы из CSV файла; повторы схлопываются, новые сохраняются в хранилище"""
+        return [group.diet for group in self.load_diet_groups(file_path, progress)]
+    
+    def load_diet_groups(self, file_path: str,
+                         progress: Optional[ProgressCallback] = None) -> List[DietGroup]:
+        """Как load_all_diets_from_csv, но с исходными строками каждого уникального рациона"""
         try:
-            parser = ExcelParser()
-            all_diets = parser.parse_all_diets(file_path)
+            with memory_profiler.stage('parse'):
+                all_diets = core.load_diets(file_path, progress)
             
             if all_diets:
-                self.diets = all_diets
-                if all_diets:
-                    self.set_current_diet(all_diets[0])
-                return all_diets
+                groups = self._store_unique_diets(all_diets, file_path)
+                self.current_diet = groups[0].diet
+                return groups
             return []
             
         except Exception as e:
             print(f"Ошибка загрузки всех рационов: {e}")
             return []
     
+    def _store_unique_diets(self, diets: List[Diet], source: str) -> List[DietGroup]:
+        """Сохраняет только новые по составу рационы; повторы связываются с уже известными.
+
+        Возвращает группы повторов; в group.diet - рацион из хранилища, если
+        такой состав уже был известен.
+        """
+        deduplicator = DietDeduplicator()
+        deduplicator.add_all(diets, source)
+        deduplicator.print_statistics()
+        
+        new_diets, sources, known = split_known_diets(deduplicator, self.store)
+        
+        with memory_profiler.stage('featurize', items=len(new_diets)):
+            features = self.predictor.featurize(new_diets)
+        with memory_profiler.stage('store', items=len(new_diets)):
+            self.store.save_diets(new_diets, features=features, source=source)
+            self.store.add_sources(sources)
+        
+        groups = list(deduplicator.groups.values())
+        for group in groups:
+            if group.fingerprint in known:
+                group.diet = self.store.get_diet(known[group.fingerprint])
+        return groups
+    
     def get_diet_by_id(self, diet_id: str) -> Optional[Diet]:
         """Находит рацион по ID"""
-        for diet in self.diets:
-            if diet.diet_id == diet_id:
-                return diet
-        return None
+        if self.current_diet and self.current_diet.diet_id == diet_id:
+            return self.current_diet
+        return self.store.get_diet(diet_id)
     
     def get_diet_ids(self) -> List[str]:
         """Возвращает список всех ID рационов"""
-        return [diet.diet_id for diet in self.diets]
+        return self.store.diet_ids()
     
     def get_diet_display_names(self) -> List[str]:
         """Возвращает список имен для отображения в выпадающем списке"""
-        return [f"{diet.diet_id} - {diet.name}" for diet in self.diets]
+        return [f"{diet_id} - {name}" for diet_id, name in self.store.diet_names()]
     
     def set_current_diet_by_id(self, diet_id: str) -> bool:
         """Устанавливает текущий рацион по ID"""
@@ -57,13 +127,13 @@ class CowDietApp:
             return True
         return False
     
-    def load_diet_from_file(self, file_path: str) -> Optional[Diet]:
+    def load_diet_from_file(self, file_path: str,
+                            progress: Optional[ProgressCallback] = None) -> Optional[Diet]:
         """
         Загружает данные рациона из Excel
         """
         try:
-            csv_parser = ExcelParser()
-            diet = csv_parser.parse_diet_from_csv(file_path)
+            diet = core.load_diet(file_path, progress)
             
             if diet:
                 diet.name = f"Рацион из {os.path.basename(file_path)}"
@@ -76,21 +146,13 @@ class CowDietApp:
     
     def create_new_diet(self) -> Diet:
         """Создает новый пустой рацион"""
-        diet = Diet()
-        diet.diet_id = f"new_{len(self.diets) + 1}"
-        diet.name = "Новый рацион"
+        diet = Diet(diet_id=f"new_{self.diet_count + 1}", name="Новый рацион", components={})
         self.set_current_diet(diet)
         return diet
     
     def set_current_diet(self, diet: Diet):
-        """Устанавливает текущий рацион"""
-        existing_diet = self.get_diet_by_id(diet.diet_id)
-        if not existing_diet:
-            self.diets.append(diet)
-        else:
-            index = self.diets.index(existing_diet)
-            self.diets[index] = diet
-            
+        """Устанавливает текущий рацион; ID назначает хранилище (чужой рацион с тем же ID не перезаписывается)"""
+        self.store.save_diet(diet)
         self.current_diet = diet
     
     def predict_acids(self, diet: Optional[Diet] = None) -> PredictionResult:
@@ -99,7 +161,14 @@ class CowDietApp:
         if not target_diet:
             raise ValueError("Не задан рацион для прогнозирования")
         
-        prediction = self.predictor.predict(target_diet)
+        # Новая текущая версия моделей из реестра подгружается в фоне, без перезапуска
+        self.predictor.check_for_update()
+        with memory_profiler.stage('predict', items=1):
+            prediction = self.predictor.predict(target_diet)
+        # Прогноз ссылается на запись именно этого состава: известный состав
+        # находится по отпечатку, измененный в редакторе сохраняется новой записью
+        self.store.save_diet(target_diet)
+        self.store.save_predictions([target_diet.diet_id], [prediction], self.predictor.model_version)
         self.current_prediction = prediction
         return prediction
     
@@ -112,12 +181,14 @@ class CowDietApp:
         if not target_diet or not target_prediction:
             return ["Загрузите рацион и выполните прогнозирование для получения рекомендаций"]
         
-        return self.recommender.generate_recommendations(target_diet, target_prediction)
+        with memory_profiler.stage('recommend', items=1):
+            return self.recommender.generate_recommendations(target_diet, target_prediction)
     
     def update_diet_component(self, diet: Diet, component_name: str, new_value: float):
-        """Обновляет компонент рациона"""
+        """Обновляет компонент рациона; новый состав сохраняется отдельной записью со своим ID"""
         if component_name in diet.components:
             diet.components[component_name].amount = new_value
+            self.store.save_diet(diet)
     
     def get_acid_targets(self, acid_name: str) -> Dict[str, float]:
         """Возвращает целевые значения для кислоты"""
@@ -0,0 +1,428 @@
+# benchmark.py
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .models.diet import Diet, DietComponent
+from .utils.profiling import MemoryProfiler
+
+DEFAULT_SIZES = (100, 10_000, 1_000_000)
+
+# Рационов в одном сгенерированном файле: большие объемы обрабатываются
+# порциями, чтобы в памяти не было миллиона объектов Diet сразу
+CHUNK_ROWS = 10_000
+# Сколько различных порций генерируется для пакетных этапов (дальше по кругу)
+DISTINCT_CHUNKS = 3
+# Ограничения для медленных по природе путей (одиночные вызовы, Excel, PDF, Tk)
+MAX_SINGLE_CALLS = 1000
+MAX_RECOMMENDATION_CALLS = 200
+MAX_RENDER_CALLS = 100
+MAX_EXCEL_ROWS = 10_000
+MAX_PDF_FILES = 20
+STARTUP_RUNS = 3
+
+# Запуск приложения в чистом интерпретаторе: время импорта, первой отрисовки
+# окна (если есть дисплей) и первого прогноза (ждет фоновой загрузки моделей)
+_STARTUP_PROBE = '''
+import json, time
+start = time.perf_counter()
+from {package}.application import CowDietApp
+marks = {{'import_s': time.perf_counter() - start}}
+try:
+    import tkinter as tk
+    root = tk.Tk()
+except Exception:
+    root = None
+app = CowDietApp(':memory:')
+if root is not None:
+    from {package}.ui.main_window import MainWindow
+    MainWindow(root, app)
+    root.update()
+    marks['first_paint_s'] = time.perf_counter() - start
+from {package}.models.diet import Diet, DietComponent
+from {package}.utils.config import AppConfig
+name = AppConfig.STANDARD_COMPONENTS[0]
+app.set_current_diet(Diet('startup', 'startup', {{name: DietComponent(name, 5.0)}}))
+app.predict_acids()
+marks['first_prediction_s'] = time.perf_counter() - start
+if root is not None:
+    root.destroy()
+print('STARTUP ' + json.dumps(marks))
+'''
+
+
+def _percentiles(latencies: Sequence[float]) -> Dict[str, float]:
+    values = np.asarray(latencies, dtype=float) * 1000
+    if not len(values):
+        return {}
+    return {
+        'p50': float(np.percentile(values, 50)),
+        'p90': float(np.percentile(values, 90)),
+        'p99': float(np.percentile(values, 99)),
+        'max': float(values.max()),
+    }
+
+
+@contextlib.contextmanager
+def _quiet():
+    """Подавляет подробный вывод сервисов на время замера"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def write_nds_pdf(file_path: str, diet: Diet):
+    """Пишет PDF в текстовом формате NDS (блоки по 7 строк после "Ингредиенты")"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    lines = ['Ингредиенты']
+    for name, component in diet.components.items():
+        amount = f"{component.amount:.2f}".replace('.', ',')
+        lines += [name, '35,0', amount, '1,0', '2,0', '3,0', '4,0']
+
+    with matplotlib.rc_context({'pdf.fonttype': 42}):
+        fig = plt.figure(figsize=(8.27, 11.69))
+        step = 1 / (len(lines) + 2)
+        for i, line in enumerate(lines):
+            fig.text(0.05, 1 - step * (i + 1), line, fontsize=6)
+        with PdfPages(file_path) as pdf:
+            pdf.savefig(fig)
+        plt.close(fig)
+
+
+class BenchmarkSuite:
+    """Сквозной замер производительности на сгенерированных данных (без сети).
+
+    Для каждого размера (количества рационов) и этапа сохраняются пропускная
+    способность, перцентили задержки и пиковая и удержанная память с главными
+    местами выделений (MemoryProfiler, отдельным проходом, чтобы трассировка
+    не искажала время). Пакетные этапы идут по
+    порциям CHUNK_ROWS - задержка считается на порцию; одиночные вызовы
+    (predict, рекомендации, отрисовка) замеряются на выборке рационов.
+    """
+
+    def __init__(self, sizes: Sequence[int] = DEFAULT_SIZES, seed: int = 42,
+                 source_csv: str = 'rations.csv', measure_memory: bool = True,
+                 work_dir: Optional[str] = None):
+        from .services.predictor import AcidPredictor
+        from .services.recommender import DietRecommender
+        from .services.excel_parser import ExcelParser
+        from .services.synthetic import SyntheticRationGenerator
+
+        self.sizes = list(sizes)
+        self.seed = seed
+        self.measure_memory = measure_memory
+        self.work_dir = work_dir
+
+        with _quiet():
+            self.predictor = AcidPredictor()
+            self.recommender = DietRecommender(self.predictor)
+            self.parser = ExcelParser()
+            self.generator = SyntheticRationGenerator.from_csv(source_csv, predictor=self.predictor, seed=seed)
+        self.results: List[Dict] = []
+
+    # --- Подготовка данных ---
+
+    def _write_chunks(self, n_rows: int, directory: str) -> List[str]:
+        """Генерирует рационы и пишет их CSV-файлами по CHUNK_ROWS строк"""
+        paths = []
+        names = self.generator.component_names
+        for ids, amounts, _ in self.generator.iter_chunks(n_rows, CHUNK_ROWS):
+            path = os.path.join(directory, f'rations_{ids[0]:08d}.csv')
+            with open(path, 'w', encoding='utf-8-sig', newline='') as file:
+                file.write(','.join(['ration_id'] + names) + '\n')
+                np.savetxt(file, np.hstack([ids[:, None], amounts]), delimiter=',',
+                           fmt=['%d'] + ['%.2f'] * len(names))
+            paths.append(path)
+        return paths
+
+    def _diets_from_amounts(self, ids: np.ndarray, amounts: np.ndarray) -> List[Diet]:
+        names = self.generator.component_names
+        diets = []
+        for ration_id, row in zip(ids, amounts):
+            components = {names[j]: DietComponent(names[j], float(row[j])) for j in np.flatnonzero(row)}
+            diets.append(Diet(diet_id=f'diet_{ration_id}', name=f'Рацион {ration_id}', components=components))
+        return diets
+
+    # --- Замеры ---
+
+    def _measure(self, stage: str, size: int, calls: List[Callable[[], int]]):
+        """Выполняет вызовы (каждый возвращает число обработанных рационов) и сохраняет метрики"""
+        latencies = []
+        items = 0
+        with _quiet():
+            started = time.perf_counter()
+            for call in calls:
+                call_started = time.perf_counter()
+                items += call()
+                latencies.append(time.perf_counter() - call_started)
+            elapsed = time.perf_counter() - started
+
+        memory = None
+        if self.measure_memory and calls:
+            # Память по первому вызову: вызовы этапа однотипны
+            profiler = MemoryProfiler(enabled=True, top_n=5)
+            # Трассировку, запущенную снаружи (COWDIET_MEMORY_PROFILE, python -X tracemalloc), не трогаем
+            started_here = not tracemalloc.is_tracing()
+            try:
+                with _quiet(), profiler.stage(stage):
+                    calls[0]()
+                memory = profiler.last()
+            finally:
+                if started_here:
+                    tracemalloc.stop()
+
+        result = {
+            'stage': stage,
+            'size': size,
+            'calls': len(calls),
+            'items': items,
+            'seconds': elapsed,
+            'throughput_per_s': items / elapsed if elapsed > 0 else None,
+            'latency_ms': _percentiles(latencies),
+            'peak_memory_mb': memory.peak_bytes / 2 ** 20 if memory else None,
+            'retained_memory_mb': memory.retained_bytes / 2 ** 20 if memory else None,
+            'top_allocations': [asdict(site) for site in memory.top_sites] if memory else [],
+        }
+        self.results.append(result)
+        throughput = f"{result['throughput_per_s']:,.0f}/с" if result['throughput_per_s'] else '-'
+        print(f"   {stage:<22} {items:>9} рационов  {elapsed:8.3f} с  {throughput:>14}  "
+              f"p50={result['latency_ms'].get('p50', 0):.2f} мс")
+        return result
+
+    def _skip(self, stage: str, size: int, reason: str):
+        self.results.append({'stage': stage, 'size': size, 'skipped': reason})
+        print(f"   {stage:<22} пропущено: {reason}")
+
+    def run_size(self, size: int):
+        """Все этапы для одного размера"""
+        print(f"\n📏 Рационов: {size}")
+        with tempfile.TemporaryDirectory(dir=self.work_dir) as directory:
+            chunk_paths = self._write_chunks(size, directory)
+
+            self._measure('parse_csv', size, [
+                (lambda path=path: len(self.parser.parse_all_diets(path))) for path in chunk_paths
+            ])
+            self._bench_excel(size, directory)
+            self._bench_pdf(size, directory)
+
+            # Пакетные этапы: несколько различных порций используются по кругу,
+            # пока не будет обработано size рационов
+            chunks = []
+            for ids, amounts, _ in self.generator.iter_chunks(min(size, DISTINCT_CHUNKS * CHUNK_ROWS), CHUNK_ROWS):
+                chunks.append((self._diets_from_amounts(ids, amounts), amounts))
+            batch_calls = [chunks[i % len(chunks)] for i in range(-(-size // CHUNK_ROWS))]
+            names = self.generator.component_names
+            featurizer = self.generator.featurizer
+            matrices = {id(amounts): featurizer.featurize_amounts(names, amounts) for _, amounts in chunks}
+
+            self._measure('featurize', size, [
+                (lambda diets=diets: len(self.predictor.featurize(diets))) for diets, _ in batch_calls
+            ])
+            self._measure('featurize_amounts', size, [
+                (lambda amounts=amounts: len(featurizer.featurize_amounts(names, amounts)))
+                for _, amounts in batch_calls
+            ])
+            self._measure('predict_batch', size, [
+                (lambda diets=diets: len(self.predictor.predict_batch(diets))) for diets, _ in batch_calls
+            ])
+            self._measure('predict_matrix', size, [
+                (lambda m=matrices[id(amounts)]: len(self.predictor.predict_matrix(m)[1]))
+                for _, amounts in batch_calls
+            ])
+
+            sample_diets = chunks[0][0]
+
+            def predict_single(diet: Diet) -> int:
+                # Кэш прогнозов сбрасывается, чтобы мерить сам расчет
+                self.predictor._cache.clear()
+                self.predictor.predict(diet)
+                return 1
+
+            def recommend(diet: Diet, prediction) -> int:
+                self.recommender.generate_recommendations(diet, prediction)
+                return 1
+
+            self._measure('predict_single', size, [
+                (lambda d=d: predict_single(d)) for d in sample_diets[:MAX_SINGLE_CALLS]
+            ])
+
+            predictions = self.predictor.predict_batch(sample_diets[:MAX_RECOMMENDATION_CALLS])
+            self._measure('recommendations', size, [
+                (lambda d=d, p=p: recommend(d, p))
+                for d, p in zip(sample_diets[:MAX_RECOMMENDATION_CALLS], predictions)
+            ])
+            self._bench_render(size, sample_diets[:MAX_RENDER_CALLS], predictions)
+
+    def _bench_excel(self, size: int, directory: str):
+        try:
+            import openpyxl
+        except ImportError:
+            self._skip('parse_excel', size, "openpyxl не установлен")
+            return
+        rows = min(size, MAX_EXCEL_ROWS)
+        ids, amounts, _ = next(self.generator.iter_chunks(rows, rows))
+        path = os.path.join(directory, 'rations.xlsx')
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(['ration_id'] + self.generator.component_names)
+        for ration_id, row in zip(ids, amounts):
+            sheet.append([int(ration_id)] + row.tolist())
+        workbook.save(path)
+        self._measure('parse_excel', size, [lambda: len(self.parser.parse_all_diets(path))])
+
+    def _bench_pdf(self, size: int, directory: str):
+        try:
+            import pdfplumber  # noqa: F401
+        except ImportError:
+            self._skip('parse_pdf', size, "pdfplumber не установлен")
+            return
+        count = min(size, MAX_PDF_FILES)
+        ids, amounts, _ = next(self.generator.iter_chunks(count, count))
+        paths = []
+        for diet in self._diets_from_amounts(ids, amounts):
+            path = os.path.join(directory, f'{diet.diet_id}.pdf')
+            write_nds_pdf(path, diet)
+            paths.append(path)
+        self._measure('parse_pdf', size, [
+            (lambda path=path: len(self.parser.parse_all_diets(path))) for path in paths
+        ])
+
+    def _bench_render(self, size: int, diets: List[Diet], predictions):
+        try:
+            import tkinter as tk
+            root = tk.Tk()
+            root.withdraw()
+        except Exception as e:
+            self._skip('render_editor', size, f"нет дисплея ({e.__class__.__name__})")
+            self._skip('render_predictions', size, "нет дисплея")
+            return
+
+        from .ui.widgets.diet_editor import DietEditor
+        from .ui.widgets.acid_predictions import AcidPredictionDisplay
+
+        class _View:
+            def update_diet_component(self, component_name, new_value):
+                pass
+
+        try:
+            editor = DietEditor(root, _View())
+            display = AcidPredictionDisplay(root, None)
+
+            def render_editor(diet):
+                editor.load_diet(diet)
+                root.update_idletasks()
+                return 1
+
+            def render_predictions(prediction):
+                display.show_prediction(prediction)
+                root.update_idletasks()
+                return 1
+
+            self._measure('render_editor', size, [(lambda d=d: render_editor(d)) for d in diets])
+            self._measure('render_predictions', size, [
+                (lambda p=p: render_predictions(p)) for p in predictions[:len(diets)]
+            ])
+        finally:
+            root.destroy()
+
+    def run(self) -> Dict:
+        """Прогон всех размеров; возвращает отчет"""
+        for size in self.sizes:
+            self.run_size(size)
+        return self.report()
+
+    def report(self) -> Dict:
+        return {
+            'meta': {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'model_version': self.predictor.model_version,
+                'seed': self.seed,
+                'sizes': self.sizes,
+                'chunk_rows': CHUNK_ROWS,
+            },
+            'results': self.results,
+        }
+
+
+def measure_startup(runs: int = STARTUP_RUNS) -> Dict:
+    """Медианы времени запуска по нескольким свежим процессам (секунды)"""
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    probe = _STARTUP_PROBE.format(package=__package__)
+    env = dict(os.environ, PYTHONWARNINGS='ignore')
+
+    marks: Dict[str, List[float]] = {}
+    for _ in range(runs):
+        completed = subprocess.run([sys.executable, '-c', probe], cwd=os.path.dirname(package_dir),
+                                   capture_output=True, text=True, env=env)
+        lines = [line for line in completed.stdout.splitlines() if line.startswith('STARTUP ')]
+        if completed.returncode != 0 or not lines:
+            raise RuntimeError(f"Замер запуска не удался: {completed.stderr.strip()[-500:]}")
+        for key, value in json.loads(lines[-1][len('STARTUP '):]).items():
+            marks.setdefault(key, []).append(value)
+
+    startup = {key: float(np.median(values)) for key, values in marks.items()}
+    startup['runs'] = runs
+    print("\n🚀 ЗАПУСК (медиана):")
+    for key in ('import_s', 'first_paint_s', 'first_prediction_s'):
+        value = startup.get(key)
+        print(f"   {key:<20} {value:.3f} с" if value is not None else f"   {key:<20} нет дисплея")
+    return startup
+
+
+def save_report(report: Dict, file_path: str):
+    """Сохраняет отчет в JSON"""
+    os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+    with open(file_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=4)
+    print(f"💾 Отчет сохранен: {file_path}")
+
+
+def compare_reports(baseline: Dict, current: Dict, tolerance: float = 0.2) -> List[Dict]:
+    """Сравнивает пропускную способность этапов; регрессия - падение больше tolerance"""
+    def index(report):
+        return {
+            (r['stage'], r['size']): r for r in report.get('results', [])
+            if r.get('throughput_per_s')
+        }
+
+    base, new = index(baseline), index(current)
+    rows = []
+    for key in sorted(base.keys() & new.keys()):
+        ratio = new[key]['throughput_per_s'] / base[key]['throughput_per_s']
+        rows.append({
+            'stage': key[0],
+            'size': key[1],
+            'ratio': ratio,
+            'regression': ratio < 1 - tolerance,
+        })
+
+    # Время запуска: рост времени - та же регрессия, что и падение пропускной способности
+    base_startup, new_startup = baseline.get('startup') or {}, current.get('startup') or {}
+    for key in ('import_s', 'first_paint_s', 'first_prediction_s'):
+        if base_startup.get(key) and new_startup.get(key):
+            ratio = base_startup[key] / new_startup[key]
+            rows.append({
+                'stage': f'startup.{key}',
+                'size': 1,
+                'ratio': ratio,
+                'regression': ratio < 1 - tolerance,
+            })
+    return rows
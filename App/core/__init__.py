@@ -0,0 +1,19 @@
+# core - ядро без интерфейса: загрузка, признаки, прогноз, рекомендации, оптимизация.
+# Не импортирует tkinter и matplotlib, поэтому подходит для пакетных процессов и сервисов.
+from .pipeline import (
+    ScoredFile,
+    analyze_feasibility,
+    explain,
+    export_reports,
+    featurize,
+    get_predictor,
+    get_recommender,
+    load_diet,
+    load_diets,
+    optimize,
+    predict,
+    predict_uncertainty,
+    recommend,
+    score_file,
+    score_files,
+)
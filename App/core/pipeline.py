@@ -0,0 +1,157 @@
+# core/pipeline.py
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from ..models.diet import Diet
+from ..models.fatty_acid import PredictionResult
+from ..services.excel_parser import ExcelParser, ProgressCallback
+
+_lock = threading.Lock()
+_predictor = None
+_recommender = None
+
+
+def get_predictor():
+    """Общий для процесса предиктор; модели загружаются при первом обращении"""
+    global _predictor
+    if _predictor is None:
+        with _lock:
+            if _predictor is None:
+                from ..services.predictor import AcidPredictor
+                _predictor = AcidPredictor()
+    return _predictor
+
+
+def get_recommender():
+    """Общий для процесса рекомендатель поверх get_predictor()"""
+    global _recommender
+    if _recommender is None:
+        predictor = get_predictor()
+        with _lock:
+            if _recommender is None:
+                from ..services.recommender import DietRecommender
+                _recommender = DietRecommender(predictor)
+    return _recommender
+
+
+def load_diets(file_path: str, progress: Optional[ProgressCallback] = None) -> List[Diet]:
+    """Все рационы из CSV/Excel/PDF"""
+    return ExcelParser().parse_all_diets(file_path, progress)
+
+
+def load_diet(file_path: str, progress: Optional[ProgressCallback] = None) -> Optional[Diet]:
+    """Один рацион из CSV/Excel/PDF"""
+    return ExcelParser().parse_diet(file_path, progress)
+
+
+def featurize(diets: Sequence[Diet]) -> np.ndarray:
+    """Матрица признаков (рационы x признаки)"""
+    return get_predictor().featurize(list(diets))
+
+
+def predict(diets: Sequence[Diet], features: Optional[np.ndarray] = None) -> List[PredictionResult]:
+    """Пакетный прогноз кислот"""
+    return get_predictor().predict_batch(list(diets), features)
+
+
+def explain(diets: Sequence[Diet], features: Optional[np.ndarray] = None):
+    """Вклады признаков в прогнозы (PredictionExplanation: рационы x кислоты x признаки)"""
+    return get_predictor().explain_batch(list(diets), features)
+
+
+def predict_uncertainty(diets: Sequence[Diet], samples: Optional[int] = None):
+    """Интервалы прогноза и вероятность нормы по кислотам (PredictionUncertainty: рационы x кислоты)"""
+    from ..services.uncertainty import MC_SAMPLES, UncertaintyEstimator
+    estimator = UncertaintyEstimator(get_predictor(), samples or MC_SAMPLES)
+    return estimator.estimate_batch(list(diets))
+
+
+def analyze_feasibility(diets: Sequence[Diet], bounds: Optional[Sequence[Optional[Dict]]] = None,
+                        max_change: Optional[float] = None):
+    """Достижимые диапазоны кислот при границах компонентов (FeasibilityResult: рационы x кислоты).
+
+    bounds - по рациону {компонент: (мин, макс)}; по умолчанию ±max_change от текущих количеств.
+    """
+    from ..services.feasibility import FeasibilityAnalyzer
+    from ..services.optimizer import MAX_CHANGE
+    analyzer = FeasibilityAnalyzer(get_predictor(), MAX_CHANGE if max_change is None else max_change)
+    return analyzer.analyze_batch(list(diets), bounds)
+
+
+def recommend(diet: Diet, prediction: Optional[PredictionResult] = None) -> List[str]:
+    """Текстовые рекомендации по рациону (прогноз считается, если не передан)"""
+    prediction = prediction or get_predictor().predict(diet)
+    return get_recommender().generate_recommendations(diet, prediction)
+
+
+def optimize(diet: Diet, max_change: Optional[float] = None):
+    """Подбор количеств компонентов под целевые диапазоны кислот (OptimizationResult)"""
+    from ..services.optimizer import MAX_CHANGE, DietOptimizer
+    optimizer = DietOptimizer(get_predictor(), MAX_CHANGE if max_change is None else max_change)
+    return optimizer.optimize(diet)
+
+
+def export_reports(diets: Iterable[Diet], output_dir: str, formats: Optional[Sequence[str]] = None,
+                   workers: Optional[int] = None, recommendations: bool = True,
+                   progress: Optional[ProgressCallback] = None,
+                   deduplicate: bool = True) -> Dict[str, List[str]]:
+    """Отчеты по рационам и стаду (CSV/Excel/PDF) в output_dir; diets может быть генератором.
+
+    Повторы по составу выгружаются один раз (deduplicate=False - все строки).
+    """
+    from ..services.report_exporter import EXPORT_FORMATS, ReportExporter
+    exporter = ReportExporter(get_predictor(), get_recommender() if recommendations else None,
+                              workers=workers, deduplicate=deduplicate)
+    return exporter.export(diets, output_dir, formats or EXPORT_FORMATS, progress=progress)
+
+
+@dataclass
+class ScoredFile:
+    """Прогноз по файлу в компактном виде для передачи между процессами"""
+    file_path: str
+    diet_ids: List[str]
+    acids: List[str]
+    values: np.ndarray
+    model_version: str
+
+
+def score_file(file_path: str) -> ScoredFile:
+    """Парсит файл и оценивает все его рационы одним снимком моделей"""
+    predictor = get_predictor()
+    snapshot = predictor.snapshot
+    diets = load_diets(file_path)
+    features = predictor.featurize(diets)
+    acids, values = predictor.predict_matrix(features, snapshot)
+    return ScoredFile(file_path, [diet.diet_id for diet in diets], list(acids), values, snapshot.version)
+
+
+def _init_worker(verbose: bool):
+    """Загрузка моделей один раз на процесс, до первой задачи"""
+    if not verbose:
+        sys.stdout = open(os.devnull, 'w')
+    get_predictor()
+
+
+def score_files(file_paths: Sequence[str], workers: Optional[int] = None,
+                verbose: bool = False) -> List[ScoredFile]:
+    """Параллельная оценка файлов в отдельных процессах (порядок результатов сохраняется).
+
+    Процессы запускаются методом spawn и импортируют только ядро - без
+    tkinter и matplotlib, поэтому стартуют быстро и занимают мало памяти.
+    """
+    file_paths = list(file_paths)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(file_paths) <= 1:
+        return [score_file(path) for path in file_paths]
+
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=min(workers, len(file_paths)), mp_context=context,
+                             initializer=_init_worker, initargs=(verbose,)) as executor:
+        return list(executor.map(score_file, file_paths))
@@ -1,3 +1,4 @@
+import hashlib
 from dataclasses import dataclass
 from typing import Dict, List, Optional
 
@@ -28,4 +29,14 @@ class Diet:
     def update_component(self, component_name: str, amount: float):
         """Обновление компонента"""
         if component_name in self.components:
-            self.components[component_name].amount = amount
\ No newline at end of file
+            self.components[component_name].amount = amount
+    
+    def fingerprint(self, decimals: int = 3) -> str:
+        """Канонический отпечаток состава: нормализованные названия и округленные количества"""
+        items = sorted(
+            (' '.join(name.split()).lower(), round(component.amount, decimals))
+            for name, component in self.components.items()
+            if round(component.amount, decimals) != 0
+        )
+        payload = ';'.join(f"{name}={amount:.{decimals}f}" for name, amount in items)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
\ No newline at end of file
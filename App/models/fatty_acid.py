@@ -1,5 +1,5 @@
 # models/fatty_acid.py
-from typing import Dict
+from typing import Dict, Optional
 from dataclasses import dataclass
 
 @dataclass
@@ -10,6 +10,10 @@ class AcidPrediction:
     target_min: float
     target_max: float
     deviation: float
+    # Интервал прогноза и вероятность попасть в норму (режим неопределенности, см. services/uncertainty.py)
+    interval_low: Optional[float] = None
+    interval_high: Optional[float] = None
+    probability_in_range: Optional[float] = None
     
     @property
     def is_within_target(self) -> bool:
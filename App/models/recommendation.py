@@ -10,6 +10,7 @@ class RecommendationType(Enum):
 
 class PriorityLevel(Enum):
     CRITICAL = "critical"    
+    HIGH = "high"
     WARNING = "warning"     
     INFO = "info"            
 
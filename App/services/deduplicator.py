@@ -0,0 +1,107 @@
+# services/deduplicator.py
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from ..models.diet import Diet
+
+
+@dataclass
+class DietSource:
+    """Место, где встретился рацион: файл и исходный ID строки"""
+    source: str
+    source_diet_id: str
+
+
+@dataclass
+class DietGroup:
+    """Группа одинаковых по составу рационов"""
+    fingerprint: str
+    diet: Diet
+    sources: List[DietSource] = field(default_factory=list)
+
+    def source_label(self, limit: int = 5) -> str:
+        """Источники для отображения: "файл: ID, ID (+N)" по каждому файлу"""
+        by_source: Dict[str, List[str]] = {}
+        for item in self.sources:
+            by_source.setdefault(os.path.basename(item.source), []).append(str(item.source_diet_id))
+        parts = []
+        for source, ids in by_source.items():
+            shown = ', '.join(ids[:limit]) + (f" (+{len(ids) - limit})" if len(ids) > limit else '')
+            parts.append(f"{source}: {shown}" if source else shown)
+        return '; '.join(parts)
+
+
+class DietDeduplicator:
+    """Схлопывает одинаковые по составу рационы из разных файлов и строк"""
+
+    def __init__(self):
+        self.groups: Dict[str, DietGroup] = {}
+        self.total_seen = 0
+
+    def add(self, diet: Diet, source: str) -> bool:
+        """Добавляет рацион; True, если такой состав встретился впервые"""
+        self.total_seen += 1
+        fingerprint = diet.fingerprint()
+        group = self.groups.get(fingerprint)
+        is_new = group is None
+        if is_new:
+            group = DietGroup(fingerprint=fingerprint, diet=diet)
+            self.groups[fingerprint] = group
+        group.sources.append(DietSource(source, diet.diet_id))
+        return is_new
+
+    def add_all(self, diets: Iterable[Diet], source: str) -> List[Diet]:
+        """Добавляет рационы файла; возвращает только новые уникальные"""
+        return [diet for diet in diets if self.add(diet, source)]
+
+    @property
+    def unique_diets(self) -> List[Diet]:
+        """По одному рациону на каждый уникальный состав"""
+        return [group.diet for group in self.groups.values()]
+
+    @property
+    def duplicates_count(self) -> int:
+        """Сколько рационов оказались повторами"""
+        return self.total_seen - len(self.groups)
+
+    def print_statistics(self):
+        """Выводит статистику дедупликации"""
+        print(f"📊 Рационов всего: {self.total_seen}, уникальных: {len(self.groups)}, "
+              f"повторов: {self.duplicates_count}")
+
+
+def iter_unique_diets(diets: Iterable[Diet], seen: Optional[Set[str]] = None) -> Iterator[Diet]:
+    """Пропускает повторы по составу на лету (для генераторов рационов).
+
+    В памяти держатся только отпечатки, а не сами рационы; seen можно
+    передать, чтобы продолжить отбор по нескольким вызовам.
+    """
+    seen = set() if seen is None else seen
+    for diet in diets:
+        fingerprint = diet.fingerprint()
+        if fingerprint not in seen:
+            seen.add(fingerprint)
+            yield diet
+
+
+def split_known_diets(deduplicator: DietDeduplicator, store) -> Tuple[List[Diet], List[tuple], Dict[str, str]]:
+    """Сверяет уникальные рационы с хранилищем.
+
+    Возвращает новые рационы (их нужно оценить и сохранить), связи
+    (ID рациона, файл, исходный ID) для всех источников и найденные
+    в хранилище отпечатки -> ID. ID назначает store.assign_ids: новым
+    рационам с занятым ID добавляется суффикс из отпечатка, чтобы не
+    перезаписать чужой состав.
+    """
+    groups = list(deduplicator.groups.values())
+    new_diets = store.assign_ids([group.diet for group in groups])
+    new_ids = {id(diet) for diet in new_diets}
+    known = {group.fingerprint: group.diet.diet_id for group in groups if id(group.diet) not in new_ids}
+
+    sources = [
+        (group.diet.diet_id, item.source, item.source_diet_id)
+        for group in groups
+        for item in group.sources
+    ]
+    return new_diets, sources, known
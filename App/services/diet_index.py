@@ -0,0 +1,132 @@
+# services/diet_index.py
+import heapq
+import re
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from ..models.diet import Diet
+
+# Сколько совпадений показывать в списке выбора
+MAX_MATCHES = 50
+# Длина n-граммы для поиска подстроки; более короткие запросы ищутся по началу слов
+NGRAM = 3
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+class DietIndex:
+    """Индекс рационов для поиска по ID, названию и файлу-источнику.
+
+    Подстроки от NGRAM символов ищутся по триграммному индексу с
+    проверкой кандидатов, короткие запросы - по отсортированному списку
+    слов (бинарный поиск префикса). Позиции рационов хранятся в словарях,
+    поэтому выбор рациона по объекту или ID не требует просмотра списка.
+    """
+
+    def __init__(self, diets: Sequence[Diet] = (), source: str = ''):
+        self.reset(diets, source)
+
+    def reset(self, diets: Sequence[Diet] = (), source: str = ''):
+        """Перестраивает индекс под новый набор рационов"""
+        self.diets: List[Diet] = []
+        self.sources: List[str] = []
+        self._texts: List[str] = []
+        self._heads: List[Tuple[str, str]] = []
+        self._by_object: Dict[int, int] = {}
+        self._by_id: Dict[str, int] = {}
+        self._ngrams: Dict[str, Set[int]] = {}
+        self._words: List[Tuple[str, int]] = []
+        self._words_sorted = True
+        for diet in diets:
+            self.add(diet, source)
+        self._sort_words()
+
+    def __len__(self) -> int:
+        return len(self.diets)
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return ' '.join(str(text).split()).lower()
+
+    def add(self, diet: Diet, source: str = '') -> int:
+        """Добавляет рацион в конец индекса, возвращает его позицию"""
+        position = len(self.diets)
+        diet_id, name = self._normalize(diet.diet_id), self._normalize(diet.name)
+        text = '\n'.join((diet_id, name, self._normalize(source)))
+
+        self.diets.append(diet)
+        self.sources.append(source)
+        self._texts.append(text)
+        self._heads.append((diet_id, name))
+        self._by_object[id(diet)] = position
+        # При повторяющихся ID выбирается первый рацион
+        self._by_id.setdefault(str(diet.diet_id), position)
+
+        for gram in {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}:
+            self._ngrams.setdefault(gram, set()).add(position)
+        for word in set(_TOKEN_RE.findall(text)):
+            self._words.append((word, position))
+        self._words_sorted = False
+        return position
+
+    def position(self, diet: Diet) -> Optional[int]:
+        """Позиция рациона в индексе (по самому объекту), O(1)"""
+        position = self._by_object.get(id(diet))
+        if position is not None and self.diets[position] is diet:
+            return position
+        return None
+
+    def find(self, diet_id: str) -> Optional[Diet]:
+        """Рацион по ID, O(1)"""
+        position = self._by_id.get(str(diet_id))
+        return self.diets[position] if position is not None else None
+
+    def _sort_words(self):
+        if not self._words_sorted:
+            self._words.sort()
+            self._words_sorted = True
+
+    def _term_positions(self, term: str) -> Set[int]:
+        if len(term) >= NGRAM:
+            grams = [term[i:i + NGRAM] for i in range(len(term) - NGRAM + 1)]
+            postings = sorted((self._ngrams.get(gram, set()) for gram in grams), key=len)
+            candidates = set(postings[0]).intersection(*postings[1:])
+            if len(grams) > 1:
+                candidates = {position for position in candidates if term in self._texts[position]}
+            return candidates
+
+        self._sort_words()
+        positions = set()
+        i = bisect_left(self._words, (term, -1))
+        while i < len(self._words) and self._words[i][0].startswith(term):
+            positions.add(self._words[i][1])
+            i += 1
+        return positions
+
+    def search(self, query: str, limit: int = MAX_MATCHES) -> Tuple[int, List[int]]:
+        """Поиск по всем словам запроса: (число совпадений, позиции лучших limit).
+
+        Выше точное совпадение ID или названия, затем совпадение с их
+        началом, затем прочие; при равенстве - порядок загрузки.
+        """
+        query = self._normalize(query)
+        if not query:
+            return len(self.diets), list(range(min(limit, len(self.diets))))
+
+        matches = None
+        for term in sorted(set(query.split()), key=len, reverse=True):
+            positions = self._term_positions(term)
+            matches = positions if matches is None else matches & positions
+            if not matches:
+                return 0, []
+
+        def rank(position: int) -> Tuple[int, int]:
+            diet_id, name = self._heads[position]
+            if query in (diet_id, name):
+                return 0, position
+            if diet_id.startswith(query) or name.startswith(query):
+                return 1, position
+            return 2, position
+
+        best = heapq.nsmallest(limit, matches, key=rank)
+        return len(matches), best
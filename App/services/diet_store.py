@@ -0,0 +1,363 @@
+# services/diet_store.py
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+import numpy as np
+
+from ..models.diet import Diet, DietComponent
+from ..models.fatty_acid import PredictionResult
+from ..utils.config import AppConfig
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS diets (
+    diet_id     TEXT PRIMARY KEY,
+    name        TEXT NOT NULL,
+    source      TEXT,
+    components  TEXT NOT NULL,
+    features    BLOB,
+    fingerprint TEXT,
+    created_at  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS predictions (
+    id             INTEGER PRIMARY KEY,
+    diet_id        TEXT NOT NULL REFERENCES diets(diet_id) ON DELETE CASCADE,
+    acid           TEXT NOT NULL,
+    value          REAL NOT NULL,
+    model_version  TEXT NOT NULL,
+    created_at     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_predictions_diet ON predictions(diet_id);
+CREATE INDEX IF NOT EXISTS idx_predictions_acid_value ON predictions(acid, value);
+CREATE INDEX IF NOT EXISTS idx_predictions_acid_time ON predictions(acid, created_at);
+CREATE INDEX IF NOT EXISTS idx_predictions_acid_diet ON predictions(acid, diet_id);
+CREATE TABLE IF NOT EXISTS diet_sources (
+    diet_id         TEXT NOT NULL REFERENCES diets(diet_id) ON DELETE CASCADE,
+    source          TEXT NOT NULL,
+    source_diet_id  TEXT NOT NULL,
+    PRIMARY KEY (diet_id, source, source_diet_id)
+);
+CREATE TABLE IF NOT EXISTS processed_files (
+    content_hash  TEXT PRIMARY KEY,
+    source_file   TEXT NOT NULL,
+    processed_at  TEXT NOT NULL
+);
+"""
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec='seconds')
+
+
+class DietStore:
+    """Встроенное индексированное хранилище рационов, признаков и прогнозов (SQLite)"""
+
+    def __init__(self, db_path: str = AppConfig.DIET_STORE_PATH):
+        self.db_path = db_path
+        if db_path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(_SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        """Добавляет колонки, появившиеся после создания базы"""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(diets)")}
+        with self._conn:
+            if 'fingerprint' not in columns:
+                self._conn.execute("ALTER TABLE diets ADD COLUMN fingerprint TEXT")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_diets_fingerprint ON diets(fingerprint)")
+
+    def close(self):
+        """Закрывает соединение с базой"""
+        with self._lock:
+            self._conn.close()
+
+    # --- Рационы ---
+
+    def save_diets(self, diets: Sequence[Diet], features: Optional[np.ndarray] = None,
+                   source: Optional[str] = None) -> List[Diet]:
+        """Сохраняет рационы одной транзакцией; возвращает записанные (новые по составу).
+
+        ID назначаются assign_ids: уже сохраненный состав не пишется повторно,
+        а чужой рацион с тем же ID не перезаписывается.
+        """
+        diets = list(diets)
+        with self._lock, self._conn:
+            return self._write_diets(diets, features, source)
+
+    def _write_diets(self, diets: List[Diet], features: Optional[np.ndarray],
+                     source: Optional[str]) -> List[Diet]:
+        new_rows = set(self._assign_ids(diets))
+        created_at = _now()
+        rows = []
+        for i, diet in enumerate(diets):
+            if i not in new_rows:
+                continue
+            vector = features[i].astype(np.float64).tobytes() if features is not None else None
+            components = {name: comp.amount for name, comp in diet.components.items()}
+            rows.append((diet.diet_id, diet.name, source, json.dumps(components, ensure_ascii=False),
+                         vector, diet.fingerprint(), created_at))
+
+        self._conn.executemany(
+            """INSERT INTO diets (diet_id, name, source, components, features, fingerprint, created_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            rows
+        )
+        return [diets[i] for i in sorted(new_rows)]
+
+    def save_diet(self, diet: Diet, source: Optional[str] = None) -> str:
+        """Сохраняет один рацион; возвращает его ID в хранилище (diet.diet_id тоже обновляется)"""
+        self.save_diets([diet], source=source)
+        return diet.diet_id
+
+    def assign_ids(self, diets: Sequence[Diet]) -> List[Diet]:
+        """Сверяет рационы с хранилищем по составу и назначает им ID; возвращает новые.
+
+        Рацион с уже сохраненным составом получает ID сохраненного, повтор
+        состава внутри пакета - ID первого. Новому рациону, чей ID занят
+        другим составом (в хранилище или в пакете), добавляется суффикс из
+        отпечатка. Сами рационы не записываются.
+        """
+        diets = list(diets)
+        with self._lock:
+            return [diets[i] for i in self._assign_ids(diets)]
+
+    def _assign_ids(self, diets: List[Diet]) -> List[int]:
+        fingerprints = [diet.fingerprint() for diet in diets]
+        known = self.find_by_fingerprints(set(fingerprints))
+        taken = self._existing_ids({str(diet.diet_id) for diet in diets})
+        in_batch: Dict[str, str] = {}
+        new_rows = []
+        for i, (diet, fingerprint) in enumerate(zip(diets, fingerprints)):
+            stored_id = known.get(fingerprint) or in_batch.get(fingerprint)
+            if stored_id is not None:
+                diet.diet_id = stored_id
+                continue
+            diet_id = str(diet.diet_id)
+            if diet_id in taken:
+                base, attempt = f"{diet_id}_{fingerprint[:8]}", 1
+                diet_id = base
+                while diet_id in taken or self._existing_ids({diet_id}):
+                    attempt += 1
+                    diet_id = f"{base}_{attempt}"
+                diet.diet_id = diet_id
+            taken.add(diet_id)
+            in_batch[fingerprint] = diet_id
+            new_rows.append(i)
+        return new_rows
+
+    def _existing_ids(self, diet_ids: Set[str]) -> Set[str]:
+        """Какие из ID уже заняты в хранилище"""
+        diet_ids = list(diet_ids)
+        existing = set()
+        for start in range(0, len(diet_ids), 500):
+            chunk = diet_ids[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            existing.update(row[0] for row in self._conn.execute(
+                f"SELECT diet_id FROM diets WHERE diet_id IN ({placeholders})", chunk))
+        return existing
+
+    def get_diet(self, diet_id: str) -> Optional[Diet]:
+        """Рацион по ID (поиск по первичному ключу)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT diet_id, name, components FROM diets WHERE diet_id = ?", (diet_id,)
+            ).fetchone()
+        return self._row_to_diet(row) if row else None
+
+    def get_features(self, diet_id: str) -> Optional[np.ndarray]:
+        """Сохраненный вектор признаков рациона"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT features FROM diets WHERE diet_id = ?", (diet_id,)
+            ).fetchone()
+        if not row or row['features'] is None:
+            return None
+        return np.frombuffer(row['features'], dtype=np.float64)
+
+    def list_diets(self, source: Optional[str] = None, limit: Optional[int] = None,
+                   offset: int = 0) -> List[Diet]:
+        """Рационы в порядке добавления; limit/offset - постраничное чтение"""
+        query = "SELECT diet_id, name, components FROM diets"
+        params: list = []
+        if source is not None:
+            query += " WHERE source = ?"
+            params.append(source)
+        query += " ORDER BY rowid"
+        if limit is not None or offset:
+            query += " LIMIT ? OFFSET ?"
+            params += [-1 if limit is None else limit, offset]
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._row_to_diet(row) for row in rows]
+
+    def diet_names(self) -> List[tuple]:
+        """Пары (ID, название) в порядке добавления, без разбора составов"""
+        with self._lock:
+            return [tuple(row) for row in self._conn.execute("SELECT diet_id, name FROM diets ORDER BY rowid")]
+
+    def diet_ids(self) -> List[str]:
+        """ID всех рационов в порядке добавления"""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT diet_id FROM diets ORDER BY rowid")]
+
+    def count(self) -> int:
+        """Количество рационов"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM diets").fetchone()[0]
+
+    def delete_diet(self, diet_id: str):
+        """Удаляет рацион вместе с прогнозами"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM diets WHERE diet_id = ?", (diet_id,))
+
+    def find_by_fingerprints(self, fingerprints: Iterable[str]) -> Dict[str, str]:
+        """Уже сохраненные рационы с таким составом: отпечаток -> ID рациона"""
+        found: Dict[str, str] = {}
+        fingerprints = list(fingerprints)
+        with self._lock:
+            # Ограничение SQLite на число параметров в запросе
+            for start in range(0, len(fingerprints), 500):
+                chunk = fingerprints[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                for row in self._conn.execute(
+                    f"SELECT fingerprint, diet_id FROM diets WHERE fingerprint IN ({placeholders}) ORDER BY rowid",
+                    chunk
+                ):
+                    found.setdefault(row['fingerprint'], row['diet_id'])
+        return found
+
+    def add_sources(self, sources: Iterable[tuple]):
+        """Сохраняет связи рацион -> (файл, исходный ID) одной транзакцией"""
+        with self._lock, self._conn:
+            self._write_sources(sources)
+
+    def _write_sources(self, sources: Iterable[tuple]):
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO diet_sources (diet_id, source, source_diet_id) VALUES (?, ?, ?)",
+            list(sources)
+        )
+
+    def get_sources(self, diet_id: str) -> List[tuple]:
+        """Все файлы и строки, в которых встретился рацион"""
+        with self._lock:
+            return [
+                (row['source'], row['source_diet_id'])
+                for row in self._conn.execute(
+                    "SELECT source, source_diet_id FROM diet_sources WHERE diet_id = ?", (diet_id,)
+                )
+            ]
+
+    @staticmethod
+    def _row_to_diet(row) -> Diet:
+        components = {
+            name: DietComponent(name, amount)
+            for name, amount in json.loads(row['components']).items()
+        }
+        return Diet(diet_id=row['diet_id'], name=row['name'], components=components)
+
+    # --- Прогнозы ---
+
+    def save_predictions(self, diet_ids: List[str], predictions: List[PredictionResult],
+                         model_version: str):
+        """Сохраняет прогнозы для рационов одной транзакцией"""
+        with self._lock, self._conn:
+            self._write_predictions(diet_ids, predictions, model_version)
+
+    def _write_predictions(self, diet_ids: List[str], predictions: List[PredictionResult],
+                           model_version: str):
+        created_at = _now()
+        rows = [
+            (diet_id, acid_name, acid.predicted_value, model_version, created_at)
+            for diet_id, prediction in zip(diet_ids, predictions)
+            for acid_name, acid in prediction.acids.items()
+        ]
+        self._conn.executemany(
+            """INSERT INTO predictions (diet_id, acid, value, model_version, created_at)
+               VALUES (?, ?, ?, ?, ?)""",
+            rows
+        )
+
+    def latest_predictions(self, diet_id: str) -> Dict[str, float]:
+        """Последний прогноз по каждой кислоте для рациона"""
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT acid, value FROM predictions
+                   WHERE id IN (SELECT MAX(id) FROM predictions WHERE diet_id = ? GROUP BY acid)""",
+                (diet_id,)
+            ).fetchall()
+        return {row['acid']: row['value'] for row in rows}
+
+    def query_predictions(self, acid: str, min_value: Optional[float] = None,
+                          max_value: Optional[float] = None, since: Optional[datetime] = None,
+                          until: Optional[datetime] = None,
+                          model_version: Optional[str] = None) -> List[Dict]:
+        """Последние прогнозы кислоты по рационам с фильтрами по значению, времени и версии модели.
+
+        На каждый рацион - одна строка: его последний прогноз кислоты (среди
+        прогнозов версии model_version, если она задана). Старые прогнозы
+        того же рациона, сделанные до правок или другими моделями, не
+        попадают в выборку.
+        """
+        latest = "SELECT MAX(id) FROM predictions WHERE acid = ?"
+        params: list = [acid]
+        if model_version is not None:
+            latest += " AND model_version = ?"
+            params.append(model_version)
+        conditions = [f"p.id IN ({latest} GROUP BY diet_id)"]
+        if min_value is not None:
+            conditions.append("p.value > ?")
+            params.append(min_value)
+        if max_value is not None:
+            conditions.append("p.value < ?")
+            params.append(max_value)
+        if since is not None:
+            conditions.append("p.created_at >= ?")
+            params.append(since.isoformat(timespec='seconds'))
+        if until is not None:
+            conditions.append("p.created_at < ?")
+            params.append(until.isoformat(timespec='seconds'))
+
+        query = f"""SELECT p.diet_id, d.name, p.acid, p.value, p.model_version, p.created_at
+                    FROM predictions p JOIN diets d ON d.diet_id = p.diet_id
+                    WHERE {' AND '.join(conditions)}
+                    ORDER BY p.created_at"""
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(query, params)]
+
+    def diets_above_target(self, acid: str, since: Optional[datetime] = None) -> List[Dict]:
+        """Рационы, чей последний прогноз кислоты выше целевого диапазона (например, за последний месяц)"""
+        return self.query_predictions(acid, min_value=AppConfig.get_acid_targets(acid)['max'], since=since)
+
+    def diets_below_target(self, acid: str, since: Optional[datetime] = None) -> List[Dict]:
+        """Рационы, чей последний прогноз кислоты ниже целевого диапазона"""
+        return self.query_predictions(acid, max_value=AppConfig.get_acid_targets(acid)['min'], since=since)
+
+    # --- Обработанные файлы (для наблюдения за папкой) ---
+
+    def processed_hashes(self) -> Set[str]:
+        """Хэши уже обработанных файлов"""
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT content_hash FROM processed_files")}
+
+    def append_results(self, source_file: str, content_hash: str, diets: List[Diet],
+                       predictions: List[PredictionResult], features: Optional[np.ndarray] = None,
+                       model_version: str = 'unknown', sources: Iterable[tuple] = ()):
+        """Сохраняет рационы файла, их признаки, прогнозы и источники одной транзакцией"""
+        with self._lock, self._conn:
+            self._write_diets(diets, features, source_file)
+            # Прогнозы - по ID, назначенным при записи (у повторов состава - ID сохраненного)
+            self._write_predictions([diet.diet_id for diet in diets], predictions, model_version)
+            self._write_sources(sources)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO processed_files (content_hash, source_file, processed_at) VALUES (?, ?, ?)",
+                (content_hash, source_file, _now())
+            )
@@ -1,14 +1,20 @@
 import csv
 import os
 import re
-import pandas as pd
-from typing import Dict, Optional, List, Union, Tuple
+from typing import Callable, Dict, Optional, List, Union, Tuple
 from ..models.diet import Diet, DietComponent
+from ..utils.profiling import memory_profiler
+
+# Обратный вызов прогресса: (обработано, всего); может прервать разбор исключением
+ProgressCallback = Callable[[int, int], None]
+
+# Как часто сообщать о прогрессе при разборе строк CSV
+PROGRESS_EVERY_ROWS = 500
 
 class ExcelParser:
     """Парсер для CSV, Excel и PDF файлов с рационами"""
     
-    def parse_diet(self, file_path: str) -> Optional[Diet]:
+    def parse_diet(self, file_path: str, progress: Optional[ProgressCallback] = None) -> Optional[Diet]:
         """Парсит один рацион из файла (первый найденный)"""
         try:            
             file_ext = os.path.splitext(file_path)[1].lower()
@@ -19,7 +25,7 @@ class ExcelParser:
                 csv_path = self._excel_to_csv(file_path)
                 return self._parse_single_diet_from_csv(csv_path)
             elif file_ext == '.pdf':
-                result = self._parse_pdf_single(file_path)
+                result = self._parse_pdf_single(file_path, progress)
                 if result:
                     return result
                 else:
@@ -37,18 +43,18 @@ class ExcelParser:
             traceback.print_exc()
             return None
     
-    def parse_all_diets(self, file_path: str) -> List[Diet]:
-        """Парсит все рационы из файла"""
+    def parse_all_diets(self, file_path: str, progress: Optional[ProgressCallback] = None) -> List[Diet]:
+        """Парсит все рационы из файла; progress вызывается по мере разбора строк/страниц"""
         try:
             file_ext = os.path.splitext(file_path)[1].lower()
             
             if file_ext == '.csv':
-                return self._parse_all_diets_from_csv(file_path)
+                return self._parse_all_diets_from_csv(file_path, progress)
             elif file_ext in ['.xlsx', '.xls']:
                 csv_path = self._excel_to_csv(file_path)
-                return self._parse_all_diets_from_csv(csv_path)
+                return self._parse_all_diets_from_csv(csv_path, progress)
             elif file_ext == '.pdf':
-                return self._parse_pdf_all(file_path)
+                return self._parse_pdf_all(file_path, progress)
             else:
                 print(f"❌ Неподдерживаемый формат файла: {file_ext}")
                 return []
@@ -80,24 +86,28 @@ class ExcelParser:
             print(f"❌ Ошибка парсинга CSV: {e}")
             return None
     
-    def _parse_all_diets_from_csv(self, file_path: str) -> List[Diet]:
+    def _parse_all_diets_from_csv(self, file_path: str, progress: Optional[ProgressCallback] = None) -> List[Diet]:
         """Парсит все рационы из CSV файла"""
         try:
             with open(file_path, 'r', encoding='utf-8-sig') as file:
-                reader = csv.DictReader(file)
-                rows = list(reader)
+                with memory_profiler.stage('parse.read_rows'):
+                    reader = csv.DictReader(file)
+                    rows = list(reader)
                 
                 if not rows:
                     print("ℹ️ Файл пустой")
                     return []
                 
                 all_diets = []
-                for i, row in enumerate(rows):
-                    ration_id = row.get('ration_id', f'row_{i+1}')
-                    diet = self._create_diet_from_row(row, os.path.basename(file_path), ration_id)
-                    if diet and diet.components:
-                        all_diets.append(diet)
-                        print(f"✅ Рацион {ration_id}: {len(diet.components)} компонентов")
+                with memory_profiler.stage('parse.build_diets', items=len(rows)):
+                    for i, row in enumerate(rows):
+                        ration_id = row.get('ration_id', f'row_{i+1}')
+                        diet = self._create_diet_from_row(row, os.path.basename(file_path), ration_id)
+                        if diet and diet.components:
+                            all_diets.append(diet)
+                            print(f"✅ Рацион {ration_id}: {len(diet.components)} компонентов")
+                        if progress and ((i + 1) % PROGRESS_EVERY_ROWS == 0 or i + 1 == len(rows)):
+                            progress(i + 1, len(rows))
                 
                 print(f"📊 Создано рационов: {len(all_diets)}")
                 return all_diets
@@ -106,10 +116,10 @@ class ExcelParser:
             print(f"❌ Ошибка парсинга всех рационов: {e}")
             return []
     
-    def _parse_pdf_single(self, pdf_path: str) -> Optional[Diet]:
+    def _parse_pdf_single(self, pdf_path: str, progress: Optional[ProgressCallback] = None) -> Optional[Diet]:
         """Парсит один рацион из PDF файла нового формата"""
         try:
-            result = self._parse_nds_pdf_format(pdf_path)
+            result = self._parse_nds_pdf_format(pdf_path, progress)
             if result:
                 return result
             
@@ -119,17 +129,19 @@ class ExcelParser:
             print(f"❌ Ошибка парсинга PDF {pdf_path}: {e}")
             return None
 
-    def _parse_nds_pdf_format(self, pdf_path: str) -> Optional[Diet]:
+    def _parse_nds_pdf_format(self, pdf_path: str, progress: Optional[ProgressCallback] = None) -> Optional[Diet]:
         """Парсит NDS Professional формат PDF"""
         try:
             import pdfplumber
             
             with pdfplumber.open(pdf_path) as pdf:
                 full_text = ""
-                for page in pdf.pages:
+                for page_number, page in enumerate(pdf.pages, 1):
                     text = page.extract_text()
                     if text:
                         full_text += text + "\n"
+                    if progress:
+                        progress(page_number, len(pdf.pages))
                 
                 if not full_text:
                     return None
@@ -276,9 +288,9 @@ class ExcelParser:
                     continue
         return 0.0
 
-    def _parse_pdf_all(self, pdf_path: str) -> List[Diet]:
+    def _parse_pdf_all(self, pdf_path: str, progress: Optional[ProgressCallback] = None) -> List[Diet]:
         """Парсит все рационы из PDF файла"""
-        diet = self._parse_pdf_single(pdf_path)
+        diet = self._parse_pdf_single(pdf_path, progress)
         return [diet] if diet else []
     
     def _create_diet_from_row(self, data: Dict, source_name: str, ration_id: str) -> Diet:
@@ -316,8 +328,11 @@ class ExcelParser:
     def _excel_to_csv(self, excel_file_path: str) -> str:
         """Конвертирует Excel в CSV"""
         csv_file_path = excel_file_path.replace('.xlsx', '.csv').replace('.xls', '.csv')
-        df = pd.read_excel(excel_file_path)
-        df.to_csv(csv_file_path, index=False, encoding='utf-8')
+        import pandas as pd
+        
+        with memory_profiler.stage('parse.excel_to_csv'):
+            df = pd.read_excel(excel_file_path)
+            df.to_csv(csv_file_path, index=False, encoding='utf-8')
         print(f"✅ Excel сконвертирован в: {csv_file_path}")
         return csv_file_path
     
@@ -0,0 +1,72 @@
+# services/explanation.py
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Сколько главных факторов хранить для каждой кислоты
+TOP_DRIVERS = 3
+
+
+@dataclass
+class PredictionExplanation:
+    """Разложение линейного прогноза: кислота = свободный член + сумма коэффициент x признак.
+
+    contributions - тензор рационы x кислоты x признаки, top_features -
+    индексы признаков с наибольшим по модулю вкладом (рационы x кислоты x k).
+    """
+    acids: List[str]
+    features: List[str]
+    intercepts: np.ndarray          # кислоты
+    weights: np.ndarray             # кислоты x признаки
+    contributions: np.ndarray       # рационы x кислоты x признаки
+    top_features: np.ndarray        # рационы x кислоты x k
+    model_version: str = ''
+
+    @classmethod
+    def compute(cls, feature_matrix: np.ndarray, acids: List[str], features: List[str],
+                weights: np.ndarray, intercepts: np.ndarray, model_version: str = '',
+                top_k: int = TOP_DRIVERS) -> 'PredictionExplanation':
+        """Вклады для всего пакета одной векторной операцией"""
+        feature_matrix = np.atleast_2d(np.asarray(feature_matrix, dtype=float))
+        contributions = feature_matrix[:, None, :] * weights[None, :, :]
+        top_k = min(top_k, len(features))
+        top_features = np.argsort(-np.abs(contributions), axis=2, kind='stable')[..., :top_k]
+        return cls(list(acids), list(features), intercepts, weights, contributions, top_features, model_version)
+
+    def __len__(self) -> int:
+        return self.contributions.shape[0]
+
+    @property
+    def values(self) -> np.ndarray:
+        """Прогнозы (рационы x кислоты) - сумма вкладов и свободного члена"""
+        return self.contributions.sum(axis=2) + self.intercepts
+
+    def row(self, diet_index: int) -> 'PredictionExplanation':
+        """Разложение одного рациона пакета (без копирования массивов)"""
+        return PredictionExplanation(
+            self.acids, self.features, self.intercepts, self.weights,
+            self.contributions[diet_index:diet_index + 1], self.top_features[diet_index:diet_index + 1],
+            self.model_version,
+        )
+
+    def acid_index(self, acid: str) -> Optional[int]:
+        try:
+            return self.acids.index(acid)
+        except ValueError:
+            return None
+
+    def drivers(self, diet_index: int, acid: str, k: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Главные факторы прогноза кислоты: (признак, вклад в п.п.) по убыванию |вклада|, без нулевых.
+
+        k=None - предрасчитанные top_features, иначе k признаков (все при k >= числа признаков).
+        """
+        column = self.acid_index(acid)
+        if column is None:
+            return []
+        contributions = self.contributions[diet_index, column]
+        if k is None:
+            order = self.top_features[diet_index, column]
+        else:
+            order = np.argsort(-np.abs(contributions), kind='stable')[:k]
+        return [(self.features[j], float(contributions[j])) for j in order if contributions[j] != 0]
@@ -0,0 +1,295 @@
+# services/feasibility.py
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..models.diet import Diet
+from ..utils.config import AppConfig
+from .model_registry import ModelSnapshot
+from .optimizer import MAX_CHANGE
+
+# Итераций Динкельбаха для дробно-линейной части (обычно хватает 3-5)
+MAX_ITERATIONS = 50
+TOLERANCE = 1e-10
+# Шагов уточнения достижимых значений по градиенту
+CLIMB_STEPS = 10
+# Слоев суммы СВ для уточнения внешней оценки
+DM_LAYERS = 8
+# Рационов в одном блоке вычислений (память ~ рационы x кислоты x компоненты^2)
+BLOCK_DIETS = 64
+
+# Границы компонента, кг: (минимум, максимум)
+Bounds = Dict[str, Tuple[float, float]]
+
+
+@dataclass
+class FeasibilityResult:
+    """Достижимые значения кислот при заданных границах компонентов (рационы x кислоты).
+
+    reachable_min/max - внешняя оценка: значений за ее пределами не бывает.
+    attainable_min/max - значения, полученные на конкретных допустимых
+    рационах: все промежуточные тоже достижимы (непрерывность на брусе).
+    """
+    acids: List[str]
+    current: np.ndarray
+    reachable_min: np.ndarray
+    reachable_max: np.ndarray
+    attainable_min: np.ndarray
+    attainable_max: np.ndarray
+    target_min: np.ndarray          # кислоты
+    target_max: np.ndarray          # кислоты
+    model_version: str = ''
+
+    def __len__(self) -> int:
+        return self.current.shape[0]
+
+    @property
+    def feasible(self) -> np.ndarray:
+        """Цель не исключена: внешняя оценка пересекает целевой диапазон"""
+        return (self.reachable_max >= self.target_min) & (self.reachable_min <= self.target_max)
+
+    @property
+    def guaranteed(self) -> np.ndarray:
+        """Цель заведомо достижима: найденные значения пересекают целевой диапазон"""
+        return (self.attainable_max >= self.target_min) & (self.attainable_min <= self.target_max)
+
+    def acid_index(self, acid: str) -> Optional[int]:
+        try:
+            return self.acids.index(acid)
+        except ValueError:
+            return None
+
+    def is_feasible(self, diet_index: int, acid: str) -> bool:
+        column = self.acid_index(acid)
+        return column is None or bool(self.feasible[diet_index, column])
+
+    def infeasible_acids(self, diet_index: int = 0) -> List[str]:
+        """Кислоты вне нормы, которые нельзя вернуть в норму в пределах границ"""
+        return [acid for acid, ok in zip(self.acids, self.feasible[diet_index]) if not ok]
+
+
+class FeasibilityAnalyzer:
+    """Достижимые диапазоны кислот при границах количеств компонентов.
+
+    Кислота линейной модели раскладывается на линейную часть (признаки-
+    количества и явно заданные нутриенты) и дробно-линейную: нутриенты
+    по библиотеке - отношения сумм к сумме СВ с общим знаменателем,
+    поэтому их взвешенная сумма - одна дробь (p.a) / (q.a). Экстремумы
+    линейной части на брусе - интервальная арифметика (выбор границы по
+    знаку коэффициента), дробной - метод Динкельбаха, где каждая
+    подзадача - ЛП на брусе с решением в явном виде. Все вычисляется
+    массивами рационы x кислоты x компоненты, стадо - одним вызовом.
+    """
+
+    def __init__(self, predictor, max_change: float = MAX_CHANGE):
+        self.predictor = predictor
+        self.featurizer = predictor.featurizer
+        self.max_change = max_change
+
+    def default_bounds(self, diet: Diet) -> Bounds:
+        """Изменение каждого компонента не больше max_change от текущего количества"""
+        return {
+            name: (max(0.0, component.amount * (1 - self.max_change)), component.amount * (1 + self.max_change))
+            for name, component in diet.components.items()
+        }
+
+    def analyze(self, diet: Diet, bounds: Optional[Bounds] = None,
+                snapshot: Optional[ModelSnapshot] = None) -> FeasibilityResult:
+        return self.analyze_batch([diet], [bounds], snapshot)
+
+    def analyze_batch(self, diets: Sequence[Diet], bounds: Optional[Sequence[Optional[Bounds]]] = None,
+                      snapshot: Optional[ModelSnapshot] = None) -> FeasibilityResult:
+        """Достижимые диапазоны для набора рационов; bounds - по рациону (None - default_bounds).
+
+        Компоненты, которых нет в границах рациона, считаются неизменными.
+        """
+        snapshot = snapshot or self.predictor.snapshot
+        diets = list(diets)
+        bounds = list(bounds) if bounds is not None else [None] * len(diets)
+        n_acids = len(snapshot.acids)
+        parts = [self._analyze_block(diets[start:start + BLOCK_DIETS], bounds[start:start + BLOCK_DIETS], snapshot)
+                 for start in range(0, len(diets), BLOCK_DIETS)]
+        stacked = [np.concatenate(arrays) if arrays else np.zeros((0, n_acids)) for arrays in zip(*parts)] \
+            if parts else [np.zeros((0, n_acids))] * 5
+
+        limits = [AppConfig.get_acid_targets(acid) for acid in snapshot.acids]
+        return FeasibilityResult(
+            list(snapshot.acids), *stacked,
+            np.array([limit['min'] for limit in limits]), np.array([limit['max'] for limit in limits]),
+            snapshot.version,
+        )
+
+    def _analyze_block(self, diets: List[Diet], bounds: List[Optional[Bounds]], snapshot: ModelSnapshot):
+        """(текущие, внешние min/max, достижимые min/max) для пакета рационов"""
+        linear, ratio, denominator, current, lower, upper = self._design(diets, bounds, snapshot)
+        intercepts = snapshot.intercepts
+
+        # Интервальная арифметика: линейная часть - граница бруса по знаку коэффициента,
+        # дробная - отдельно от нее (поэтому оценка внешняя)
+        linear_low = np.where(linear > 0, lower[:, None, :], upper[:, None, :])
+        linear_high = np.where(linear > 0, upper[:, None, :], lower[:, None, :])
+        ratio_min, ratio_low = self._ratio_extreme(-ratio, denominator, current, lower, upper)
+        ratio_max, ratio_high = self._ratio_extreme(ratio, denominator, current, lower, upper)
+        reachable_min = intercepts + (linear * linear_low).sum(axis=2) - ratio_min
+        reachable_max = intercepts + (linear * linear_high).sum(axis=2) + ratio_max
+
+        # Уточнение по слоям суммы СВ: в слое дробь ограничена линейной функцией - ЛП
+        reachable_min = np.maximum(reachable_min, intercepts - self._layered_bound(-linear, -ratio, denominator,
+                                                                                  lower, upper))
+        reachable_max = np.minimum(reachable_max, intercepts + self._layered_bound(linear, ratio, denominator,
+                                                                                  lower, upper))
+
+        # Внутренняя оценка: значения на допустимых вершинах, уточненные подъемом по градиенту
+        values = self._evaluate(linear, ratio, denominator, intercepts, current[:, None, :])
+        attainable_min = -self._climb(-linear, -ratio, denominator, -intercepts, lower, upper,
+                                      [linear_low, ratio_low], -values)
+        attainable_max = self._climb(linear, ratio, denominator, intercepts, lower, upper,
+                                     [linear_high, ratio_high], values)
+        # Найденные значения достижимы: внешняя оценка не может быть уже них (погрешность округления)
+        reachable_min = np.minimum(reachable_min, attainable_min)
+        reachable_max = np.maximum(reachable_max, attainable_max)
+        return values, reachable_min, reachable_max, attainable_min, attainable_max
+
+    def _design(self, diets: List[Diet], bounds: List[Optional[Bounds]], snapshot: ModelSnapshot):
+        """Коэффициенты кислот по компонентам (рационы x кислоты x компоненты, с выравниванием нулями)"""
+        featurizer = self.featurizer
+        feature_cols = [feature_col for _, feature_col in featurizer.nutrient_columns()]
+        weights = snapshot.weights
+        n_acids, n_features = weights.shape
+        width = max((len(diet.components) for diet in diets), default=0)
+
+        columns = np.full((len(diets), width), -1)
+        current = np.zeros((len(diets), width))
+        lower = np.zeros((len(diets), width))
+        upper = np.zeros((len(diets), width))
+        # Нутриенты и СВ компонентов на кг (столбцы featurizer.nutrient_as_fed)
+        as_fed = np.zeros((len(diets), width, len(feature_cols) + 1))
+
+        for row, (diet, diet_bounds) in enumerate(zip(diets, bounds)):
+            diet_bounds = self.default_bounds(diet) if diet_bounds is None else diet_bounds
+            for i, (comp_name, component) in enumerate(diet.components.items()):
+                column = featurizer.component_column(comp_name)
+                columns[row, i] = -1 if column is None else column
+                current[row, i] = component.amount
+                lower[row, i], upper[row, i] = diet_bounds.get(comp_name, (component.amount, component.amount))
+            if feature_cols:
+                as_fed[row, :len(diet.components)] = featurizer.nutrient_as_fed_rows(list(diet.components))
+        nutrients, denominator = as_fed[..., :-1], as_fed[..., -1]
+
+        # Количества по столбцам признаков (как в DietFeaturizer); источник нутриента - featurizer.library_mask
+        mapped = columns >= 0
+        direct = np.zeros((len(diets), n_features))
+        diet_rows = np.broadcast_to(np.arange(len(diets))[:, None], columns.shape)
+        np.add.at(direct, (diet_rows[mapped], columns[mapped]), current[mapped])
+        from_library = featurizer.library_mask(direct)
+
+        linear = np.where(mapped[:, None, :], weights[:, np.where(mapped, columns, 0)].transpose(1, 0, 2), 0.0)
+        ratio_weights = weights[:, feature_cols][None, :, :] * from_library[:, None, :]
+        ratio = np.einsum('nak,nck->nac', ratio_weights, nutrients)
+        return linear, ratio, denominator, current, lower, upper
+
+    @staticmethod
+    def _evaluate(linear, ratio, denominator, intercepts, amounts) -> np.ndarray:
+        """Значения кислот для количеств (рационы x [кислоты x] компоненты)"""
+        amounts = np.broadcast_to(amounts, linear.shape)
+        dry_matter = (denominator[:, None, :] * amounts).sum(axis=2)
+        numerator = (ratio * amounts).sum(axis=2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fraction = np.where(dry_matter > 0, numerator / dry_matter, 0.0)
+        return intercepts + (linear * amounts).sum(axis=2) + fraction
+
+    @classmethod
+    def _climb(cls, linear, ratio, denominator, intercepts, lower, upper, starts, values) -> np.ndarray:
+        """Наибольшее значение, найденное из стартовых вершин: каждая вершина
+        заменяется гранью бруса по знаку градиента, пока значение растет"""
+        best = values
+        q = denominator[:, None, :]
+        low, high = lower[:, None, :], upper[:, None, :]
+        for vertex in starts:
+            value = cls._evaluate(linear, ratio, denominator, intercepts, vertex)
+            for _ in range(CLIMB_STEPS):
+                best = np.maximum(best, value)
+                dry_matter = (q * vertex).sum(axis=2, keepdims=True)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    fraction = np.where(dry_matter > 0, (ratio * vertex).sum(axis=2, keepdims=True) / dry_matter, 0.0)
+                    gradient = linear + np.where(dry_matter > 0, (ratio - fraction * q) / dry_matter, 0.0)
+                candidate = np.where(gradient > 0, high, low)
+                candidate_value = cls._evaluate(linear, ratio, denominator, intercepts, candidate)
+                improved = candidate_value > value + TOLERANCE
+                if not improved.any():
+                    break
+                vertex = np.where(improved[..., None], candidate, vertex)
+                value = np.where(improved, candidate_value, value)
+            best = np.maximum(best, value)
+        return best
+
+    @classmethod
+    def _layered_bound(cls, linear, ratio, denominator, lower, upper) -> np.ndarray:
+        """Верхняя оценка max l.a + (p.a) / (q.a) на брусе (рационы x кислоты).
+
+        Диапазон суммы СВ q.a делится на DM_LAYERS слоев [d1, d2]; в слое
+        (p.a) / (q.a) <= max((p.a) / d1, (p.a) / d2), и остается две ЛП с
+        одним ограничением d1 <= q.a <= d2. Если сумма СВ может быть нулевой,
+        оценка бесконечна (остается интервальная).
+        """
+        dm_low = (denominator * lower).sum(axis=1)
+        dm_high = (denominator * upper).sum(axis=1)
+        bound = np.full(linear.shape[:2], -np.inf)
+        positive = dm_low > 0
+        edges = np.linspace(np.where(positive, dm_low, 1.0), np.where(positive, dm_high, 1.0), DM_LAYERS + 1)
+        for d1, d2 in zip(edges[:-1], edges[1:]):
+            for scale in (1.0 / d1, 1.0 / d2):
+                objective = linear + scale[:, None, None] * ratio
+                bound = np.maximum(bound, cls._box_lp_max(objective, denominator, lower, upper, d1, d2))
+        return np.where(positive[:, None], bound, np.inf)
+
+    @staticmethod
+    def _box_lp_max(objective, denominator, lower, upper, d_low, d_high) -> np.ndarray:
+        """max c.a на брусе при d_low <= q.a <= d_high через двойственную задачу.
+
+        Двойственная функция выпукла и кусочно-линейна по одному множителю,
+        изломы - в c_j / q_j и нуле; минимум по изломам равен значению ЛП,
+        а любое значение двойственной функции - верхняя оценка.
+        """
+        q = denominator[:, None, :]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            kinks = np.where(q > 0, objective / q, 0.0)
+        multipliers = np.concatenate([kinks, np.zeros(kinks.shape[:2] + (1,))], axis=2)
+        reduced = objective[:, :, None, :] - multipliers[..., None] * q[:, :, None, :]
+        box = np.maximum(reduced * lower[:, None, None, :], reduced * upper[:, None, None, :]).sum(axis=3)
+        constraint = np.where(multipliers >= 0, multipliers * d_high[:, None, None], multipliers * d_low[:, None, None])
+        return (box + constraint).min(axis=2)
+
+    @staticmethod
+    def _ratio_extreme(ratio, denominator, current, lower, upper):
+        """Максимум (p.a) / (q.a) на брусе для всех рационов и кислот (метод Динкельбаха).
+
+        Без сухого вещества признаки нутриентов равны 0 (как в DietFeaturizer),
+        поэтому 0 достижим, если нижние границы допускают нулевое СВ.
+        """
+        q = denominator[:, None, :]
+        vertex = np.broadcast_to(current[:, None, :], ratio.shape).copy()
+        dry_matter = (q * vertex).sum(axis=2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            best = np.where(dry_matter > 0, (ratio * vertex).sum(axis=2) / dry_matter, 0.0)
+
+        zero_possible = ((denominator * lower).sum(axis=1) <= 0)[:, None]
+        use_zero = zero_possible & (best < 0)
+        best = np.where(use_zero, 0.0, best)
+        vertex = np.where(use_zero[..., None], lower[:, None, :], vertex)
+
+        low, high = lower[:, None, :], upper[:, None, :]
+        for _ in range(MAX_ITERATIONS):
+            coefficients = ratio - best[..., None] * q
+            candidate = np.where(coefficients > 0, high, low)
+            gain = (coefficients * candidate).sum(axis=2)
+            improving = gain > TOLERANCE * (1.0 + np.abs(best))
+            if not improving.any():
+                break
+            # При gain > 0 сумма СВ вершины положительна: иначе и числитель был бы нулем
+            candidate_dm = np.where(improving, (q * candidate).sum(axis=2), 1.0)
+            value = (ratio * candidate).sum(axis=2) / candidate_dm
+            best = np.where(improving, value, best)
+            vertex = np.where(improving[..., None], candidate, vertex)
+        return best, vertex
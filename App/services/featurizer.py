@@ -0,0 +1,258 @@
+# services/featurizer.py
+import re
+from difflib import get_close_matches
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from scipy import sparse
+
+from ..models.diet import Diet
+from ..utils.config import AppConfig
+from .feed_library import FeedLibrary, load_feed_library
+
+# Коды культур NDS (третья группа кода вида 2023.01.05.02)
+NDS_CULTURE_CODES = {
+    "01": "Люцерна", "02": "Эспарцет", "03": "Многолетние травы", "04": "Луговые травы",
+    "05": "Кукуруза", "06": "Суданская трава", "07": "Вико-овес", "08": "Люцерна 1 г.ж.",
+    "09": "Клевер + Тимофеевка", "10": "Однолетние травы", "11": "Райграс", "12": "Тритикале",
+    "13": "Рожь", "14": "Клевер", "15": "Пшеница", "16": "Разнотравье", "17": "Горох", "18": "Зерносмесь",
+    "19": "Ячмень", "20": "Шрот соевый", "21": "Шрот рапсовый", "22": "Жмых рапсовый", "23": "Жмых льняной",
+    "24": "Барда", "25": "Шрот подсолнечный", "26": "Глютен", "27": "Могар", "28": "Амарант", "29": "Сорго",
+    "30": "Козлятник", "31": "Овес", "32": "Вика + тритикале", "33": "Рожь + тритикале", "34": "Эспарцет + костер",
+    "35": "Овес + горох", "36": "Кострец", "37": "Эспарцет + житняк", "38": "Тимофеевка",
+    "39": "Соя", "40": "Рапс", "41": "Свекла"
+}
+
+# Правила отнесения ингредиента к группе (как при обучении моделей в hackathon.ipynb).
+# Группы проверяются по порядку, побеждает первое совпадение.
+_CATEGORY_PATTERNS = [
+    ('трав_сен', [r'люцерн', r'клевер', r'тимофеевк', r'лугов', r'однолетн', r'многолетн', r'разнотрав',
+                  r'сенаж', r'сено', r'тритикале', r'с-ж', r'c-ж', r'судан']),
+    ('конц_зерн', [r'кукуруз', r'пшениц', r'ячмен', r'зерносмес', r'концентрат', r'корнаж', r'к-ж', r'силос',
+                   r'солом', r'зерно', r'комби', r'кк', r'фураж', r'кормосмес', r'с-']),
+    ('масличн', [r'жмых', r'шрот', r'соев', r'рапс', r'льнян', r'подсолнечн', r'оболочк']),
+    ('жир', [r'жир']),
+    ('пром_отх', [r'свекл', r'свёкл', r'жом', r'паток', r'пивн', r'дробин', r'рож', r'дрожж']),
+    ('мин_техно', [r'добавк', r'кальци', r'калия', r'премикс', r'сода', r'соль', r'поташ', r'мел']),
+]
+
+_CULTURE_PATTERNS = [
+    ('трав_сен', r'люцерн|клевер|тимофеевк|лугов|однолетн|многолетн|разнотрав|эсп|судан|тритик'),
+    ('конц_зерн', r'кукуруз|пшениц|ячмен|зерносмес|концентрат'),
+    ('масличн', r'шрот|жмых|соев|рапс|льн|подсолнеч'),
+]
+
+_COMPILED_CATEGORIES = [
+    (feature, re.compile('|'.join(patterns), re.IGNORECASE))
+    for feature, patterns in _CATEGORY_PATTERNS
+]
+_COMPILED_CULTURES = [
+    (feature, re.compile(pattern, re.IGNORECASE))
+    for feature, pattern in _CULTURE_PATTERNS
+]
+_NDS_CODE_RE = re.compile(r'(\d{4})\.(\d{2})\.(\d{2})\.(\d{1,2})')
+
+# Порог нечеткого сопоставления неизвестных названий со стандартными компонентами
+FUZZY_CUTOFF = 0.75
+
+
+def normalize_component_name(name: str) -> str:
+    """Приводит название компонента к каноническому виду"""
+    return re.sub(r'\s+', ' ', str(name)).strip().lower()
+
+
+def _classify_by_rules(name: str) -> Optional[str]:
+    """Классифицирует нормализованное название по коду NDS и ключевым словам"""
+    if name in AppConfig.MODEL_FEATURES:
+        return name
+
+    code_match = _NDS_CODE_RE.search(name)
+    if code_match:
+        culture = NDS_CULTURE_CODES.get(code_match.group(3))
+        if culture:
+            for feature, pattern in _COMPILED_CULTURES:
+                if pattern.search(culture):
+                    return feature
+
+    for feature, pattern in _COMPILED_CATEGORIES:
+        if pattern.search(name):
+            return feature
+    return None
+
+
+@lru_cache(maxsize=1)
+def _standard_component_classes() -> Dict[str, Optional[str]]:
+    """Заранее классифицированные стандартные компоненты из AppConfig"""
+    return {
+        normalize_component_name(name): _classify_by_rules(normalize_component_name(name))
+        for name in AppConfig.STANDARD_COMPONENTS
+    }
+
+
+@lru_cache(maxsize=None)
+def classify_component(name: str) -> Optional[str]:
+    """Возвращает признак модели для сырого названия компонента (или None)"""
+    normalized = normalize_component_name(name)
+    standard = _standard_component_classes()
+
+    if normalized in standard:
+        return standard[normalized]
+
+    feature = _classify_by_rules(normalized)
+    if feature:
+        return feature
+
+    # Неизвестное название - ищем ближайший стандартный компонент
+    match = get_close_matches(normalized, list(standard.keys()), n=1, cutoff=FUZZY_CUTOFF)
+    if match:
+        return standard[match[0]]
+    return None
+
+
+class DietFeaturizer:
+    """Преобразует сырые компоненты рационов в матрицу признаков моделей"""
+
+    def __init__(self, features: Optional[Sequence[str]] = None,
+                 feed_library: Optional[FeedLibrary] = None):
+        self.features: List[str] = list(features or AppConfig.MODEL_FEATURES)
+        self.feature_index: Dict[str, int] = {name: i for i, name in enumerate(self.features)}
+        self.feed_library = feed_library or load_feed_library()
+        # Мемо: название компонента -> индекс признака (или None)
+        self._column_memo: Dict[str, Optional[int]] = {}
+        self._nutrient_columns = self._library_nutrient_columns()
+        self._nutrient_feature_cols = [feature_col for _, feature_col in self._nutrient_columns]
+        self._nutrient_as_fed = self._library_nutrient_as_fed()
+
+    def _library_nutrient_columns(self) -> List[tuple]:
+        """Пары (столбец библиотеки, столбец признака) для нутриентов модели"""
+        if not self.feed_library:
+            return []
+        return [
+            (lib_col, self.feature_index[name])
+            for lib_col, name in enumerate(self.feed_library.nutrients)
+            if name in self.feature_index
+        ]
+
+    def _library_nutrient_as_fed(self) -> Optional[sparse.csr_matrix]:
+        if not self._nutrient_columns:
+            return None
+        as_fed = self.feed_library.as_fed_matrix
+        lib_cols = [lib_col for lib_col, _ in self._nutrient_columns]
+        return sparse.csr_matrix(as_fed[:, lib_cols + [as_fed.shape[1] - 1]])
+
+    def nutrient_columns(self) -> List[tuple]:
+        """Пары (столбец библиотеки кормов, столбец признака) для нутриентов, считаемых по библиотеке"""
+        return list(self._nutrient_columns)
+
+    def nutrient_as_fed(self) -> Optional[sparse.csr_matrix]:
+        """Нутриенты модели на кг натуральной массы (ингредиенты x нутриенты) + последний
+        столбец - доля СВ; None, если по библиотеке не считается ни один признак"""
+        return self._nutrient_as_fed
+
+    def nutrient_as_fed_rows(self, component_names: Sequence[str]) -> Optional[np.ndarray]:
+        """Строки nutrient_as_fed для компонентов (нули для кормов вне библиотеки)"""
+        if self._nutrient_as_fed is None:
+            return None
+        rows = np.zeros((len(component_names), self._nutrient_as_fed.shape[1]))
+        for i, comp_name in enumerate(component_names):
+            lib_row = self.feed_library.ingredient_row(comp_name)
+            if lib_row is not None:
+                rows[i] = self._nutrient_as_fed[lib_row].toarray().ravel()
+        return rows
+
+    def library_mask(self, direct: np.ndarray) -> np.ndarray:
+        """Какие нутриенты (..., нутриенты) берутся из библиотеки: явно заданное
+        в рационе значение (например, из анализа NDS) имеет приоритет"""
+        return direct[..., self._nutrient_feature_cols] == 0
+
+    def blend_nutrients(self, features: np.ndarray, totals: np.ndarray,
+                        direct: Optional[np.ndarray] = None) -> np.ndarray:
+        """Подставляет в features (..., признаки) нутриенты из сумм totals (..., нутриенты + СВ)
+        по nutrient_as_fed: сумма нутриента / сумма СВ, 0 без СВ. Источник выбирается
+        library_mask по direct (по умолчанию - по самим features). Меняет features на месте"""
+        if not self._nutrient_feature_cols:
+            return features
+        dry_matter = totals[..., -1:]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            nutrients = np.where(dry_matter > 0, totals[..., :-1] / dry_matter, 0.0)
+        from_library = self.library_mask(features if direct is None else direct)
+        columns = self._nutrient_feature_cols
+        features[..., columns] = np.where(from_library, nutrients, features[..., columns])
+        return features
+
+    def component_column(self, component_name: str) -> Optional[int]:
+        """Индекс признака для компонента; классификация выполняется один раз на название"""
+        try:
+            return self._column_memo[component_name]
+        except KeyError:
+            feature = classify_component(component_name)
+            column = self.feature_index.get(feature) if feature else None
+            if column is None:
+                print(f"⚠️ Компонент не сопоставлен с признаками модели: {component_name}")
+            self._column_memo[component_name] = column
+            return column
+
+    def featurize(self, diets: Sequence[Diet]) -> np.ndarray:
+        """Строит плотную матрицу признаков (рационы x признаки) для пакетного прогноза"""
+        rows: List[int] = []
+        columns: List[int] = []
+        amounts: List[float] = []
+        lib_rows: List[int] = []
+        lib_columns: List[int] = []
+        lib_amounts: List[float] = []
+
+        library = self.feed_library if self._nutrient_columns else None
+
+        for row, diet in enumerate(diets):
+            for comp_name, component in diet.components.items():
+                column = self.component_column(comp_name)
+                if column is not None:
+                    rows.append(row)
+                    columns.append(column)
+                    amounts.append(component.amount)
+                if library is not None:
+                    lib_row = library.ingredient_row(comp_name)
+                    if lib_row is not None:
+                        lib_rows.append(row)
+                        lib_columns.append(lib_row)
+                        lib_amounts.append(component.amount)
+
+        matrix = np.zeros((len(diets), len(self.features)))
+        if rows:
+            np.add.at(matrix, (np.asarray(rows), np.asarray(columns)), np.asarray(amounts, dtype=float))
+
+        if lib_rows:
+            amounts_matrix = sparse.csr_matrix(
+                (lib_amounts, (lib_rows, lib_columns)),
+                shape=(len(diets), len(library.ingredients))
+            )
+            self.blend_nutrients(matrix, (amounts_matrix @ self._nutrient_as_fed).toarray())
+        return matrix
+
+    def featurize_amounts(self, component_names: Sequence[str], amounts: np.ndarray) -> np.ndarray:
+        """Признаки для широкой таблицы количеств (рационы x компоненты, кг) без объектов Diet"""
+        amounts = np.asarray(amounts, dtype=float)
+        projection = np.zeros((len(component_names), len(self.features)))
+        for i, comp_name in enumerate(component_names):
+            column = self.component_column(comp_name)
+            if column is not None:
+                projection[i, column] = 1.0
+        matrix = amounts @ projection
+
+        library = self.feed_library if self._nutrient_columns else None
+        if library is not None:
+            pairs = [(i, library.ingredient_row(name)) for i, name in enumerate(component_names)]
+            pairs = [(i, row) for i, row in pairs if row is not None]
+            if pairs:
+                to_library = sparse.csr_matrix(
+                    (np.ones(len(pairs)), ([i for i, _ in pairs], [row for _, row in pairs])),
+                    shape=(len(component_names), len(library.ingredients))
+                )
+                totals = (sparse.csr_matrix(amounts) @ to_library @ self._nutrient_as_fed).toarray()
+                self.blend_nutrients(matrix, totals)
+        return matrix
+
+    def featurize_diet(self, diet: Diet) -> np.ndarray:
+        """Вектор признаков для одного рациона"""
+        return self.featurize([diet])[0]
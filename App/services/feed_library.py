@@ -0,0 +1,82 @@
+# services/feed_library.py
+import csv
+import os
+from difflib import get_close_matches
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import numpy as np
+from scipy import sparse
+
+from ..utils.config import AppConfig
+
+DEFAULT_LIBRARY_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models', 'feed_library.csv'
+)
+
+# Колонка с содержанием сухого вещества, % от натуральной массы
+DRY_MATTER_COLUMN = 'св'
+
+# Порог нечеткого сопоставления названий с библиотекой кормов
+FUZZY_CUTOFF = 0.75
+
+
+class FeedLibrary:
+    """Библиотека состава кормов: ингредиент -> содержание нутриентов в % СВ"""
+
+    def __init__(self, ingredients: List[str], nutrients: List[str],
+                 dry_matter: np.ndarray, composition: np.ndarray):
+        self.ingredients = ingredients
+        self.nutrients = nutrients
+        self.index: Dict[str, int] = {name: i for i, name in enumerate(ingredients)}
+        self.dry_matter = dry_matter          # доля СВ, (ингредиенты,)
+        self.composition = composition        # % СВ, (ингредиенты x нутриенты)
+        # Нутриенты на кг натуральной массы + последний столбец - сама доля СВ,
+        # чтобы суммы нутриентов и СВ получались одним произведением
+        self.as_fed_matrix = sparse.csr_matrix(
+            np.column_stack([composition * dry_matter[:, None], dry_matter])
+        )
+        self._row_memo: Dict[str, Optional[int]] = {}
+
+    @classmethod
+    def from_csv(cls, file_path: str) -> 'FeedLibrary':
+        """Загружает библиотеку из CSV файла"""
+        with open(file_path, 'r', encoding='utf-8-sig') as file:
+            reader = csv.DictReader(file)
+            nutrients = [name for name in reader.fieldnames[1:] if name != DRY_MATTER_COLUMN]
+            ingredients, dry_matter, rows = [], [], []
+            for row in reader:
+                ingredients.append(row[reader.fieldnames[0]].strip().lower())
+                dry_matter.append(float(row[DRY_MATTER_COLUMN]) / 100.0)
+                rows.append([float(row[name] or 0.0) for name in nutrients])
+
+        print(f"✅ Библиотека кормов загружена: {len(ingredients)} ингредиентов, {len(nutrients)} нутриентов")
+        return cls(ingredients, nutrients, np.asarray(dry_matter), np.asarray(rows, dtype=float))
+
+    def ingredient_row(self, component_name: str) -> Optional[int]:
+        """Строка библиотеки для компонента; сопоставление выполняется один раз на название"""
+        try:
+            return self._row_memo[component_name]
+        except KeyError:
+            name = ' '.join(str(component_name).split()).lower()
+            row = self.index.get(name)
+            if row is None:
+                match = get_close_matches(name, self.ingredients, n=1, cutoff=FUZZY_CUTOFF)
+                row = self.index[match[0]] if match else None
+            self._row_memo[component_name] = row
+            return row
+
+
+@lru_cache(maxsize=None)
+def load_feed_library(file_path: str = DEFAULT_LIBRARY_PATH) -> Optional[FeedLibrary]:
+    """Загружает библиотеку кормов один раз на процесс"""
+    try:
+        library = FeedLibrary.from_csv(file_path)
+    except Exception as e:
+        print(f"❌ Ошибка загрузки библиотеки кормов {file_path}: {e}")
+        return None
+
+    unknown = [name for name in library.nutrients if name not in AppConfig.NUTRIENT_FEATURES]
+    if unknown:
+        print(f"⚠️ Нутриенты библиотеки не используются моделями: {unknown}")
+    return library
@@ -0,0 +1,100 @@
+# services/herd_charts.py
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from typing import Optional
+
+import numpy as np
+
+from ..utils.config import AppConfig
+from .herd_table import HerdTable
+
+# Сколько PNG держать в памяти
+CHART_CACHE_SIZE = 16
+# Размер графика по стаду, дюймы, и разрешение
+HERD_CHART_SIZE = (8, 6)
+HERD_CHART_DPI = 90
+
+
+class HerdChartRenderer:
+    """Статические графики по стаду: рисуются вне экрана (Agg) и кешируются.
+
+    Ключ кеша - хеш входа (кислоты, значения, целевые диапазоны, размер),
+    поэтому повторный показ того же набора рационов не перерисовывает
+    график. PNG хранится в памяти (LRU) и на диске в cache_dir.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = AppConfig.CHART_CACHE_DIR,
+                 max_entries: int = CHART_CACHE_SIZE):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self._memory: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cache_key(table: HerdTable) -> str:
+        digest = hashlib.sha1()
+        digest.update(repr((table.acids, HERD_CHART_SIZE, HERD_CHART_DPI)).encode('utf-8'))
+        digest.update(repr([AppConfig.get_acid_targets(acid) for acid in table.acids]).encode('utf-8'))
+        digest.update(np.ascontiguousarray(table.values, dtype=np.float64).tobytes())
+        return digest.hexdigest()
+
+    def render(self, table: HerdTable) -> bytes:
+        """PNG доли рационов ниже/в/выше нормы по каждой кислоте"""
+        key = self.cache_key(table)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        path = os.path.join(self.cache_dir, f"herd_{key}.png") if self.cache_dir else None
+        if path and os.path.exists(path):
+            with open(path, 'rb') as f:
+                png = f.read()
+        else:
+            png = self._draw(table)
+            if path:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(png)
+                os.replace(tmp_path, path)
+
+        with self._lock:
+            self._memory[key] = png
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+        return png
+
+    @staticmethod
+    def _draw(table: HerdTable) -> bytes:
+        # Figure без pyplot: не трогает GUI-бэкенд и безопасен вне главного потока
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        total = max(len(table), 1)
+        below = np.count_nonzero(table.status < 0, axis=0) / total * 100
+        above = np.count_nonzero(table.status > 0, axis=0) / total * 100
+        inside = 100 - below - above
+        y = np.arange(len(table.acids))
+
+        figure = Figure(figsize=HERD_CHART_SIZE, dpi=HERD_CHART_DPI)
+        FigureCanvasAgg(figure)
+        ax = figure.add_subplot(111)
+        ax.barh(y, below, color='#64b5f6', label='Ниже нормы')
+        ax.barh(y, inside, left=below, color='#81c784', label='В норме')
+        ax.barh(y, above, left=below + inside, color='#e57373', label='Выше нормы')
+        ax.set_yticks(y)
+        ax.set_yticklabels(table.acids)
+        ax.invert_yaxis()
+        ax.set_xlim(0, 100)
+        ax.set_xlabel('Доля рационов, %')
+        ax.set_title(f'Рационы относительно целевых диапазонов (n={len(table)})')
+        ax.legend(loc='lower center', bbox_to_anchor=(0.5, -0.22), ncol=3, frameon=False)
+        figure.tight_layout()
+
+        buffer = BytesIO()
+        figure.savefig(buffer, format='png')
+        return buffer.getvalue()
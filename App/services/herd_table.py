@@ -0,0 +1,73 @@
+# services/herd_table.py
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from ..models.diet import Diet
+from ..utils.config import AppConfig
+
+# Столбцы таблицы помимо кислот
+NAME_COLUMN = 'diet'
+OUT_OF_RANGE_COLUMN = 'out_of_range'
+
+
+@dataclass
+class HerdTable:
+    """Прогнозы по всем рационам в виде массивов: сортировка и фильтр без виджетов"""
+    diet_ids: np.ndarray
+    names: np.ndarray
+    acids: List[str]
+    values: np.ndarray              # рационы x кислоты
+    model_version: str
+    # -1 ниже нормы, 0 в норме, 1 выше нормы
+    status: np.ndarray = field(init=False)
+    out_of_range: np.ndarray = field(init=False)
+
+    def __post_init__(self):
+        limits = [AppConfig.get_acid_targets(acid) for acid in self.acids]
+        lower = np.array([limit['min'] for limit in limits])
+        upper = np.array([limit['max'] for limit in limits])
+        self.status = np.where(self.values < lower, -1, np.where(self.values > upper, 1, 0)).astype(np.int8)
+        self.out_of_range = np.count_nonzero(self.status, axis=1)
+        self._search = np.char.lower(self.names.astype(str))
+
+    @classmethod
+    def from_diets(cls, predictor, diets: Sequence[Diet]) -> 'HerdTable':
+        """Оценка всех рационов одним пакетным прогнозом (один снимок моделей)"""
+        snapshot = predictor.snapshot
+        features = predictor.featurize(list(diets))
+        acids, values = predictor.predict_matrix(features, snapshot)
+        return cls(
+            diet_ids=np.array([diet.diet_id for diet in diets], dtype=object),
+            names=np.array([diet.name for diet in diets], dtype=object),
+            acids=list(acids),
+            values=values,
+            model_version=snapshot.version,
+        )
+
+    def __len__(self) -> int:
+        return len(self.diet_ids)
+
+    def order(self, column: Optional[str] = None, descending: bool = False) -> np.ndarray:
+        """Порядок строк по столбцу (устойчивая сортировка); None - исходный порядок"""
+        if column is None:
+            return np.arange(len(self))
+        if column == NAME_COLUMN:
+            keys = self.names.astype(str)
+        elif column == OUT_OF_RANGE_COLUMN:
+            keys = self.out_of_range
+        else:
+            keys = self.values[:, self.acids.index(column)]
+        order = np.argsort(keys, kind='stable')
+        return order[::-1] if descending else order
+
+    def select(self, order: np.ndarray, text: str = '', only_problems: bool = False) -> np.ndarray:
+        """Строки в порядке order, прошедшие фильтр по названию/ID и по отклонениям"""
+        mask = np.ones(len(self), dtype=bool)
+        text = text.strip().lower()
+        if text:
+            mask &= np.char.find(self._search, text) >= 0
+        if only_problems:
+            mask &= self.out_of_range > 0
+        return order[mask[order]]
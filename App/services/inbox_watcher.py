@@ -0,0 +1,137 @@
+# services/inbox_watcher.py
+import hashlib
+import os
+import threading
+import time
+from typing import Dict, List, Set, Tuple
+
+from .deduplicator import DietDeduplicator, split_known_diets
+from .diet_store import DietStore
+from .excel_parser import ExcelParser
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.csv', '.xlsx', '.xls')
+
+
+def file_content_hash(file_path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 содержимого файла"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class InboxWatcher:
+    """Отслеживает папку с входящими рационами и оценивает только новые файлы"""
+
+    def __init__(self, inbox_dir: str, predictor=None, results_store=None,
+                 poll_interval: float = 0.25):
+        self.inbox_dir = inbox_dir
+        self.poll_interval = poll_interval
+        self.parser = ExcelParser()
+
+        if predictor is None:
+            from .predictor import AcidPredictor
+            predictor = AcidPredictor()
+        self.predictor = predictor
+
+        if results_store is None:
+            results_store = DietStore()
+        self.results_store = results_store
+
+        self._signatures: Dict[str, Tuple[int, int]] = {}
+        self._pending: Dict[str, Tuple[int, int]] = {}
+        self._seen_hashes: Set[str] = results_store.processed_hashes()
+        self._stop_event = threading.Event()
+
+    def _is_candidate(self, file_name: str) -> bool:
+        """Файл поддерживаемого формата, не созданный самим парсером"""
+        stem, ext = os.path.splitext(file_name)
+        if file_name.startswith('.') or ext.lower() not in SUPPORTED_EXTENSIONS:
+            return False
+        # ExcelParser складывает промежуточные CSV рядом с исходником
+        if ext.lower() == '.csv':
+            if stem.endswith('_converted'):
+                return False
+            if any(os.path.exists(os.path.join(self.inbox_dir, stem + excel_ext)) for excel_ext in ('.xlsx', '.xls')):
+                return False
+        return True
+
+    def scan(self) -> List[str]:
+        """Один проход по папке; возвращает файлы, готовые к обработке"""
+        ready = []
+        try:
+            entries = list(os.scandir(self.inbox_dir))
+        except FileNotFoundError:
+            print(f"❌ Папка не найдена: {self.inbox_dir}")
+            return ready
+
+        for entry in entries:
+            if not entry.is_file() or not self._is_candidate(entry.name):
+                continue
+            stat = entry.stat()
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if self._signatures.get(entry.path) == signature:
+                continue
+            # Файл берется в работу, когда он не менялся между двумя проходами
+            if self._pending.get(entry.path) == signature:
+                del self._pending[entry.path]
+                self._signatures[entry.path] = signature
+                ready.append(entry.path)
+            else:
+                self._pending[entry.path] = signature
+        return ready
+
+    def process_file(self, file_path: str) -> int:
+        """Парсит и оценивает один файл; возвращает число оцененных рационов"""
+        started = time.perf_counter()
+        content_hash = file_content_hash(file_path)
+        if content_hash in self._seen_hashes:
+            print(f"ℹ️ Пропущен дубликат: {os.path.basename(file_path)}")
+            return 0
+
+        diets = self.parser.parse_all_diets(file_path)
+        if not diets:
+            print(f"❌ Не удалось распарсить: {os.path.basename(file_path)}")
+            return 0
+
+        # Одинаковые рационы (в файле и в уже оцененных) оцениваются один раз
+        deduplicator = DietDeduplicator()
+        deduplicator.add_all(diets, file_path)
+        new_diets, sources, _ = split_known_diets(deduplicator, self.results_store)
+
+        # Один снимок моделей на файл: версия в базе совпадает с версией прогноза
+        snapshot = self.predictor.snapshot
+        features = self.predictor.featurize(new_diets)
+        predictions = self.predictor.predict_batch(new_diets, features, snapshot)
+        self.results_store.append_results(file_path, content_hash, new_diets, predictions,
+                                          features=features, model_version=snapshot.version,
+                                          sources=sources)
+        self._seen_hashes.add(content_hash)
+
+        elapsed = time.perf_counter() - started
+        print(f"✅ {os.path.basename(file_path)}: рационов {len(diets)}, новых уникальных {len(new_diets)}, "
+              f"оценено за {elapsed:.3f} с")
+        return len(new_diets)
+
+    def poll_once(self) -> int:
+        """Обрабатывает все готовые файлы за один проход"""
+        processed = 0
+        self.predictor.check_for_update()
+        for file_path in self.scan():
+            try:
+                processed += self.process_file(file_path)
+            except Exception as e:
+                print(f"❌ Ошибка обработки {file_path}: {e}")
+        return processed
+
+    def run_forever(self):
+        """Цикл опроса папки до вызова stop()"""
+        print(f"👀 Отслеживание папки: {self.inbox_dir}")
+        while not self._stop_event.is_set():
+            self.poll_once()
+            self._stop_event.wait(self.poll_interval)
+
+    def stop(self):
+        """Останавливает цикл опроса"""
+        self._stop_event.set()
@@ -0,0 +1,91 @@
+# services/live_prediction.py
+from typing import Dict, Optional
+
+import numpy as np
+
+from ..models.diet import Diet
+from ..models.fatty_acid import PredictionResult
+from .explanation import PredictionExplanation
+
+
+class LivePrediction:
+    """Прогноз одного рациона, пересчитываемый по изменениям отдельных компонентов.
+
+    Хранит суммы, из которых DietFeaturizer собирает признаки: количества
+    по столбцам признаков и суммы нутриентов и СВ по библиотеке кормов.
+    Изменение компонента сдвигает эти суммы на дельту, после чего признаки
+    и кислоты пересчитываются за O(признаки x кислоты) - независимо от
+    числа компонентов рациона. Результат совпадает с predictor.predict.
+    """
+
+    def __init__(self, predictor, diet: Diet):
+        self.predictor = predictor
+        self.featurizer = predictor.featurizer
+        self.snapshot = predictor.snapshot
+        self.diet = diet
+
+        n_features = len(self.featurizer.features)
+        self.direct = np.zeros(n_features)
+        # Сколько ненулевых компонентов в каждом столбце: пустой столбец обнуляется точно,
+        # без остатка от сложения дельт (от него зависит выбор прямого значения нутриента)
+        self.direct_counts = np.zeros(n_features, dtype=int)
+
+        # Суммы по столбцам featurizer.nutrient_as_fed: нутриенты модели и СВ
+        self.as_fed = self.featurizer.nutrient_as_fed()
+        self.library = self.featurizer.feed_library if self.as_fed is not None else None
+        self.totals = np.zeros(self.as_fed.shape[1]) if self.as_fed is not None else None
+        self._as_fed_rows: Dict[str, Optional[np.ndarray]] = {}
+
+        self.amounts: Dict[str, float] = {}
+        for comp_name, component in diet.components.items():
+            self.set_amount(comp_name, component.amount)
+
+    def _as_fed_row(self, comp_name: str) -> Optional[np.ndarray]:
+        try:
+            return self._as_fed_rows[comp_name]
+        except KeyError:
+            row = self.library.ingredient_row(comp_name)
+            dense = self.as_fed[row].toarray().ravel() if row is not None else None
+            self._as_fed_rows[comp_name] = dense
+            return dense
+
+    def set_amount(self, comp_name: str, amount: float):
+        """Новое количество компонента, кг (0 - компонент убран)"""
+        old = self.amounts.get(comp_name, 0.0)
+        delta = amount - old
+        if amount:
+            self.amounts[comp_name] = amount
+        else:
+            self.amounts.pop(comp_name, None)
+        if not delta:
+            return
+
+        column = self.featurizer.component_column(comp_name)
+        if column is not None:
+            self.direct_counts[column] += (amount != 0) - (old != 0)
+            self.direct[column] = self.direct[column] + delta if self.direct_counts[column] else 0.0
+
+        if self.library is not None:
+            as_fed = self._as_fed_row(comp_name)
+            if as_fed is not None:
+                self.totals += delta * as_fed
+
+    def features(self) -> np.ndarray:
+        """Вектор признаков (как DietFeaturizer.featurize_diet)"""
+        features = self.direct.copy()
+        if self.totals is not None:
+            self.featurizer.blend_nutrients(features, self.totals)
+        return features
+
+    def values(self) -> np.ndarray:
+        """Значения кислот в порядке snapshot.acids"""
+        return self.features() @ self.snapshot.weights.T + self.snapshot.intercepts
+
+    def explanation(self) -> PredictionExplanation:
+        """Вклады признаков в текущий прогноз"""
+        return self.predictor.explain_features(self.features(), self.snapshot)
+
+    def prediction(self) -> PredictionResult:
+        if not self.snapshot.acid_models:
+            return self.predictor._generate_fallback_prediction(self.diet)
+        return self.predictor.result_from_values(self.snapshot.acids, self.values())
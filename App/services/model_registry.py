@@ -0,0 +1,193 @@
+# services/model_registry.py
+import hashlib
+import json
+import os
+import pickle
+import shutil
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from ..utils.config import AppConfig
+from .trainer import METRICS_FILE, write_model_files
+
+MANIFEST_FILE = 'manifest.json'
+CURRENT_FILE = 'CURRENT'
+# Модели, поставляемые с приложением
+SHIPPED_MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models', 'linear_models')
+
+
+class ModelValidationError(ValueError):
+    """Версия моделей повреждена или не подходит приложению"""
+
+
+@dataclass(frozen=True)
+class ModelSnapshot:
+    """Неизменяемый набор моделей одной версии.
+
+    Прогнозы берут ссылку на снимок один раз, поэтому замена версии
+    не может смешать коэффициенты разных версий в одном вызове.
+    """
+    version: str
+    acid_models: Dict[str, object]
+    acids: List[str]
+    weights: np.ndarray
+    intercepts: np.ndarray
+
+
+def make_snapshot(version: str, acid_models: Dict[str, object], acid_order: List[str],
+                  n_features: int) -> ModelSnapshot:
+    """Собирает снимок: коэффициенты всех моделей в одной матрице (кислоты x признаки)"""
+    acids = [acid for acid in acid_order if acid in acid_models]
+    acids += [acid for acid in acid_models if acid not in acids]
+    weights = np.zeros((len(acids), n_features))
+    intercepts = np.zeros(len(acids))
+    for i, acid_name in enumerate(acids):
+        model = acid_models[acid_name]
+        coef = np.asarray(model.coef_, dtype=float).ravel()
+        weights[i, :len(coef)] = coef
+        intercepts[i] = float(model.intercept_)
+    return ModelSnapshot(version, acid_models, acids, weights, intercepts)
+
+
+def _sha256(payload: bytes) -> str:
+    return hashlib.sha256(payload).hexdigest()
+
+
+class ModelRegistry:
+    """Версионированное хранилище моделей кислот.
+
+    Каждая версия - папка с *_model.pkl и manifest.json (кислоты, признаки,
+    размерности и sha256 файлов). Папка версии появляется переименованием
+    целиком, а указатель CURRENT заменяется атомарно, поэтому недокопированная
+    версия никогда не становится текущей.
+    """
+
+    def __init__(self, root: str = AppConfig.MODEL_REGISTRY_DIR):
+        self.root = root
+
+    def versions(self) -> List[str]:
+        """Версии с манифестом, от старых к новым"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if not name.startswith('.') and os.path.exists(os.path.join(self.root, name, MANIFEST_FILE))
+        )
+
+    def current_version(self) -> Optional[str]:
+        """Текущая версия по указателю CURRENT"""
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE), 'r', encoding='utf-8') as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def metrics_path(self, version: str) -> Optional[str]:
+        """metrics.json тренера для версии: из папки версии или у поставляемых моделей"""
+        if version in self.versions():
+            path = os.path.join(self.root, version, METRICS_FILE)
+        else:
+            path = os.path.join(SHIPPED_MODELS_DIR, METRICS_FILE)
+        return path if os.path.exists(path) else None
+
+    def set_current(self, version: str):
+        """Атомарно переключает указатель CURRENT на версию"""
+        self.load(version)
+        tmp_path = os.path.join(self.root, CURRENT_FILE + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(version)
+        os.replace(tmp_path, os.path.join(self.root, CURRENT_FILE))
+        print(f"📌 Текущая версия моделей: {version}")
+
+    def publish_weights(self, acids: List[str], weights: np.ndarray, intercepts: np.ndarray,
+                        version: Optional[str] = None, make_current: bool = True) -> str:
+        """Публикует модели из матрицы весов (признаки x кислоты)"""
+        version = version or datetime.now().strftime('v%Y%m%d_%H%M%S_%f')
+        staging = os.path.join(self.root, f'.{version}.tmp')
+        shutil.rmtree(staging, ignore_errors=True)
+        write_model_files(staging, acids, weights, intercepts)
+        return self._commit_version(staging, version, make_current)
+
+    def import_directory(self, models_dir: str, version: Optional[str] = None,
+                         make_current: bool = True) -> str:
+        """Регистрирует папку *_model.pkl (например, app/models/linear_models) как версию"""
+        version = version or datetime.now().strftime('v%Y%m%d_%H%M%S_%f')
+        staging = os.path.join(self.root, f'.{version}.tmp')
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        for file_name in os.listdir(models_dir):
+            # Метрики тренера едут вместе с моделями: по ним считается разброс прогноза
+            if file_name.endswith('_model.pkl') or file_name == METRICS_FILE:
+                shutil.copy2(os.path.join(models_dir, file_name), staging)
+        return self._commit_version(staging, version, make_current)
+
+    def _commit_version(self, staging: str, version: str, make_current: bool) -> str:
+        manifest = {
+            'version': version,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'features': list(AppConfig.MODEL_FEATURES),
+            'acids': {},
+        }
+        for file_name in sorted(os.listdir(staging)):
+            if not file_name.endswith('_model.pkl'):
+                continue
+            with open(os.path.join(staging, file_name), 'rb') as f:
+                payload = f.read()
+            model = pickle.loads(payload)
+            manifest['acids'][file_name[:-len('_model.pkl')]] = {
+                'file': file_name,
+                'sha256': _sha256(payload),
+                'n_features': len(np.ravel(model.coef_)),
+            }
+        if not manifest['acids']:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise ModelValidationError(f"Нет моделей для версии {version}")
+
+        with open(os.path.join(staging, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=4)
+        os.replace(staging, os.path.join(self.root, version))
+        print(f"📦 Зарегистрирована версия моделей {version}: {len(manifest['acids'])} кислот")
+
+        if make_current:
+            self.set_current(version)
+        return version
+
+    def load(self, version: str, features: Optional[List[str]] = None) -> Dict[str, object]:
+        """Загружает модели версии, проверяя манифест, контрольные суммы и размерности"""
+        features = list(features or AppConfig.MODEL_FEATURES)
+        version_dir = os.path.join(self.root, version)
+        try:
+            with open(os.path.join(version_dir, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ModelValidationError(f"Нет манифеста версии {version}: {e}")
+
+        manifest_features = manifest.get('features', [])
+        if manifest_features != features[:len(manifest_features)]:
+            raise ModelValidationError(f"Признаки версии {version} не совпадают с признаками приложения")
+
+        acid_models = {}
+        for acid_name, entry in manifest.get('acids', {}).items():
+            model_path = os.path.join(version_dir, entry['file'])
+            try:
+                with open(model_path, 'rb') as f:
+                    payload = f.read()
+            except OSError:
+                raise ModelValidationError(f"Нет файла модели {acid_name} в версии {version}")
+            if _sha256(payload) != entry['sha256']:
+                raise ModelValidationError(f"Контрольная сумма модели {acid_name} не совпадает ({version})")
+
+            model = pickle.loads(payload)
+            n_features = len(np.ravel(getattr(model, 'coef_', [])))
+            if n_features != entry['n_features'] or not 0 < n_features <= len(features):
+                raise ModelValidationError(
+                    f"Модель {acid_name} ожидает {n_features} признаков, доступно {len(features)}"
+                )
+            acid_models[acid_name] = model
+
+        if not acid_models:
+            raise ModelValidationError(f"В версии {version} нет моделей")
+        return acid_models
@@ -0,0 +1,141 @@
+# services/model_selection.py
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .trainer import kfold_indices, regression_metrics
+
+DEFAULT_ALPHAS = (0.0, 0.01, 0.1, 1.0, 10.0, 100.0, 1000.0)
+
+
+class RidgePathEvaluator:
+    """Точные LOO / k-fold ошибки линейной и ridge-регрессии в замкнутой форме.
+
+    Одно SVD центрированной матрицы X дает сглаживающую матрицу
+    H(alpha) = 11'/n + U diag(s^2 / (s^2 + alpha)) U' для всех alpha сразу,
+    поэтому весь путь регуляризации для всех кислот считается без переобучения.
+    """
+
+    def __init__(self, X: np.ndarray, Y: np.ndarray, rcond: float = 1e-10):
+        self.X = np.asarray(X, dtype=float)
+        self.Y = np.asarray(Y, dtype=float)
+        self.n_rows = len(self.X)
+
+        self.y_mean = self.Y.mean(axis=0)
+        Xc = self.X - self.X.mean(axis=0)
+        U, s, _ = np.linalg.svd(Xc, full_matrices=False)
+        keep = s > rcond * (s[0] if len(s) else 0.0)
+        self.U = U[:, keep]
+        self.s2 = s[keep] ** 2
+        self.UtY = self.U.T @ (self.Y - self.y_mean)
+        self.U2 = self.U ** 2
+
+    def _shrinkage(self, alphas: Sequence[float]) -> np.ndarray:
+        """Множители s^2 / (s^2 + alpha): (alphas x компоненты)"""
+        alphas = np.asarray(alphas, dtype=float)[:, None]
+        return self.s2[None, :] / (self.s2[None, :] + alphas)
+
+    def fitted(self, alphas: Sequence[float]) -> np.ndarray:
+        """Предсказания на обучающей выборке: (alphas x строки x кислоты)"""
+        d = self._shrinkage(alphas)
+        return self.y_mean + np.einsum('nr,ar,rt->ant', self.U, d, self.UtY)
+
+    def hat_diagonal(self, alphas: Sequence[float]) -> np.ndarray:
+        """Диагональ сглаживающей матрицы: (alphas x строки)"""
+        return 1.0 / self.n_rows + self._shrinkage(alphas) @ self.U2.T
+
+    def loo_predictions(self, alphas: Sequence[float]) -> np.ndarray:
+        """Точные leave-one-out предсказания: y - (y - y_hat) / (1 - h)"""
+        residuals = self.Y[None] - self.fitted(alphas)
+        leverage = self.hat_diagonal(alphas)[:, :, None]
+        return self.Y[None] - residuals / (1.0 - leverage)
+
+    def kfold_predictions(self, alphas: Sequence[float], n_folds: int = 5,
+                          random_state: int = 42) -> np.ndarray:
+        """Точные k-fold предсказания: e_k = (I - H_kk)^-1 (y_k - y_hat_k)"""
+        d = self._shrinkage(alphas)
+        residuals = self.Y[None] - self.fitted(alphas)
+        predictions = np.empty_like(residuals)
+        for test_idx in kfold_indices(self.n_rows, n_folds, random_state):
+            U_k = self.U[test_idx]
+            for a in range(len(d)):
+                H_kk = 1.0 / self.n_rows + (U_k * d[a]) @ U_k.T
+                fold_residuals = np.linalg.solve(np.eye(len(test_idx)) - H_kk, residuals[a, test_idx])
+                predictions[a, test_idx] = self.Y[test_idx] - fold_residuals
+        return predictions
+
+    def baseline_predictions(self, method: str = 'loo', n_folds: int = 5,
+                             random_state: int = 42) -> np.ndarray:
+        """Предсказания базовой модели (среднее по обучающей части)"""
+        if method == 'loo':
+            return self.Y - (self.Y - self.y_mean) * self.n_rows / (self.n_rows - 1)
+        predictions = np.empty_like(self.Y)
+        for test_idx in kfold_indices(self.n_rows, n_folds, random_state):
+            train_mask = np.ones(self.n_rows, dtype=bool)
+            train_mask[test_idx] = False
+            predictions[test_idx] = self.Y[train_mask].mean(axis=0)
+        return predictions
+
+    def evaluate(self, acids: List[str], alphas: Sequence[float] = DEFAULT_ALPHAS,
+                 method: str = 'loo', n_folds: int = 5, random_state: int = 42) -> Dict[str, 'object']:
+        """Метрики всего пути alpha для всех кислот в формате compare_models из ноутбука"""
+        import pandas as pd
+
+        if method == 'loo':
+            path_predictions = self.loo_predictions(alphas)
+        elif method == 'kfold':
+            path_predictions = self.kfold_predictions(alphas, n_folds, random_state)
+        else:
+            raise ValueError(f"Неизвестный метод валидации: {method}")
+
+        path_metrics = [regression_metrics(self.Y, predictions) for predictions in path_predictions]
+        baseline_metrics = regression_metrics(self.Y, self.baseline_predictions(method, n_folds, random_state))
+
+        names = [self._model_name(alpha) for alpha in alphas] + ["Baseline(mean)"]
+        all_metrics = path_metrics + [baseline_metrics]
+
+        results = {}
+        for t, acid in enumerate(acids):
+            df = pd.DataFrame({
+                "Model": names,
+                "R2": [m['R2'][t] for m in all_metrics],
+                "MAE": [m['MAE'][t] for m in all_metrics],
+                "MAPE(%)": [m['MAPE_percent'][t] for m in all_metrics],
+            })
+            df["Winner"] = ""
+            if df["R2"].notna().any():
+                df.loc[df["R2"].idxmax(), "Winner"] += "R2 "
+            df.loc[df["MAE"].idxmin(), "Winner"] += "MAE "
+            if df["MAPE(%)"].notna().any():
+                df.loc[df["MAPE(%)"].idxmin(), "Winner"] += "MAPE"
+            df["Winner"] = df["Winner"].str.strip()
+            results[acid] = df
+        return results
+
+    def best_alpha(self, alphas: Sequence[float] = DEFAULT_ALPHAS, method: str = 'loo',
+                   n_folds: int = 5, random_state: int = 42,
+                   per_acid: bool = False) -> np.ndarray:
+        """Alpha с наименьшей CV-ошибкой (общий для всех кислот или по каждой)"""
+        if method == 'loo':
+            predictions = self.loo_predictions(alphas)
+        else:
+            predictions = self.kfold_predictions(alphas, n_folds, random_state)
+        mse = ((predictions - self.Y[None]) ** 2).mean(axis=1)
+        alphas = np.asarray(alphas, dtype=float)
+        if per_acid:
+            return alphas[mse.argmin(axis=0)]
+        # Общий alpha: минимальная суммарная ошибка, нормированная на дисперсию кислоты
+        variance = self.Y.var(axis=0)
+        scaled = mse / np.where(variance > 0, variance, 1.0)
+        return alphas[scaled.sum(axis=1).argmin()]
+
+    @staticmethod
+    def _model_name(alpha: float) -> str:
+        return "LinearRegression" if alpha == 0 else f"Ridge(alpha={alpha:g})"
+
+
+def evaluate_ridge_path(X: np.ndarray, Y: np.ndarray, acids: List[str],
+                        alphas: Optional[Sequence[float]] = None, method: str = 'loo',
+                        n_folds: int = 5, random_state: int = 42) -> Dict[str, 'object']:
+    """Оценивает путь регуляризации для всех кислот (см. RidgePathEvaluator)"""
+    return RidgePathEvaluator(X, Y).evaluate(acids, alphas or DEFAULT_ALPHAS, method, n_folds, random_state)
@@ -0,0 +1,149 @@
+# services/name_matcher.py
+import re
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from scipy import sparse
+
+
+def clean_name(name) -> str:
+    """Нормализация названия рациона (как clean_name в ноутбуке)"""
+    # убираем скобки и содержимое, лишние пробелы и спецсимволы
+    name = re.sub(r'\(.*?\)', '', str(name))
+    name = re.sub(r'[^а-яА-Яa-zA-Z0-9_\.\s-]', '', name)
+    name = re.sub(r'\s+', ' ', name)
+    return name.strip().lower()
+
+
+def split_mix_name(raw_name: str) -> List[str]:
+    """Части смешанного рациона "А + Б" (не больше двух, как в ноутбуке)"""
+    parts = [p.strip() for p in str(raw_name).split('+') if p.strip()]
+    if len(parts) < 2:
+        parts = [p.strip() for p in re.split(r'\+|/', str(raw_name)) if p.strip()]
+    return parts[:2]
+
+
+@dataclass
+class NameMatch:
+    """Кандидат сопоставления: позиция в справочнике, исходное имя и похожесть 0..1"""
+    index: int
+    name: str
+    score: float
+
+
+class RationNameMatcher:
+    """Нечеткий поиск названий рационов по инвертированному индексу символьных n-грамм.
+
+    Кандидаты отбираются по общим n-граммам (разреженное произведение
+    затрагивает только списки вхождений n-грамм запроса), и лишь короткий
+    список переоценивается SequenceMatcher - той же мерой, что у
+    difflib.get_close_matches, поэтому пороги из ноутбука сохраняют смысл.
+    """
+
+    def __init__(self, names: Iterable[str], ngram: int = 3, shortlist: int = 10):
+        self.names = [str(name) for name in names]
+        self.clean_names = [clean_name(name) for name in self.names]
+        self.ngram = ngram
+        self.shortlist = shortlist
+
+        self._exact: Dict[str, int] = {}
+        for i, name in enumerate(self.clean_names):
+            self._exact.setdefault(name, i)
+
+        self._vocabulary: Dict[str, int] = {}
+        self._index = self._ngram_matrix(self.clean_names, grow=True).T.tocsr()
+        self._sizes = np.asarray(self._index.sum(axis=0)).ravel()
+
+    def _ngrams(self, name: str) -> set:
+        padded = f' {name} '
+        if len(padded) <= self.ngram:
+            return {padded}
+        return {padded[i:i + self.ngram] for i in range(len(padded) - self.ngram + 1)}
+
+    def _ngram_matrix(self, names: List[str], grow: bool = False) -> sparse.csr_matrix:
+        """Бинарная матрица (имена x n-граммы); неизвестные n-граммы запросов пропускаются"""
+        indptr, indices = [0], []
+        for name in names:
+            for gram in self._ngrams(name):
+                column = self._vocabulary.get(gram)
+                if column is None and grow:
+                    column = self._vocabulary[gram] = len(self._vocabulary)
+                if column is not None:
+                    indices.append(column)
+            indptr.append(len(indices))
+        data = np.ones(len(indices), dtype=np.float32)
+        return sparse.csr_matrix((data, indices, indptr), shape=(len(names), len(self._vocabulary)))
+
+    def match(self, query: str, limit: int = 1, cutoff: float = 0.5) -> List[NameMatch]:
+        """Лучшие кандидаты для одного названия"""
+        return self.match_many([query], limit, cutoff)[0]
+
+    def match_many(self, queries: Iterable[str], limit: int = 1, cutoff: float = 0.5) -> List[List[NameMatch]]:
+        """Пакетный поиск: одно разреженное произведение на все запросы"""
+        cleaned = [clean_name(query) for query in queries]
+        results: List[Optional[List[NameMatch]]] = [None] * len(cleaned)
+
+        # Точные совпадения после нормализации не требуют поиска
+        pending = []
+        for row, query in enumerate(cleaned):
+            exact = self._exact.get(query)
+            if exact is not None:
+                results[row] = [NameMatch(exact, self.names[exact], 1.0)]
+            else:
+                pending.append(row)
+
+        if pending and self.names:
+            unique_queries = list(dict.fromkeys(cleaned[row] for row in pending))
+            query_matrix = self._ngram_matrix(unique_queries)
+            shared = (query_matrix @ self._index).tocsr()
+            query_sizes = np.array([len(self._ngrams(query)) for query in unique_queries])
+
+            found: Dict[str, List[NameMatch]] = {}
+            for q, query in enumerate(unique_queries):
+                start, end = shared.indptr[q], shared.indptr[q + 1]
+                candidates = shared.indices[start:end]
+                if len(candidates) == 0:
+                    found[query] = []
+                    continue
+                # Коэффициент Дайса по n-граммам - грубый отбор короткого списка
+                dice = 2 * shared.data[start:end] / (query_sizes[q] + self._sizes[candidates])
+                top = candidates[np.argsort(-dice, kind='stable')[:max(self.shortlist, limit)]]
+
+                matcher = SequenceMatcher(b=query)
+                scored = []
+                for i in top:
+                    matcher.set_seq1(self.clean_names[i])
+                    score = matcher.ratio()
+                    if score >= cutoff:
+                        scored.append(NameMatch(int(i), self.names[i], score))
+                scored.sort(key=lambda m: -m.score)
+                found[query] = scored[:limit]
+
+            for row in pending:
+                results[row] = found.get(cleaned[row], [])
+
+        return [result or [] for result in results]
+
+    def resolve(self, raw_names: Iterable[str], cutoff: float = 0.5) -> List[List[int]]:
+        """Позиции рационов справочника для названий из лабораторного файла.
+
+        Смешанные рационы "А + Б" разбираются на две части (как в
+        create_training_dataset); если хоть одна часть не найдена,
+        для строки возвращается пустой список.
+        """
+        raw_names = [str(name) for name in raw_names]
+        parts_per_row = [split_mix_name(name) if '+' in name else [name] for name in raw_names]
+        flat = [part for parts in parts_per_row for part in parts]
+        matches = self.match_many(flat, limit=1, cutoff=cutoff)
+
+        resolved, position = [], 0
+        for parts in parts_per_row:
+            row_matches = matches[position:position + len(parts)]
+            position += len(parts)
+            if all(row_matches):
+                resolved.append([m[0].index for m in row_matches])
+            else:
+                resolved.append([])
+        return resolved
@@ -0,0 +1,169 @@
+# services/online_learner.py
+import os
+from typing import List, Optional
+
+import numpy as np
+
+from ..utils.config import AppConfig
+from .model_registry import SHIPPED_MODELS_DIR, ModelRegistry, make_snapshot
+
+
+class OnlineAcidLearner:
+    """Инкрементальное дообучение линейных моделей по новым лабораторным анализам.
+
+    Для каждой кислоты хранятся достаточные статистики Z'Z и Z'y, где
+    Z = [1, X]. Новый анализ обновляет их за O(признаки^2) на кислоту;
+    кислоты, которых нет в анализе (NaN), не затрагиваются. Новое состояние
+    стоит засеять обучающей выборкой (partial_fit): кислота публикуется
+    только при числе анализов больше числа коэффициентов (min_samples).
+    """
+
+    def __init__(self, acids: List[str], features: Optional[List[str]] = None, alpha: float = 0.0):
+        self.acids = list(acids)
+        self.features = list(features or AppConfig.MODEL_FEATURES)
+        self.alpha = alpha
+        size = len(self.features) + 1
+        self.gram = np.zeros((len(self.acids), size, size))
+        self.moment = np.zeros((len(self.acids), size))
+        self.counts = np.zeros(len(self.acids), dtype=np.int64)
+
+    def partial_fit(self, X: np.ndarray, Y: np.ndarray, acids: Optional[List[str]] = None) -> int:
+        """Добавляет анализы (строки X, Y) в статистики; возвращает число учтенных строк.
+
+        acids - порядок колонок Y, если он отличается от порядка кислот обучателя.
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        Y = np.atleast_2d(np.asarray(Y, dtype=float))
+        if acids is not None and list(acids) != self.acids:
+            column = {acid: i for i, acid in enumerate(acids)}
+            Y = np.column_stack([
+                Y[:, column[acid]] if acid in column else np.full(len(Y), np.nan)
+                for acid in self.acids
+            ])
+        Z = np.hstack([np.ones((len(X), 1)), X])
+        observed = ~np.isnan(Y)
+        Y = np.where(observed, Y, 0.0)
+        mask = observed.astype(float)
+
+        # Сумма z z' по строкам с известным значением кислоты, для всех кислот сразу
+        self.gram += np.einsum('nt,ni,nj->tij', mask, Z, Z)
+        self.moment += np.einsum('nt,ni->ti', mask * Y, Z)
+        self.counts += observed.sum(axis=0)
+        return int(observed.any(axis=1).sum())
+
+    @property
+    def min_samples(self) -> int:
+        """Минимум анализов кислоты для решения: признаки + свободный член + 1"""
+        return len(self.features) + 2
+
+    @property
+    def solvable(self) -> np.ndarray:
+        """Маска кислот с достаточным числом анализов"""
+        return self.counts >= self.min_samples
+
+    def update(self, x: np.ndarray, y: np.ndarray):
+        """Учитывает один новый анализ"""
+        self.partial_fit(np.asarray(x, dtype=float)[None], np.asarray(y, dtype=float)[None])
+
+    def solve(self):
+        """Текущие веса (признаки x кислоты) и свободные члены по статистикам (нули для кислот без min_samples)"""
+        size = len(self.features) + 1
+        penalty = self.alpha * np.eye(size)
+        penalty[0, 0] = 0.0  # свободный член не штрафуется
+        weights = np.zeros((size - 1, len(self.acids)))
+        intercepts = np.zeros(len(self.acids))
+        for t in range(len(self.acids)):
+            if self.counts[t] < self.min_samples:
+                continue
+            beta, *_ = np.linalg.lstsq(self.gram[t] + penalty, self.moment[t], rcond=None)
+            intercepts[t] = beta[0]
+            weights[:, t] = beta[1:]
+        return weights, intercepts
+
+    def save_state(self, path: str = AppConfig.ONLINE_STATE_PATH):
+        """Сохраняет статистики в .npz (атомарной заменой файла)"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, acids=np.array(self.acids), features=np.array(self.features),
+                     alpha=self.alpha, gram=self.gram, moment=self.moment, counts=self.counts)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load_state(cls, path: str = AppConfig.ONLINE_STATE_PATH) -> Optional['OnlineAcidLearner']:
+        """Загружает статистики; None, если состояния еще нет"""
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as state:
+            learner = cls(list(state['acids']), list(state['features']), float(state['alpha']))
+            learner.gram = state['gram']
+            learner.moment = state['moment']
+            learner.counts = state['counts']
+        return learner
+
+    def publish(self, registry: Optional[ModelRegistry] = None, predictor=None) -> str:
+        """Публикует новую версию моделей в реестре и делает ее текущей.
+
+        Кислоты с недостаточным числом анализов берутся из текущей версии
+        (реестр, предиктор или модели приложения), поэтому набор кислот не
+        сокращается. Если дообучить нельзя ни одну кислоту, версия не
+        публикуется (ValueError). Работающие процессы подхватывают версию
+        через LinearAcidPredictor.check_for_update; если передан predictor,
+        его перезагрузка запускается сразу.
+        """
+        registry = registry or ModelRegistry()
+        solvable = self.solvable
+        if not solvable.any():
+            raise ValueError(
+                f"Недостаточно анализов для дообучения: нужно не меньше {self.min_samples} на кислоту, "
+                f"есть {int(self.counts.max()) if len(self.counts) else 0}"
+            )
+        weights, intercepts = self.solve()
+
+        current = self._current_snapshot(registry, predictor)
+        current_columns = {acid: i for i, acid in enumerate(current.acids)}
+        acids, columns, kept = [], [], []
+        for t, acid in enumerate(self.acids):
+            if solvable[t]:
+                acids.append(acid)
+                columns.append((weights[:, t], intercepts[t]))
+            elif acid in current_columns:
+                i = current_columns[acid]
+                acids.append(acid)
+                columns.append((current.weights[i], current.intercepts[i]))
+                kept.append(acid)
+        # Кислоты текущей версии, которых обучатель не знает, тоже сохраняются
+        for acid, i in current_columns.items():
+            if acid not in self.acids:
+                acids.append(acid)
+                columns.append((current.weights[i], current.intercepts[i]))
+                kept.append(acid)
+        if kept:
+            print(f"ℹ️ Без дообучения (мало анализов), модели текущей версии: {', '.join(kept)}")
+
+        version = registry.publish_weights(
+            acids, np.column_stack([w for w, _ in columns]), np.array([b for _, b in columns])
+        )
+        print(f"📦 Модели дообучены: {int(solvable.sum())} кислот, до {int(self.counts.max())} анализов")
+
+        if predictor is not None:
+            predictor.check_for_update()
+        return version
+
+    def _current_snapshot(self, registry: ModelRegistry, predictor=None):
+        """Коэффициенты версии, которую заменяет публикация"""
+        if predictor is not None and predictor.acid_models:
+            return predictor.snapshot
+        acid_models = {}
+        version = registry.current_version()
+        if version is not None:
+            try:
+                acid_models = registry.load(version, self.features)
+            except Exception as e:
+                print(f"⚠️ Текущая версия {version} не загружена: {e}")
+        if not acid_models and os.path.isdir(SHIPPED_MODELS_DIR):
+            from .predictor import LinearAcidPredictor
+            acid_models, version = LinearAcidPredictor._load_models(SHIPPED_MODELS_DIR, [
+                name[:-len('_model.pkl')] for name in os.listdir(SHIPPED_MODELS_DIR) if name.endswith('_model.pkl')
+            ])
+        return make_snapshot(version or 'empty', acid_models, self.acids, len(self.features))
@@ -0,0 +1,140 @@
+# services/optimizer.py
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..models.diet import Diet, DietComponent
+from ..models.fatty_acid import PredictionResult
+from ..utils.config import AppConfig
+
+# Допустимое изменение каждого компонента (доля текущего количества), как в rec_engine
+MAX_CHANGE = 0.3
+
+
+@dataclass
+class OptimizationResult:
+    """Скорректированный рацион и его прогноз"""
+    diet: Diet
+    prediction: PredictionResult
+    deviation_before: float
+    deviation_after: float
+    # компонент -> (было, стало), кг
+    changes: Dict[str, Tuple[float, float]] = field(default_factory=dict)
+
+    @property
+    def improved(self) -> bool:
+        return self.deviation_after < self.deviation_before
+
+
+class DietOptimizer:
+    """Подбор количеств компонентов рациона под целевые диапазоны кислот.
+
+    Признаки-количества линейны по компонентам, нутриенты по библиотеке -
+    отношения сумм нутриентов к сумме СВ; модели кислот линейны по
+    признакам. Минимизируется сумма квадратов выходов кислот за целевые
+    диапазоны (в долях ширины диапазона) при ограничении изменения каждого
+    компонента - L-BFGS-B с точным градиентом.
+    """
+
+    def __init__(self, predictor, max_change: float = MAX_CHANGE,
+                 acids: Optional[Sequence[str]] = None):
+        self.predictor = predictor
+        self.max_change = max_change
+        self.acids = list(acids) if acids is not None else None
+
+    def _targets(self, acids: List[str]):
+        limits = [AppConfig.get_acid_targets(acid) for acid in acids]
+        lower = np.array([limit['min'] for limit in limits])
+        upper = np.array([limit['max'] for limit in limits])
+        width = np.where(upper > lower, upper - lower, 1.0)
+        return lower, upper, width
+
+    def _feature_model(self, component_names: List[str], amounts: np.ndarray):
+        """Функция (признаки, якобиан компоненты x признаки) от вектора количеств.
+
+        Прямо заданный в рационе нутриент имеет приоритет над библиотекой
+        (как в DietFeaturizer); границы не меняют знак количеств, поэтому
+        выбор источника нутриента фиксируется по исходному рациону.
+        """
+        featurizer = self.predictor.featurizer
+        n = len(component_names)
+        projection = np.zeros((n, len(featurizer.features)))
+        for i, comp_name in enumerate(component_names):
+            column = featurizer.component_column(comp_name)
+            if column is not None:
+                projection[i, column] = 1.0
+
+        feature_cols = np.array([feature_col for _, feature_col in featurizer.nutrient_columns()], dtype=int)
+        # Нутриенты и СВ компонентов на кг (столбцы featurizer.nutrient_as_fed)
+        as_fed = featurizer.nutrient_as_fed_rows(component_names)
+        if as_fed is not None:
+            from_library_nutrients = np.flatnonzero(featurizer.library_mask(amounts @ projection))
+            from_library = feature_cols[from_library_nutrients]
+
+        def model(x: np.ndarray):
+            features = x @ projection
+            jacobian = projection.copy()
+            if as_fed is not None and len(from_library):
+                totals = x @ as_fed
+                dry_matter = totals[-1]
+                if dry_matter > 0:
+                    nutrients = totals[from_library_nutrients] / dry_matter
+                    jacobian[:, from_library] = (as_fed[:, from_library_nutrients]
+                                                 - np.outer(as_fed[:, -1], nutrients)) / dry_matter
+                else:
+                    nutrients = np.zeros(len(from_library))
+                    jacobian[:, from_library] = 0.0
+                features[from_library] = nutrients
+            return features, jacobian
+
+        return model
+
+    def deviation(self, values: np.ndarray, acids: List[str]) -> float:
+        """Суммарный квадрат выхода за диапазоны в долях ширины диапазона"""
+        lower, upper, width = self._targets(acids)
+        outside = (values - np.clip(values, lower, upper)) / width
+        return float(np.sum(outside ** 2))
+
+    def optimize(self, diet: Diet) -> OptimizationResult:
+        from scipy.optimize import minimize
+
+        names = list(diet.components.keys())
+        amounts = np.array([diet.components[name].amount for name in names], dtype=float)
+        snapshot = self.predictor.snapshot
+        columns = [i for i, acid in enumerate(snapshot.acids) if self.acids is None or acid in self.acids]
+        acids = [snapshot.acids[i] for i in columns]
+        weights, intercepts = snapshot.weights[columns], snapshot.intercepts[columns]
+        lower, upper, width = self._targets(acids)
+        feature_model = self._feature_model(names, amounts)
+
+        def objective(x):
+            features, jacobian = feature_model(x)
+            values = weights @ features + intercepts
+            residual = (values - np.clip(values, lower, upper)) / width
+            return float(np.sum(residual ** 2)), jacobian @ (weights.T @ (2 * residual / width))
+
+        bounds = [(max(0.0, a * (1 - self.max_change)), a * (1 + self.max_change)) for a in amounts]
+        before = objective(amounts)[0]
+        if names and before > 0:
+            solution = minimize(objective, amounts, jac=True, method='L-BFGS-B', bounds=bounds)
+            optimized = np.round(solution.x, 2)
+        else:
+            optimized = amounts
+
+        new_diet = Diet(
+            diet_id=diet.diet_id,
+            name=f"{diet.name} (оптимизирован)",
+            components={
+                name: DietComponent(name, float(amount), diet.components[name].unit)
+                for name, amount in zip(names, optimized)
+            },
+        )
+        prediction = self.predictor.predict(new_diet)
+        after = self.deviation(np.array([prediction.acids[acid].predicted_value for acid in acids]), acids)
+        changes = {
+            name: (float(old), float(new))
+            for name, old, new in zip(names, amounts, optimized)
+            if abs(new - old) >= 0.01
+        }
+        return OptimizationResult(new_diet, prediction, before, after, changes)
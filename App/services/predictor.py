@@ -1,13 +1,24 @@
 # services/predictor.py
+import hashlib
 import os
 import pickle
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 import numpy as np
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 from ..models.diet import Diet
 from ..models.fatty_acid import AcidPrediction, PredictionResult
+from ..utils.config import AppConfig
+from .explanation import TOP_DRIVERS, PredictionExplanation
+from .featurizer import DietFeaturizer
+from .model_registry import ModelRegistry, ModelSnapshot, ModelValidationError, make_snapshot
+
+# Сколько последних прогнозов (версия моделей, состав рациона) держать в кэше
+PREDICTION_CACHE_SIZE = 1024
 
 class LinearAcidPredictor:
-    def __init__(self):
+    def __init__(self, registry: Optional[ModelRegistry] = None):
         self.ALL_ACIDS = self._discover_available_acids()
 
         project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -16,30 +27,127 @@ class LinearAcidPredictor:
         
         print(f"Ищем линейные модели в: {models_dir}")
         
-        self.acid_models: Dict[str, object] = {}
+        self.featurizer = DietFeaturizer()
+        self.registry = registry or ModelRegistry()
+        self._snapshot = make_snapshot('fallback', {}, self.ALL_ACIDS, len(self.featurizer.features))
+        self._cache: OrderedDict = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._reload_executor: Optional[ThreadPoolExecutor] = None
+        # Версия CURRENT, не прошедшая проверку: повторно не загружается, пока CURRENT не сменится
+        self._rejected_version: Optional[str] = None
+        self._pending_reload: Optional[Tuple[str, Future]] = None
         
         try:
             with open(components_path, 'rb') as f:
                 self.expected_components = pickle.load(f)
-                
-            for acid_name in self.ALL_ACIDS:
-                model_path = os.path.join(models_dir, f'{acid_name}_model.pkl')
-                if os.path.exists(model_path):
-                    with open(model_path, 'rb') as f:
-                        self.acid_models[acid_name] = pickle.load(f)
-                    print(f"✅ Модель для {acid_name} загружена")
-                else:
-                    print(f"⚠️ Модель для {acid_name} не найдена: {model_path}")
             
-            print(f"✅ Загружено {len(self.acid_models)} линейных моделей")
+            # Текущая версия из реестра важнее моделей, поставляемых с приложением
+            current = self.registry.current_version()
+            if current is not None:
+                try:
+                    self.install_models(self.registry.load(current, self.featurizer.features), current)
+                except ModelValidationError as e:
+                    self._rejected_version = current
+                    print(f"❌ Версия моделей {current} отклонена: {e}")
+            if not self.acid_models:
+                acid_models, model_version = self._load_models(models_dir, self.ALL_ACIDS)
+                self.install_models(acid_models, model_version)
+            print(f"✅ Загружено {len(self.acid_models)} линейных моделей (версия {self.model_version})")
             
             self._check_model_dimensions()
             
         except Exception as e:
             print(f"❌ Ошибка загрузки моделей: {e}")
-            self.acid_models = {}
             self.expected_components = []
 
+    @property
+    def snapshot(self) -> ModelSnapshot:
+        """Текущий снимок моделей (читается одной ссылкой)"""
+        return self._snapshot
+
+    @property
+    def acid_models(self) -> Dict[str, object]:
+        return self._snapshot.acid_models
+
+    @property
+    def model_version(self) -> str:
+        return self._snapshot.version
+
+    @staticmethod
+    def _load_models(models_dir: str, acids: List[str]):
+        """Загружает модели кислот из папки; версия - короткий хэш содержимого файлов"""
+        acid_models: Dict[str, object] = {}
+        version_hash = hashlib.sha256()
+        for acid_name in sorted(acids):
+            model_path = os.path.join(models_dir, f'{acid_name}_model.pkl')
+            if os.path.exists(model_path):
+                with open(model_path, 'rb') as f:
+                    payload = f.read()
+                acid_models[acid_name] = pickle.loads(payload)
+                version_hash.update(acid_name.encode('utf-8'))
+                version_hash.update(payload)
+                print(f"✅ Модель для {acid_name} загружена")
+            else:
+                print(f"⚠️ Модель для {acid_name} не найдена: {model_path}")
+        model_version = version_hash.hexdigest()[:12] if acid_models else 'fallback'
+        return acid_models, model_version
+
+    def install_models(self, acid_models: Dict[str, object], model_version: str):
+        """Подменяет модели без перезапуска.
+
+        Снимок с матрицей коэффициентов собирается заранее и ставится одним
+        присваиванием: вызовы, уже начавшие прогноз, досчитывают на старой
+        версии, новые - на новой. Кэш прогнозов привязан к версии.
+        """
+        snapshot = make_snapshot(model_version, acid_models, self.ALL_ACIDS, len(self.featurizer.features))
+        for acid_name in snapshot.acids:
+            if acid_name not in self.ALL_ACIDS:
+                self.ALL_ACIDS.append(acid_name)
+        self._snapshot = snapshot
+        with self._cache_lock:
+            self._cache.clear()
+        print(f"🔄 Установлены модели версии {model_version}: {len(acid_models)} кислот")
+
+    def reload(self, version: Optional[str] = None) -> Future:
+        """Загружает версию из реестра (по умолчанию CURRENT) в фоне и подменяет модели.
+
+        Результат Future - True, если версия установлена. Поврежденная или
+        несовместимая версия отклоняется, текущие модели продолжают работать.
+        """
+        if self._reload_executor is None:
+            self._reload_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='model-reload')
+        return self._reload_executor.submit(self._reload, version)
+
+    def _reload(self, version: Optional[str]) -> bool:
+        version = version or self.registry.current_version()
+        if version is None or version == self.model_version:
+            return False
+        try:
+            acid_models = self.registry.load(version, self.featurizer.features)
+        except Exception as e:
+            self._rejected_version = version
+            print(f"❌ Версия моделей {version} отклонена: {e}")
+            return False
+        self._rejected_version = None
+        self.install_models(acid_models, version)
+        return True
+
+    def check_for_update(self) -> Optional[Future]:
+        """Запускает фоновую перезагрузку, если в реестре сменилась текущая версия.
+
+        Отклоненная версия не перепроверяется при каждом вызове, а уже
+        запущенная загрузка той же версии не ставится в очередь повторно.
+        """
+        current = self.registry.current_version()
+        if current is None or current == self.model_version or current == self._rejected_version:
+            return None
+        pending = self._pending_reload
+        if pending is not None and pending[0] == current and not pending[1].done():
+            return pending[1]
+        future = self.reload(current)
+        self._pending_reload = (current, future)
+        return future
+
     def _check_model_dimensions(self):
         """Проверяет размерности загруженных моделей"""
         print("\n🔍 ПРОВЕРКА РАЗМЕРНОСТЕЙ МОДЕЛЕЙ:")
@@ -52,36 +160,30 @@ class LinearAcidPredictor:
 
     def predict(self, diet: Diet) -> PredictionResult:
         """Прогнозирует уровни всех кислот с использованием отдельных линейных моделей"""
-        if not self.acid_models:
+        snapshot = self._snapshot
+        if not snapshot.acid_models:
             return self._generate_fallback_prediction(diet)
         
+        cache_key = (snapshot.version, diet.fingerprint())
+        with self._cache_lock:
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                self._cache.move_to_end(cache_key)
+                return cached
+        
         try:
             acid_predictions = {}
+            diet_features = self.featurizer.featurize_diet(diet)
             
             for acid_name in self.ALL_ACIDS:
-                if acid_name in self.acid_models:
-                    model = self.acid_models[acid_name]
+                if acid_name in snapshot.acid_models:
+                    model = snapshot.acid_models[acid_name]
                     
-                    features = self._diet_to_features_for_model(diet, model, acid_name)
+                    features = diet_features[:len(model.coef_)].reshape(1, -1)
                     
                     predicted_value = float(model.predict(features)[0])
                     
-                    limits = self._get_acid_limits(acid_name)
-                    
-                    if predicted_value < limits['min']:
-                        deviation = predicted_value - limits['min'] 
-                    elif predicted_value > limits['max']:
-                        deviation = predicted_value - limits['max']
-                    else:
-                        deviation = 0.0
-                    
-                    acid_predictions[acid_name] = AcidPrediction(
-                        name=acid_name,
-                        predicted_value=predicted_value,
-                        target_min=limits['min'],
-                        target_max=limits['max'],
-                        deviation=deviation
-                    )
+                    acid_predictions[acid_name] = self._make_prediction(acid_name, predicted_value)
                     print(f"✅ {acid_name}: {predicted_value:.2f}%")
                     
                 else:
@@ -89,7 +191,12 @@ class LinearAcidPredictor:
                     acid_predictions[acid_name] = self._create_fallback_prediction(acid_name)
                     print(f"⚠️ Для кислоты {acid_name} использовано fallback предсказание")
             
-            return PredictionResult(acids=acid_predictions)
+            result = PredictionResult(acids=acid_predictions)
+            with self._cache_lock:
+                self._cache[cache_key] = result
+                if len(self._cache) > PREDICTION_CACHE_SIZE:
+                    self._cache.popitem(last=False)
+            return result
             
         except Exception as e:
             print(f"❌ Ошибка предсказания: {e}")
@@ -102,60 +209,100 @@ class LinearAcidPredictor:
         return list(self.acid_models.keys())
 
     def _diet_to_features_for_model(self, diet: Diet, model, acid_name: str) -> np.array:
-        """Преобразует Diet в фичи для конкретной модели - УПРОЩЕННАЯ ВЕРСИЯ"""
-        features_order = [
-            'трав_сен', 'конц_зерн', 'масличн', 'жир', 'пром_отх', 
-            'мин_техно', 'сп', 'крахмал', 'andfom', 'сахар (вру)', 
-            'нву', 'ожк', 'k'
-        ]
-        
-        features = np.zeros(13)
-        
-        print(f"🔍 Преобразование для {acid_name}:")
-        print(f"   Компоненты в рационе: {list(diet.components.keys())}")
-        
-        for i, feature_name in enumerate(features_order):
-            if feature_name in diet.components:
-                amount = diet.components[feature_name].amount
-                features[i] = amount
-                print(f"   ✅ {feature_name}: {amount:.2f}")
-            else:
-                print(f"   ❌ {feature_name}: 0.0")
+        """Преобразует Diet в фичи для конкретной модели"""
+        features = self.featurizer.featurize_diet(diet)
         
         if hasattr(model, 'coef_'):
             expected_features = len(model.coef_)
-            if expected_features < 13:
+            if expected_features < len(features):
                 features = features[:expected_features]
-                print(f"🔧 Обрезано до {expected_features} признаков для модели")
         
-        print(f"📊 Итоговый вектор: {features}")
         return features.reshape(1, -1)
+
+    def featurize(self, diets: List[Diet]) -> np.ndarray:
+        """Матрица признаков (рационы x признаки) для пакетного прогноза"""
+        return self.featurizer.featurize(diets)
+
+    def _stacked_coefficients(self):
+        """Коэффициенты всех моделей в виде одной матрицы (кислоты x признаки)"""
+        snapshot = self._snapshot
+        return snapshot.acids, snapshot.weights, snapshot.intercepts
+
+    def predict_matrix(self, features: np.ndarray, snapshot: Optional[ModelSnapshot] = None):
+        """Прогноз для матрицы признаков одной операцией: (кислоты, значения рационы x кислоты)"""
+        snapshot = snapshot or self._snapshot
+        return snapshot.acids, features @ snapshot.weights.T + snapshot.intercepts
+
+    def predict_batch(self, diets: List[Diet], features: Optional[np.ndarray] = None,
+                      snapshot: Optional[ModelSnapshot] = None) -> List[PredictionResult]:
+        """Прогнозирует уровни кислот для набора рационов одним матричным умножением"""
+        if not diets:
+            return []
+        snapshot = snapshot or self._snapshot
+        if not snapshot.acid_models:
+            return [self._generate_fallback_prediction(diet) for diet in diets]
+        
+        if features is None:
+            features = self.featurize(diets)
+        acids, values = self.predict_matrix(features, snapshot)
+        return [self.result_from_values(acids, row_values) for row_values in values]
+
+    def explain_batch(self, diets: List[Diet], features: Optional[np.ndarray] = None,
+                      snapshot: Optional[ModelSnapshot] = None, top_k: int = TOP_DRIVERS) -> PredictionExplanation:
+        """Вклады признаков в прогноз каждой кислоты для набора рационов (одной операцией)"""
+        if features is None:
+            features = self.featurize(diets)
+        return self.explain_features(features, snapshot, top_k)
+
+    def explain_features(self, features: np.ndarray, snapshot: Optional[ModelSnapshot] = None,
+                         top_k: int = TOP_DRIVERS) -> PredictionExplanation:
+        """Вклады для готовой матрицы признаков (например, из LivePrediction)"""
+        snapshot = snapshot or self._snapshot
+        return PredictionExplanation.compute(features, snapshot.acids, self.featurizer.features,
+                                             snapshot.weights, snapshot.intercepts, snapshot.version, top_k)
+
+    def result_from_values(self, acids: List[str], values: np.ndarray) -> PredictionResult:
+        """PredictionResult из вектора значений кислот (порядок acids); без модели - fallback"""
+        acid_columns = {acid_name: i for i, acid_name in enumerate(acids)}
+        acid_predictions = {}
+        for acid_name in self.ALL_ACIDS:
+            if acid_name in acid_columns:
+                acid_predictions[acid_name] = self._make_prediction(
+                    acid_name, float(values[acid_columns[acid_name]]))
+            else:
+                acid_predictions[acid_name] = self._create_fallback_prediction(acid_name)
+        return PredictionResult(acids=acid_predictions)
+
+    def _make_prediction(self, acid_name: str, predicted_value: float) -> AcidPrediction:
+        """Создает AcidPrediction с отклонением от целевого диапазона"""
+        limits = self._get_acid_limits(acid_name)
+        
+        if predicted_value < limits['min']:
+            deviation = predicted_value - limits['min'] 
+        elif predicted_value > limits['max']:
+            deviation = predicted_value - limits['max']
+        else:
+            deviation = 0.0
+        
+        return AcidPrediction(
+            name=acid_name,
+            predicted_value=predicted_value,
+            target_min=limits['min'],
+            target_max=limits['max'],
+            deviation=deviation
+        )
+
     def predict_single_acid(self, acid_name: str, diet: Diet) -> AcidPrediction:
         """Прогнозирует уровень только одной конкретной кислоты"""
-        if acid_name not in self.acid_models:
+        model = self.acid_models.get(acid_name)
+        if model is None:
             return self._create_fallback_prediction(acid_name)
         
         try:
-            model = self.acid_models[acid_name]
             features = self._diet_to_features_for_model(diet, model, acid_name)
             predicted_value = float(model.predict(features)[0])
             
-            limits = self._get_acid_limits(acid_name)
-            
-            if predicted_value < limits['min']:
-                deviation = predicted_value - limits['min'] 
-            elif predicted_value > limits['max']:
-                deviation = predicted_value - limits['max']
-            else:
-                deviation = 0.0
-            
-            return AcidPrediction(
-                name=acid_name,
-                predicted_value=predicted_value,
-                target_min=limits['min'],
-                target_max=limits['max'],
-                deviation=deviation
-            )
+            return self._make_prediction(acid_name, predicted_value)
             
         except Exception as e:
             print(f"❌ Ошибка предсказания для {acid_name}: {e}")
@@ -1,14 +1,54 @@
 # services/rec_engine.py
 from typing import List, Dict, Optional, Tuple
-from ..models.diet import Diet
+import numpy as np
+from ..models.diet import Diet, DietComponent
 from ..models.fatty_acid import PredictionResult
 from ..models.recommendation import Recommendation, RecommendationType, PriorityLevel, ComponentAdjustment
+from .explanation import PredictionExplanation
+from .featurizer import DietFeaturizer
+from .feasibility import FeasibilityAnalyzer
+from .uncertainty import UncertaintyEstimator
+
+# Порядок приоритетов при сортировке рекомендаций
+PRIORITY_ORDER = [PriorityLevel.CRITICAL, PriorityLevel.HIGH, PriorityLevel.WARNING, PriorityLevel.INFO]
+# Допустимое изменение компонента в одной рекомендации (доля текущего количества)
+MAX_COMPONENT_CHANGE = 0.3
+# Сэмплов Монте-Карло на вариант рациона при оценке уверенности рекомендаций
+CONFIDENCE_SAMPLES = 500
+# Меньшие изменения количества (кг) не рекомендуются
+MIN_CHANGE_KG = 0.1
+
+
+def apply_adjustments(diet: Diet, recommendations: List[Recommendation]) -> Diet:
+    """Копия рациона с количествами из рекомендаций (исходный рацион не меняется)"""
+    components = {name: DietComponent(name, component.amount, component.unit)
+                  for name, component in diet.components.items()}
+    for rec in recommendations:
+        for adjustment in rec.adjustments:
+            components[adjustment.component_name].amount = adjustment.recommended_amount
+    return Diet(diet.diet_id, diet.name, components)
 
 
 class LinearRecommendationEngine:
-    """Рекомендательная система на основе линейных моделей кислот"""
+    """Рекомендательная система на основе линейных моделей кислот.
+    
+    Влияние компонентов берется из разложения прогноза
+    (PredictionExplanation): коэффициенты моделей и вклады признаков
+    рациона. Без обученных моделей используются встроенные веса.
+    Уверенность рекомендации - вероятность попадания кислоты в норму
+    после изменения с учетом разброса количеств и коэффициентов
+    (UncertaintyEstimator, все варианты рациона одним пакетом).
+    Кислоты, которые нельзя вернуть в норму изменением компонентов в
+    пределах MAX_COMPONENT_CHANGE (FeasibilityAnalyzer), не получают
+    рекомендаций по количествам - вместо них одна стратегическая.
+    """
     
-    def __init__(self):
+    def __init__(self, predictor=None):
+        self.predictor = predictor
+        # Без предиктора признаки для встроенных весов строятся отдельным featurizer
+        self.featurizer = predictor.featurizer if predictor else DietFeaturizer()
+        self.uncertainty = UncertaintyEstimator(predictor, samples=CONFIDENCE_SAMPLES) if predictor else None
+        self.feasibility = FeasibilityAnalyzer(predictor, MAX_COMPONENT_CHANGE) if predictor else None
         self.acid_weights = self._load_acid_weights()
         self.acid_targets = self._load_acid_targets()
     
@@ -67,26 +107,51 @@ class LinearRecommendationEngine:
             'Арахиновая': {'min': 0.0, 'max': 1.0}
         }
     
-    def generate_recommendations(self, diet: Diet, prediction: PredictionResult) -> List[Recommendation]:
-        """Генерирует рекомендации на основе линейных моделей"""
+    def generate_recommendations(self, diet: Diet, prediction: PredictionResult,
+                                 explanation: Optional[PredictionExplanation] = None) -> List[Recommendation]:
+        """Генерирует рекомендации на основе линейных моделей (explanation - разложение прогноза рациона, если уже посчитано)"""
         recommendations = []
         
+        if explanation is None:
+            explanation = self._explain(diet)
+        
         # Анализируем проблемные кислоты
-        problematic_acids = self._get_problematic_acids(prediction)
+        problematic_acids = self._get_problematic_acids(prediction, explanation)
+        unreachable = self._unreachable_acids(diet, problematic_acids)
+        for acid_name in unreachable:
+            del problematic_acids[acid_name]
         
+        target_acids = []
         for acid_name, acid_data in problematic_acids.items():
-            acid_recommendations = self._generate_for_acid(acid_name, acid_data, diet)
+            acid_recommendations = self._generate_for_acid(acid_name, acid_data, diet, explanation)
             recommendations.extend(acid_recommendations)
+            target_acids.extend([acid_name] * len(acid_recommendations))
         
-        merged = self._merge_recommendations(recommendations)
+        merged, merged_targets = self._merge_recommendations(recommendations, target_acids)
+        self._estimate_confidence(diet, merged, merged_targets)
+        if unreachable:
+            merged.append(self._unreachable_advice(unreachable))
         return self._prioritize_recommendations(merged)
     
-    def _get_problematic_acids(self, prediction: PredictionResult) -> Dict:
+    def _explain(self, diet: Diet) -> PredictionExplanation:
+        """Разложение прогноза рациона; без обученных моделей - по встроенным весам"""
+        if self.predictor is not None and self.predictor.acid_models:
+            return self.predictor.explain_batch([diet])
+        
+        featurizer = self.featurizer
+        acids = list(self.acid_weights)
+        weights = np.array([[self.acid_weights[acid].get(feature, 0.0) for feature in featurizer.features]
+                            for acid in acids])
+        intercepts = np.array([self.acid_weights[acid]['intercept'] for acid in acids])
+        return PredictionExplanation.compute(featurizer.featurize([diet]), acids, featurizer.features,
+                                             weights, intercepts, 'builtin')
+    
+    def _get_problematic_acids(self, prediction: PredictionResult, explanation: PredictionExplanation) -> Dict:
         """Находит кислоты, требующие коррекции"""
         problematic = {}
         
         for acid_name, acid_pred in prediction.acids.items():
-            if acid_name not in self.acid_weights:
+            if explanation.acid_index(acid_name) is None:
                 continue
                 
             if not acid_pred.is_within_target:
@@ -100,54 +165,69 @@ class LinearRecommendationEngine:
         
         return problematic
     
-    def _generate_for_acid(self, acid_name: str, acid_data: Dict, diet: Diet) -> List[Recommendation]:
+    def _generate_for_acid(self, acid_name: str, acid_data: Dict, diet: Diet,
+                           explanation: PredictionExplanation) -> List[Recommendation]:
         """Генерирует рекомендации для конкретной кислоты"""
         recommendations = []
-        weights = self.acid_weights[acid_name]
+        weights = explanation.weights[explanation.acid_index(acid_name)]
         
         # Находим компоненты с максимальным влиянием
-        influential_comps = self._get_influential_components(weights, acid_data['needs_increase'])
+        influential_comps = self._get_influential_components(acid_name, diet, explanation)
         
-        for comp_name, influence in influential_comps:
-            if comp_name in diet.components:
-                rec = self._create_recommendation(comp_name, influence, acid_name, acid_data, diet)
-                if rec:
-                    recommendations.append(rec)
+        for comp_name, column in influential_comps:
+            rec = self._create_recommendation(comp_name, float(weights[column]), acid_name, acid_data, diet,
+                                              explanation, column)
+            if rec:
+                recommendations.append(rec)
         
         return recommendations
     
-    def _get_influential_components(self, weights: Dict[str, float], needs_increase: bool) -> List[Tuple[str, float]]:
-        """Находит компоненты с наибольшим влиянием"""
-        components = []
+    def _get_influential_components(self, acid_name: str, diet: Diet,
+                                    explanation: PredictionExplanation) -> List[Tuple[str, int]]:
+        """Компоненты признаков с наибольшим вкладом в прогноз кислоты: (компонент, столбец признака).
         
-        for comp_name, weight in weights.items():
-            if comp_name == 'intercept':
+        Изменение компонента в пределах 30% сдвигает кислоту не больше чем
+        на 30% вклада его признака, поэтому порядок - по модулю вклада.
+        Нутриентные признаки (доли СВ) отдельному компоненту не соответствуют.
+        """
+        featurizer = self.featurizer
+        # Для каждого признака - компонент рациона с наибольшим количеством
+        by_column: Dict[int, str] = {}
+        for comp_name, component in diet.components.items():
+            column = featurizer.component_column(comp_name)
+            if column is None or component.amount <= 0:
                 continue
-                
-            if (needs_increase and weight > 0) or (not needs_increase and weight < 0):
-                components.append((comp_name, weight))
+            current = by_column.get(column)
+            if current is None or component.amount > diet.components[current].amount:
+                by_column[column] = comp_name
         
-        return sorted(components, key=lambda x: abs(x[1]), reverse=True)[:3]
+        components = []
+        for feature, _ in explanation.drivers(0, acid_name, k=len(explanation.features)):
+            column = featurizer.feature_index[feature]
+            if column in by_column:
+                components.append((by_column[column], column))
+        return components[:3]
     
     def _create_recommendation(self, comp_name: str, influence: float, 
-                             acid_name: str, acid_data: Dict, diet: Diet) -> Optional[Recommendation]:
+                             acid_name: str, acid_data: Dict, diet: Diet,
+                             explanation: PredictionExplanation, column: int) -> Optional[Recommendation]:
         """Создает рекомендацию по корректировке компонента"""
         current_amount = diet.components[comp_name].amount
         
         required_change = -acid_data['deviation'] / influence
         
-        max_change = current_amount * 0.3
+        max_change = current_amount * MAX_COMPONENT_CHANGE
         final_change = max(-max_change, min(required_change, max_change))
         
-        if abs(final_change) < 0.1: 
+        if abs(final_change) < MIN_CHANGE_KG:
             return None
         
         new_amount = current_amount + final_change
         if new_amount < 0:
             return None
         
-        # Рассчитываем влияние на все кислоты
-        total_impact = self._calculate_impact(comp_name, final_change)
+        # Влияние на все кислоты - по коэффициентам признака из разложения прогноза
+        total_impact = self._calculate_impact(explanation, column, final_change)
         
         adjustment = ComponentAdjustment(
             component_name=comp_name,
@@ -169,13 +249,61 @@ class LinearRecommendationEngine:
             validation_status='pending'
         )
     
-    def _calculate_impact(self, comp_name: str, change: float) -> Dict[str, float]:
-        """Рассчитывает влияние изменения на все кислоты"""
-        impact = {}
-        for acid_name, weights in self.acid_weights.items():
-            if comp_name in weights:
-                impact[acid_name] = weights[comp_name] * change
-        return impact
+    def _unreachable_acids(self, diet: Diet, problematic_acids: Dict) -> Dict[str, tuple]:
+        """Проблемные кислоты, недостижимые в пределах MAX_COMPONENT_CHANGE: кислота -> (мин, макс)"""
+        if not problematic_acids or self.feasibility is None or not self.predictor.acid_models:
+            return {}
+        feasibility = self.feasibility.analyze(diet)
+        unreachable = {}
+        for acid_name in problematic_acids:
+            column = feasibility.acid_index(acid_name)
+            if column is not None and not feasibility.feasible[0, column]:
+                unreachable[acid_name] = (float(feasibility.reachable_min[0, column]),
+                                          float(feasibility.reachable_max[0, column]))
+        if unreachable:
+            print(f"⚠️ Недостижимо изменением компонентов: {', '.join(unreachable)}")
+        return unreachable
+    
+    def _unreachable_advice(self, unreachable: Dict[str, tuple]) -> Recommendation:
+        """Одна рекомендация вместо безнадежных коррекций количеств"""
+        ranges = '; '.join(f"{acid_name} {low:.2f}…{high:.2f}%" for acid_name, (low, high) in unreachable.items())
+        return Recommendation(
+            recommendation_id="rec_unreachable",
+            type=RecommendationType.STRATEGIC_ADVICE,
+            priority=PriorityLevel.WARNING,
+            title="Недостижимые цели",
+            description=(f"Изменение компонентов в пределах ±{MAX_COMPONENT_CHANGE:.0%} не вернет в норму "
+                         f"(достижимо: {ranges}). Нужна замена компонентов или пересмотр рациона"),
+            adjustments=[],
+            expected_improvement={},
+            confidence=1.0,
+            validation_status='pending'
+        )
+    
+    def _estimate_confidence(self, diet: Diet, recommendations: List[Recommendation],
+                             target_acids: List[List[str]]):
+        """Заменяет оценочную уверенность вероятностью попасть в норму после изменения (Монте-Карло).
+
+        Для слитой рекомендации берется наименьшая вероятность среди всех
+        ее целевых кислот.
+        """
+        if not recommendations or self.uncertainty is None or not self.predictor.acid_models:
+            return
+        
+        variants = [apply_adjustments(diet, [rec]) for rec in recommendations]
+        uncertainty = self.uncertainty.estimate_batch(variants)
+        for row, (rec, acids) in enumerate(zip(recommendations, target_acids)):
+            columns = [column for column in map(uncertainty.acid_index, acids) if column is not None]
+            if columns:
+                rec.confidence = float(uncertainty.probability_in_range[row, columns].min())
+    
+    def _calculate_impact(self, explanation: PredictionExplanation, column: int, change: float) -> Dict[str, float]:
+        """Рассчитывает влияние изменения признака на все кислоты"""
+        return {
+            acid_name: float(weight) * change
+            for acid_name, weight in zip(explanation.acids, explanation.weights[:, column])
+            if weight != 0
+        }
     
     def _get_priority(self, deviation: float, influence: float) -> PriorityLevel:
         """Определяет приоритет рекомендации"""
@@ -206,42 +334,52 @@ class LinearRecommendationEngine:
         return (f"{direction} {comp_name} на {abs_change:.2f} кг для {goal} {acid_name} "
                 f"(сейчас {problem} на {abs(acid_data['deviation']):.2f}%)")
     
-    def _merge_recommendations(self, recommendations: List[Recommendation]) -> List[Recommendation]:
-        """Объединяет рекомендации для одинаковых компонентов"""
-        merged = {}
-        
-        for rec in recommendations:
-            comp_name = rec.adjustments[0].component_name
-            
-            if comp_name not in merged:
-                merged[comp_name] = rec
-            else:
-                existing = merged[comp_name]
-                
-                existing_adj = existing.adjustments[0]
-                new_adj = rec.adjustments[0]
-                
-                avg_change = ((existing_adj.recommended_amount - existing_adj.current_amount) +
-                            (new_adj.recommended_amount - new_adj.current_amount)) / 2
-                
-                existing_adj.recommended_amount = existing_adj.current_amount + avg_change
-                
-                for acid, impact in rec.expected_improvement.items():
-                    if acid in existing.expected_improvement:
-                        existing.expected_improvement[acid] += impact
-                    else:
-                        existing.expected_improvement[acid] = impact
+    def _merge_recommendations(self, recommendations: List[Recommendation],
+                               target_acids: List[str]) -> Tuple[List[Recommendation], List[List[str]]]:
+        """Объединяет рекомендации для одинаковых компонентов.
+        
+        Изменение слитой рекомендации - среднее изменений, ожидаемый эффект
+        пересчитывается под него. Если разнонаправленные цели взаимно
+        погасились (изменение меньше MIN_CHANGE_KG), рекомендация
+        отбрасывается. Возвращает рекомендации и целевые кислоты каждой.
+        """
+        groups: Dict[str, List[Tuple[Recommendation, str]]] = {}
+        for rec, acid_name in zip(recommendations, target_acids):
+            groups.setdefault(rec.adjustments[0].component_name, []).append((rec, acid_name))
+        
+        merged, merged_targets = [], []
+        for comp_name, group in groups.items():
+            rec = group[0][0]
+            acids = list(dict.fromkeys(acid_name for _, acid_name in group))
+            if len(group) > 1:
+                adjustment = rec.adjustments[0]
+                first_change = adjustment.recommended_amount - adjustment.current_amount
+                change = sum(other.adjustments[0].recommended_amount - other.adjustments[0].current_amount
+                             for other, _ in group) / len(group)
+                if abs(change) < MIN_CHANGE_KG:
+                    continue
                 
-                existing.description = f"Комплексная коррекция {comp_name}"
+                # Все рекомендации группы меняют один признак: эффект пропорционален изменению
+                impact = {acid: value * change / first_change for acid, value in adjustment.expected_impact.items()}
+                adjustment.recommended_amount = adjustment.current_amount + change
+                adjustment.change_direction = 'increase' if change > 0 else 'decrease'
+                adjustment.expected_impact = impact
+                rec.expected_improvement = dict(impact)
+                rec.priority = min((other.priority for other, _ in group), key=PRIORITY_ORDER.index)
+                rec.confidence = max(other.confidence for other, _ in group)
+                direction = "увеличить" if change > 0 else "уменьшить"
+                rec.description = (f"Комплексная коррекция {comp_name}: {direction} на {abs(change):.2f} кг "
+                                   f"({', '.join(acids)})")
+            merged.append(rec)
+            merged_targets.append(acids)
         
-        return list(merged.values())
+        return merged, merged_targets
     
     def _prioritize_recommendations(self, recommendations: List[Recommendation]) -> List[Recommendation]:
         """Сортирует рекомендации по приоритету"""
         return sorted(recommendations, 
-                     key=lambda x: (x.priority.value, 
-                                  sum(abs(imp) for imp in x.expected_improvement.values())), 
-                     reverse=True)
+                     key=lambda x: (PRIORITY_ORDER.index(x.priority), 
+                                  -sum(abs(imp) for imp in x.expected_improvement.values())))
 
 
 # Сохраняем обратную совместимость
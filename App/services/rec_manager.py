@@ -1,8 +1,9 @@
 # services/rec_manager.py
-from typing import List
+from typing import List, Optional
 from ..models.diet import Diet
 from ..models.fatty_acid import PredictionResult
 from ..models.recommendation import Recommendation
+from .explanation import PredictionExplanation
 from .rec_engine import LinearRecommendationEngine
 
 class RecommendationManager:
@@ -10,13 +11,14 @@ class RecommendationManager:
     
     def __init__(self, acid_predictor):
         self.acid_predictor = acid_predictor
-        self.engine = LinearRecommendationEngine()
+        self.engine = LinearRecommendationEngine(acid_predictor)
         print("✅ Рекомендательная система инициализирована")
     
-    def generate_recommendations(self, diet: Diet, prediction: PredictionResult) -> List[Recommendation]:
+    def generate_recommendations(self, diet: Diet, prediction: PredictionResult,
+                                 explanation: Optional[PredictionExplanation] = None) -> List[Recommendation]:
         """Генерирует рекомендации используя линейные модели"""
         try:
-            recommendations = self.engine.generate_recommendations(diet, prediction)
+            recommendations = self.engine.generate_recommendations(diet, prediction, explanation)
             print(f"✅ Сгенерировано {len(recommendations)} рекомендаций")
             return self._remove_duplicates(recommendations)
         except Exception as e:
@@ -1,9 +1,14 @@
 # services/recommender.py
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 from ..models.diet import Diet
 from ..models.fatty_acid import PredictionResult
+from .explanation import PredictionExplanation
 from .rec_manager import RecommendationManager
 
+# Сколько рекомендаций показывать
+MAX_DISPLAYED = 5
+
+
 class DietRecommender:
     """Рекомендательная система для рациона коров"""
     
@@ -17,16 +22,24 @@ class DietRecommender:
         self.recommendation_manager = RecommendationManager(self.acid_predictor)
         print("✅ Рекомендательная система инициализирована")
     
-    def generate_recommendations(self, diet: Diet, prediction: PredictionResult) -> List[str]:
-        """Генерирует текстовые рекомендации на основе предсказаний"""
+    def generate_recommendations(self, diet: Diet, prediction: PredictionResult,
+                                 explanation: Optional[PredictionExplanation] = None) -> List[str]:
+        """Генерирует текстовые рекомендации на основе предсказаний (explanation - готовое разложение прогноза)"""
+        return self.generate_with_details(diet, prediction, explanation)[0]
+    
+    def generate_with_details(self, diet: Diet, prediction: PredictionResult,
+                              explanation: Optional[PredictionExplanation] = None) -> Tuple[List[str], List]:
+        """Текст рекомендаций и показанные в нем структурированные рекомендации (Recommendation)"""
         try:
-            structured_recommendations = self.recommendation_manager.generate_recommendations(diet, prediction)
+            structured_recommendations = self.recommendation_manager.generate_recommendations(
+                diet, prediction, explanation)
             
-            return self._format_recommendations(structured_recommendations, prediction)
+            return (self._format_recommendations(structured_recommendations, prediction),
+                    structured_recommendations[:MAX_DISPLAYED])
             
         except Exception as e:
             print(f"❌ Ошибка генерации рекомендаций: {e}")
-            return ["⚠️ Временные технические работы. Рекомендации будут доступны позже."]
+            return ["⚠️ Временные технические работы. Рекомендации будут доступны позже."], []
     
     def _format_recommendations(self, recommendations: List, prediction: PredictionResult) -> List[str]:
         """Форматирует структурированные рекомендации в текстовый вид"""
@@ -50,17 +63,20 @@ class DietRecommender:
                 )
         
         formatted.append("\n💡 РЕКОМЕНДАЦИИ:")
-        for i, rec in enumerate(recommendations[:5], 1):  # Ограничиваем 5 рекомендациями
+        for i, rec in enumerate(recommendations[:MAX_DISPLAYED], 1):
             if rec.adjustments:
                 adjustment = rec.adjustments[0]
                 direction = "увеличить" if adjustment.change_direction == 'increase' else "уменьшить"
                 formatted.append(
                     f"{i}. {direction} {adjustment.component_name} "
-                    f"с {adjustment.current_amount:.1f}кг до {adjustment.recommended_amount:.1f}кг"
+                    f"с {adjustment.current_amount:.1f}кг до {adjustment.recommended_amount:.1f}кг "
+                    f"(уверенность {rec.confidence:.0%})"
                 )
+            else:
+                formatted.append(f"{i}. {rec.title}: {rec.description}")
         
-        if len(recommendations) > 5:
-            formatted.append(f"\n... и еще {len(recommendations) - 5} рекомендаций")
+        if len(recommendations) > MAX_DISPLAYED:
+            formatted.append(f"\n... и еще {len(recommendations) - MAX_DISPLAYED} рекомендаций")
         
         return formatted
     
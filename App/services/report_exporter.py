@@ -0,0 +1,418 @@
+# services/report_exporter.py
+import csv
+import multiprocessing
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from ..models.diet import Diet
+from ..models.fatty_acid import AcidPrediction
+from .deduplicator import iter_unique_diets
+from .excel_parser import ProgressCallback
+
+EXPORT_FORMATS = ('csv', 'xlsx', 'pdf')
+# Рационов в одной порции: в памяти одновременно только порция и очередь PDF-задач
+EXPORT_CHUNK = 200
+# Рационов в одной PDF-задаче процесса
+PDF_BATCH = 20
+# PDF-задач в очереди на процесс (ограничивает память при любом размере стада)
+PDF_QUEUE_PER_WORKER = 2
+# Строк текста на странице PDF отчета
+PDF_LINES_PER_PAGE = 60
+
+# Эмодзи из текста рекомендаций: в шрифте PDF их нет
+_EMOJI_RE = re.compile('[\U0001F000-\U0001FFFF\u2600-\u27BF\uFE0F]')
+
+STATUS_LOW = 'ниже нормы'
+STATUS_OK = 'в норме'
+STATUS_HIGH = 'выше нормы'
+
+
+@dataclass
+class DietReport:
+    """Отчет по одному рациону - простые данные, передаются в процессы PDF"""
+    index: int
+    diet_id: str
+    name: str
+    model_version: str
+    components: List[Tuple[str, float]]
+    # (кислота, прогноз, мин, макс, статус)
+    acids: List[Tuple[str, float, float, float, str]]
+    recommendations: List[str] = field(default_factory=list)
+
+    @property
+    def out_of_range(self) -> int:
+        return sum(1 for acid in self.acids if acid[4] != STATUS_OK)
+
+
+def _status(acid_pred: AcidPrediction) -> str:
+    if acid_pred.predicted_value < acid_pred.target_min:
+        return STATUS_LOW
+    if acid_pred.predicted_value > acid_pred.target_max:
+        return STATUS_HIGH
+    return STATUS_OK
+
+
+class HerdSummary:
+    """Сводка по стаду, накапливаемая по мере записи (память O(число кислот))"""
+
+    def __init__(self):
+        self.diet_count = 0
+        self.problem_diets = 0
+        # Прочитано рационов вместе с повторами по составу (при дедупликации)
+        self.seen_count = 0
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def add(self, report: DietReport):
+        self.diet_count += 1
+        if report.out_of_range:
+            self.problem_diets += 1
+        for acid, value, target_min, target_max, status in report.acids:
+            stats = self._stats.setdefault(acid, {
+                'sum': 0.0, 'min': value, 'max': value, 'target_min': target_min, 'target_max': target_max,
+                STATUS_LOW: 0, STATUS_OK: 0, STATUS_HIGH: 0,
+            })
+            stats['sum'] += value
+            stats['min'] = min(stats['min'], value)
+            stats['max'] = max(stats['max'], value)
+            stats[status] += 1
+
+    @property
+    def duplicates(self) -> int:
+        return max(self.seen_count - self.diet_count, 0)
+
+    HEADER = ['Кислота', 'Среднее, %', 'Мин, %', 'Макс, %', 'Норма, %',
+              'Ниже нормы', 'В норме', 'Выше нормы', 'В норме, %']
+
+    def rows(self) -> List[list]:
+        rows = []
+        for acid, stats in self._stats.items():
+            rows.append([
+                acid,
+                round(stats['sum'] / self.diet_count, 4),
+                round(stats['min'], 4),
+                round(stats['max'], 4),
+                f"{stats['target_min']:.1f}-{stats['target_max']:.1f}",
+                stats[STATUS_LOW],
+                stats[STATUS_OK],
+                stats[STATUS_HIGH],
+                round(stats[STATUS_OK] * 100 / self.diet_count, 1),
+            ])
+        return rows
+
+
+def _safe_file_name(text: str) -> str:
+    return re.sub(r'[^\w.-]+', '_', str(text)).strip('_')[:60] or 'diet'
+
+
+def _report_lines(report: DietReport) -> List[str]:
+    lines = [
+        f"Рацион: {report.name}",
+        f"ID: {report.diet_id}    Модели: {report.model_version}",
+        f"Кислот вне нормы: {report.out_of_range} из {len(report.acids)}",
+        "",
+        "СОСТАВ РАЦИОНА, кг:",
+    ]
+    lines += [f"    {name}: {amount:g}" for name, amount in report.components] or ["    компоненты отсутствуют"]
+    lines += ["", "ПРОГНОЗ КИСЛОТ:"]
+    lines += [
+        f"    {acid}: {value:.2f}% (норма {target_min:.1f}-{target_max:.1f}%) - {status}"
+        for acid, value, target_min, target_max, status in report.acids
+    ]
+    if report.recommendations:
+        lines += ["", "РЕКОМЕНДАЦИИ:"]
+        lines += [f"    {line}" for line in report.recommendations]
+    return lines
+
+
+def _write_text_pdf(file_path: str, pages: Iterable[List[str]]):
+    """Текстовый PDF: Figure без pyplot, не держит фигуры между страницами.
+
+    Шрифты Type 3: встраивание TrueType (Type 42) с подмножеством глифов
+    в каждый файл в несколько раз медленнее самой отрисовки.
+    """
+    import matplotlib
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    with matplotlib.rc_context({'pdf.fonttype': 3}), PdfPages(file_path) as pdf:
+        for page in pages:
+            figure = Figure(figsize=(8.27, 11.69))
+            step = 1 / (PDF_LINES_PER_PAGE + 4)
+            for i, line in enumerate(page):
+                figure.text(0.06, 1 - step * (i + 2), _EMOJI_RE.sub('', line), fontsize=8)
+            pdf.savefig(figure)
+
+
+def _paginate(lines: List[str]) -> Iterator[List[str]]:
+    for start in range(0, max(len(lines), 1), PDF_LINES_PER_PAGE):
+        yield lines[start:start + PDF_LINES_PER_PAGE]
+
+
+def render_diet_pdfs(reports: Sequence[DietReport], output_dir: str) -> List[str]:
+    """PDF по каждому рациону порции; выполняется в процессе-исполнителе"""
+    paths = []
+    for report in reports:
+        path = os.path.join(output_dir, f"diet_{report.index + 1:06d}_{_safe_file_name(report.diet_id)}.pdf")
+        _write_text_pdf(path, _paginate(_report_lines(report)))
+        paths.append(path)
+    return paths
+
+
+class ReportExporter:
+    """Выгрузка отчетов по рационам и стаду в CSV, Excel и PDF.
+
+    Рационы обрабатываются порциями по chunk_size: прогноз одной
+    матричной операцией, затем строки сразу пишутся в открытые CSV и в
+    потоковую (write-only) книгу Excel, а PDF рисуются в процессах с
+    ограниченной очередью. Сводка по стаду накапливается по ходу, так что
+    память не зависит от числа рационов.
+    """
+
+    def __init__(self, predictor, recommender=None, chunk_size: int = EXPORT_CHUNK,
+                 workers: Optional[int] = None, deduplicate: bool = True):
+        self.predictor = predictor
+        self.recommender = recommender
+        self.chunk_size = chunk_size
+        self.workers = workers or os.cpu_count() or 1
+        # Повторы по составу (из разных файлов и строк) оцениваются и выгружаются один раз
+        self.deduplicate = deduplicate
+
+    def iter_reports(self, diets: Iterable[Diet]) -> Iterator[List[DietReport]]:
+        """Отчеты порциями; diets может быть генератором"""
+        diets = iter(diets)
+        index = 0
+        while True:
+            chunk = list(islice(diets, self.chunk_size))
+            if not chunk:
+                return
+            snapshot = self.predictor.snapshot
+            features = self.predictor.featurize(chunk)
+            predictions = self.predictor.predict_batch(chunk, features, snapshot)
+            # Разложение для рекомендаций - одним пакетом на порцию
+            explanation = (self.predictor.explain_batch(chunk, features, snapshot)
+                           if self.recommender is not None and snapshot.acid_models else None)
+            reports = []
+            for i, (diet, prediction) in enumerate(zip(chunk, predictions)):
+                recommendations = []
+                if self.recommender is not None:
+                    lines = self.recommender.generate_recommendations(
+                        diet, prediction, explanation.row(i) if explanation is not None else None)
+                    recommendations = [line.strip() for line in lines if line.strip()]
+                reports.append(DietReport(
+                    index=index,
+                    diet_id=str(diet.diet_id),
+                    name=diet.name,
+                    model_version=snapshot.version,
+                    components=[(name, component.amount) for name, component in diet.components.items()],
+                    acids=[
+                        (acid, acid_pred.predicted_value, acid_pred.target_min, acid_pred.target_max, _status(acid_pred))
+                        for acid, acid_pred in prediction.acids.items()
+                    ],
+                    recommendations=recommendations,
+                ))
+                index += 1
+            yield reports
+
+    def export(self, diets: Iterable[Diet], output_dir: str, formats: Sequence[str] = EXPORT_FORMATS,
+               progress: Optional[ProgressCallback] = None) -> Dict[str, List[str]]:
+        """Пишет отчеты в output_dir; возвращает записанные файлы по форматам"""
+        unknown = set(formats) - set(EXPORT_FORMATS)
+        if unknown:
+            raise ValueError(f"Неизвестные форматы отчета: {', '.join(sorted(unknown))}")
+        os.makedirs(output_dir, exist_ok=True)
+        total = len(diets) if hasattr(diets, '__len__') else 0
+        written: Dict[str, List[str]] = {fmt: [] for fmt in formats}
+        summary = HerdSummary()
+        if self.deduplicate:
+            diets = self._count_seen(diets, summary)
+            diets = iter_unique_diets(diets)
+
+        writers = _ReportWriters(output_dir, formats, written)
+        pdf_queue = _PdfQueue(os.path.join(output_dir, 'pdf'), self.workers) if 'pdf' in formats else None
+        try:
+            for reports in self.iter_reports(diets):
+                for report in reports:
+                    summary.add(report)
+                writers.write(reports)
+                if pdf_queue is not None:
+                    written['pdf'] += pdf_queue.submit(reports)
+                if progress:
+                    progress(summary.seen_count or summary.diet_count, total)
+
+            writers.write_summary(summary)
+            if pdf_queue is not None:
+                written['pdf'] += pdf_queue.drain()
+                herd_pdf = os.path.join(output_dir, 'herd_summary.pdf')
+                _write_text_pdf(herd_pdf, _paginate(self._summary_lines(summary)))
+                written['pdf'].append(herd_pdf)
+            writers.close(save=True)
+        finally:
+            writers.close(save=False)
+            if pdf_queue is not None:
+                pdf_queue.shutdown()
+
+        duplicates = f" (повторов пропущено: {summary.duplicates})" if summary.duplicates else ""
+        print(f"✅ Отчеты по {summary.diet_count} рационам сохранены в {output_dir}{duplicates}")
+        return written
+
+    @staticmethod
+    def _count_seen(diets: Iterable[Diet], summary: HerdSummary) -> Iterator[Diet]:
+        """Считает все прочитанные рационы, включая повторы"""
+        for diet in diets:
+            summary.seen_count += 1
+            yield diet
+
+    @staticmethod
+    def _summary_lines(summary: HerdSummary) -> List[str]:
+        lines = [
+            "Сводка по стаду",
+            f"Рационов: {summary.diet_count}    С отклонениями: {summary.problem_diets}",
+            f"Повторов по составу (не учтены): {summary.duplicates}",
+            "",
+        ]
+        for row in summary.rows():
+            acid, mean, low, high, target, below, inside, above, share = row
+            lines.append(f"{acid}: среднее {mean:.2f}% (мин {low:.2f}, макс {high:.2f}; норма {target}%) - "
+                         f"в норме {inside} ({share}%), ниже {below}, выше {above}")
+        return lines
+
+
+class _ReportWriters:
+    """Открытые на время выгрузки CSV-файлы и потоковая книга Excel"""
+
+    DIET_HEADER = ['diet_id', 'Рацион', 'Модели', 'Вне нормы']
+    DETAIL_HEADER = ['diet_id', 'Раздел', 'Показатель', 'Значение', 'Норма', 'Статус']
+
+    def __init__(self, output_dir: str, formats: Sequence[str], written: Dict[str, List[str]]):
+        self.output_dir = output_dir
+        self.written = written
+        self._files = []
+        self._csv = None
+        self._workbook = None
+        self._header_done = False
+
+        if 'csv' in formats:
+            herd_file = self._open(os.path.join(output_dir, 'herd_report.csv'))
+            details_file = self._open(os.path.join(output_dir, 'diet_details.csv'))
+            self._csv = (csv.writer(herd_file), csv.writer(details_file))
+            self._csv[1].writerow(self.DETAIL_HEADER)
+
+        if 'xlsx' in formats:
+            from openpyxl import Workbook
+            self._workbook = Workbook(write_only=True)
+            self._herd_sheet = self._workbook.create_sheet('Стадо')
+            self._details_sheet = self._workbook.create_sheet('Рационы')
+            self._summary_sheet = self._workbook.create_sheet('Сводка')
+            self._details_sheet.append(self.DETAIL_HEADER)
+
+    def _open(self, path: str):
+        file = open(path, 'w', encoding='utf-8-sig', newline='')
+        self._files.append(file)
+        self.written['csv'].append(path)
+        return file
+
+    @staticmethod
+    def _detail_rows(report: DietReport) -> Iterator[list]:
+        for name, amount in report.components:
+            yield [report.diet_id, 'Компонент, кг', name, amount, '', '']
+        for acid, value, target_min, target_max, status in report.acids:
+            yield [report.diet_id, 'Кислота, %', acid, round(value, 4), f"{target_min:.1f}-{target_max:.1f}", status]
+        for line in report.recommendations:
+            yield [report.diet_id, 'Рекомендация', line, '', '', '']
+
+    def write(self, reports: List[DietReport]):
+        if not reports:
+            return
+        if not self._header_done:
+            # Столбцы кислот берутся из первого отчета: набор кислот у всех рационов один
+            acids = [acid[0] for acid in reports[0].acids]
+            header = self.DIET_HEADER + acids + [f"{acid}: статус" for acid in acids] + ['Рекомендации']
+            if self._csv:
+                self._csv[0].writerow(header)
+            if self._workbook is not None:
+                self._herd_sheet.append(header)
+            self._header_done = True
+
+        for report in reports:
+            row = ([report.diet_id, report.name, report.model_version, report.out_of_range]
+                   + [round(acid[1], 4) for acid in report.acids]
+                   + [acid[4] for acid in report.acids]
+                   + [' | '.join(report.recommendations)])
+            if self._csv:
+                self._csv[0].writerow(row)
+                self._csv[1].writerows(self._detail_rows(report))
+            if self._workbook is not None:
+                self._herd_sheet.append(row)
+                for detail in self._detail_rows(report):
+                    self._details_sheet.append(detail)
+
+    def write_summary(self, summary: HerdSummary):
+        if self._csv:
+            path = os.path.join(self.output_dir, 'herd_summary.csv')
+            with open(path, 'w', encoding='utf-8-sig', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow(HerdSummary.HEADER)
+                writer.writerows(summary.rows())
+            self.written['csv'].append(path)
+        if self._workbook is not None:
+            self._summary_sheet.append(['Рационов', summary.diet_count])
+            self._summary_sheet.append(['С отклонениями', summary.problem_diets])
+            self._summary_sheet.append(['Повторов по составу', summary.duplicates])
+            self._summary_sheet.append([])
+            self._summary_sheet.append(HerdSummary.HEADER)
+            for row in summary.rows():
+                self._summary_sheet.append(row)
+
+    def close(self, save: bool):
+        for file in self._files:
+            file.close()
+        self._files = []
+        if self._workbook is not None:
+            if save:
+                path = os.path.join(self.output_dir, 'herd_report.xlsx')
+                self._workbook.save(path)
+                self.written['xlsx'].append(path)
+            # Write-only книгу можно сохранить только один раз; без сохранения она просто отбрасывается
+            self._workbook = None
+
+
+class _PdfQueue:
+    """PDF в процессах задачами по PDF_BATCH рационов; в очереди не больше PDF_QUEUE_PER_WORKER задач на процесс"""
+
+    def __init__(self, output_dir: str, workers: int):
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.workers = workers
+        self._pending = deque()
+        self._executor = None
+        if workers > 1:
+            context = multiprocessing.get_context('spawn')
+            self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+    def submit(self, reports: List[DietReport]) -> List[str]:
+        """Ставит порцию в очередь; возвращает PDF уже завершенных задач"""
+        if self._executor is None:
+            return render_diet_pdfs(reports, self.output_dir)
+        done = []
+        for start in range(0, len(reports), PDF_BATCH):
+            batch = reports[start:start + PDF_BATCH]
+            self._pending.append(self._executor.submit(render_diet_pdfs, batch, self.output_dir))
+            while len(self._pending) > self.workers * PDF_QUEUE_PER_WORKER:
+                done += self._pending.popleft().result()
+        return done
+
+    def drain(self) -> List[str]:
+        done = []
+        while self._pending:
+            done += self._pending.popleft().result()
+        return done
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,137 @@
+# services/synthetic.py
+import csv
+import os
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from ..utils.config import AppConfig
+
+
+class SyntheticRationGenerator:
+    """Векторизованный генератор синтетических рационов и кислот для нагрузочных тестов.
+
+    Рационы строятся из эмпирического распределения исходного файла:
+    берется случайный реальный рацион (сохраняет совместную встречаемость
+    ингредиентов), количества слегка шумятся, часть ингредиентов выпадает
+    или добавляется с вероятностью их встречаемости и количеством из
+    наблюдаемых значений. Кислоты считаются загруженными моделями плюс шум,
+    поэтому они согласованы с составом.
+    """
+
+    def __init__(self, component_names: List[str], amounts: np.ndarray, predictor=None,
+                 seed: int = 42, jitter: float = 0.1, drop_rate: float = 0.05,
+                 add_rate: float = 0.05, noise_scale: float = 0.05):
+        self.component_names = list(component_names)
+        self.base = np.asarray(amounts, dtype=float)
+        self.rng = np.random.default_rng(seed)
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self.add_rate = add_rate
+        self.noise_scale = noise_scale
+
+        present = self.base > 0
+        self.presence = present.mean(axis=0)
+        # Наблюдаемые ненулевые количества по каждому ингредиенту
+        self._observed = [self.base[present[:, j], j] for j in range(self.base.shape[1])]
+
+        if predictor is None:
+            from .predictor import AcidPredictor
+            predictor = AcidPredictor()
+        self.predictor = predictor
+        self.featurizer = predictor.featurizer
+        # Все порции считаются одной версией моделей
+        self._snapshot = predictor.snapshot
+        self.acids = list(self._snapshot.acids)
+        widths = np.array([
+            AppConfig.get_acid_targets(acid)['max'] - AppConfig.get_acid_targets(acid)['min']
+            for acid in self.acids
+        ])
+        self._noise_sd = self.noise_scale * np.where(widths > 0, widths, 1.0)
+
+    @classmethod
+    def from_csv(cls, file_path: str, **kwargs) -> 'SyntheticRationGenerator':
+        """Эмпирическое распределение из широкой таблицы рационов (rations.csv)"""
+        with open(file_path, 'r', encoding='utf-8-sig') as file:
+            reader = csv.reader(file)
+            header = next(reader)
+            rows = [row for row in reader if row]
+        columns = [i for i, name in enumerate(header) if name and name != 'ration_id']
+
+        def to_float(value: str) -> float:
+            try:
+                return float(value.replace(',', '.'))
+            except ValueError:
+                return 0.0
+
+        amounts = np.array([[to_float(row[i]) for i in columns] for row in rows])
+        print(f"📊 Эмпирическое распределение: {amounts.shape[0]} рационов, {amounts.shape[1]} ингредиентов")
+        return cls([header[i] for i in columns], amounts, **kwargs)
+
+    def sample_rations(self, n_rows: int) -> np.ndarray:
+        """Матрица количеств (рационы x ингредиенты, кг)"""
+        rng = self.rng
+        amounts = self.base[rng.integers(len(self.base), size=n_rows)]
+        amounts = amounts * rng.lognormal(0.0, self.jitter, size=amounts.shape)
+
+        amounts[rng.random(amounts.shape) < self.drop_rate] = 0.0
+
+        added = (amounts == 0) & (rng.random(amounts.shape) < self.presence * self.add_rate)
+        for j in np.flatnonzero(added.any(axis=0)):
+            rows = np.flatnonzero(added[:, j])
+            amounts[rows, j] = rng.choice(self._observed[j], size=len(rows))
+        return np.round(amounts, 2)
+
+    def acid_values(self, amounts: np.ndarray) -> np.ndarray:
+        """Кислоты по моделям для матрицы количеств плюс гауссов шум"""
+        features = self.featurizer.featurize_amounts(self.component_names, amounts)
+        _, values = self.predictor.predict_matrix(features, self._snapshot)
+        values = values + self.rng.normal(0.0, 1.0, size=values.shape) * self._noise_sd
+        return np.round(np.clip(values, 0.0, None), 2)
+
+    def iter_chunks(self, n_rows: int, chunk_size: int = 100_000) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Порции (ID, количества, кислоты); в памяти держится только одна порция"""
+        for start in range(0, n_rows, chunk_size):
+            size = min(chunk_size, n_rows - start)
+            amounts = self.sample_rations(size)
+            yield np.arange(start, start + size), amounts, self.acid_values(amounts)
+
+    def write(self, output_path: str, n_rows: int, chunk_size: int = 100_000,
+              file_format: Optional[str] = None) -> int:
+        """Пишет набор порциями в CSV (как rations_with_acids.csv) или Parquet"""
+        file_format = file_format or ('parquet' if output_path.endswith('.parquet') else 'csv')
+        header = ['ration_id'] + self.component_names + self.acids
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+
+        written = 0
+        if file_format == 'parquet':
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise ImportError("Для записи Parquet установите: pip install pyarrow (или сохраните в CSV)") from None
+
+            writer = None
+            try:
+                for ids, amounts, values in self.iter_chunks(n_rows, chunk_size):
+                    table = pa.Table.from_arrays(
+                        [pa.array(ids)] + [pa.array(col) for col in np.hstack([amounts, values]).T],
+                        names=header
+                    )
+                    if writer is None:
+                        writer = pq.ParquetWriter(output_path, table.schema)
+                    writer.write_table(table)
+                    written += len(ids)
+            finally:
+                if writer is not None:
+                    writer.close()
+        else:
+            with open(output_path, 'w', encoding='utf-8-sig', newline='') as file:
+                file.write(','.join(header) + '\n')
+                for ids, amounts, values in self.iter_chunks(n_rows, chunk_size):
+                    block = np.hstack([ids[:, None], amounts, values])
+                    np.savetxt(file, block, delimiter=',', fmt=['%d'] + ['%.2f'] * (block.shape[1] - 1))
+                    written += len(ids)
+
+        print(f"✅ Записано синтетических рационов: {written} в {output_path}")
+        return written
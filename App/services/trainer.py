@@ -0,0 +1,246 @@
+# services/trainer.py
+import csv
+import json
+import os
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..utils.config import AppConfig
+from .featurizer import DietFeaturizer
+from .name_matcher import RationNameMatcher
+
+# Метрики кросс-валидации рядом с моделями (читаются оценкой неопределенности)
+METRICS_FILE = 'metrics.json'
+# Минимальная похожесть названий анализа и рецепта (как cutoff в ноутбуке)
+LAB_MATCH_CUTOFF = 0.5
+
+
+def acid_columns(columns: List[str]) -> Dict[str, str]:
+    """Колонки с кислотами: колонка файла -> каноническое имя кислоты"""
+    canonical = {acid.lower(): acid for acid in AppConfig.TARGET_LIMITS}
+    return {
+        column: canonical[column.strip().lower()]
+        for column in columns
+        if column.strip().lower() in canonical
+    }
+
+
+def _read_csv(file_path: str) -> Tuple[List[str], List[Dict[str, str]]]:
+    with open(file_path, 'r', encoding='utf-8-sig') as file:
+        reader = csv.DictReader(file)
+        return list(reader.fieldnames or []), list(reader)
+
+
+def _to_float(value) -> float:
+    try:
+        return float(str(value).replace(',', '.'))
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _component_amounts(columns: List[str], rows: List[Dict[str, str]],
+                       skip: set) -> Tuple[List[str], np.ndarray]:
+    """Колонки компонентов и матрица количеств (пропуски и отрицательные - нули)"""
+    components = [column for column in columns if column and column not in skip]
+    amounts = np.array([[_to_float(row[column]) for column in components] for row in rows])
+    return components, np.where(amounts > 0, amounts, 0.0)
+
+
+def load_training_data(file_path: str, featurizer: Optional[DietFeaturizer] = None) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """Загружает X (признаки моделей) и Y (все кислоты) из локального CSV.
+
+    Если в файле уже есть 13 признаков моделей (как training_df в ноутбуке),
+    они берутся как есть, иначе признаки строятся из сырых компонентов
+    тем же DietFeaturizer, что и в приложении.
+    """
+    columns, rows = _read_csv(file_path)
+
+    acids_map = acid_columns(columns)
+    if not acids_map:
+        raise ValueError(f"В файле {file_path} нет колонок с кислотами")
+    acids = list(acids_map.values())
+
+    lowered = {column.strip().lower(): column for column in columns}
+    if all(feature in lowered for feature in AppConfig.MODEL_FEATURES):
+        X = np.array([[_to_float(row[lowered[feature]]) for feature in AppConfig.MODEL_FEATURES] for row in rows])
+        X = np.nan_to_num(X)
+    else:
+        components, amounts = _component_amounts(columns, rows, set(acids_map) | {'ration_id'})
+        X = (featurizer or DietFeaturizer()).featurize_amounts(components, amounts)
+
+    Y = np.array([[_to_float(row[column]) for column in acids_map] for row in rows])
+    print(f"📊 Обучающая выборка: {X.shape[0]} строк, {X.shape[1]} признаков, {len(acids)} кислот")
+    return X, Y, acids
+
+
+def load_lab_training_data(recipes_path: str, lab_path: str, featurizer: Optional[DietFeaturizer] = None,
+                           cutoff: float = LAB_MATCH_CUTOFF) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """Обучающая выборка из рецептов рационов и лабораторных анализов молока (как create_training_dataset).
+
+    Первая колонка обоих файлов - название (ID) рациона; в лабораторном
+    файле остальные колонки - кислоты. Названия анализов сопоставляются с
+    рецептами нечетко (RationNameMatcher); у смешанного рациона "А + Б"
+    количества компонентов усредняются. Анализы без найденного рецепта
+    пропускаются.
+    """
+    recipe_columns, recipe_rows = _read_csv(recipes_path)
+    lab_columns, lab_rows = _read_csv(lab_path)
+    if not recipe_columns or not lab_columns:
+        raise ValueError("Пустой файл рецептов или анализов")
+
+    acids_map = acid_columns(lab_columns)
+    if not acids_map:
+        raise ValueError(f"В файле {lab_path} нет колонок с кислотами")
+    acids = list(acids_map.values())
+
+    recipe_name, lab_name = recipe_columns[0], lab_columns[0]
+    components, amounts = _component_amounts(recipe_columns, recipe_rows, {recipe_name})
+    matcher = RationNameMatcher(row[recipe_name] for row in recipe_rows)
+    resolved = matcher.resolve([row[lab_name] for row in lab_rows], cutoff)
+
+    matched = [i for i, indices in enumerate(resolved) if indices]
+    if not matched:
+        raise ValueError(f"Ни один анализ из {lab_path} не сопоставлен с рецептами {recipes_path}")
+    skipped = len(lab_rows) - len(matched)
+    if skipped:
+        print(f"⚠️ Анализов без рецепта: {skipped} из {len(lab_rows)}")
+
+    mixed = np.array([amounts[resolved[i]].mean(axis=0) for i in matched])
+    X = (featurizer or DietFeaturizer()).featurize_amounts(components, mixed)
+    Y = np.array([[_to_float(lab_rows[i][column]) for column in acids_map] for i in matched])
+    print(f"📊 Обучающая выборка: {X.shape[0]} анализов, {X.shape[1]} признаков, {len(acids)} кислот")
+    return X, Y, acids
+
+
+def fit_multi_output(X: np.ndarray, Y: np.ndarray, alpha: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """Одно решение МНК/ridge сразу для всех кислот: W (признаки x кислоты), b (кислоты)"""
+    x_mean = X.mean(axis=0)
+    y_mean = Y.mean(axis=0)
+    Xc = X - x_mean
+    Yc = Y - y_mean
+    if alpha > 0:
+        # Ridge как МНК на расширенной системе [X; sqrt(alpha) I] W = [Y; 0]
+        n_features = X.shape[1]
+        Xc = np.vstack([Xc, np.sqrt(alpha) * np.eye(n_features)])
+        Yc = np.vstack([Yc, np.zeros((n_features, Y.shape[1]))])
+    W, *_ = np.linalg.lstsq(Xc, Yc, rcond=None)
+    intercepts = y_mean - x_mean @ W
+    return W, intercepts
+
+
+def regression_metrics(Y_true: np.ndarray, Y_pred: np.ndarray) -> Dict[str, np.ndarray]:
+    """R2, MAE и MAPE по каждой кислоте (как compute_metrics в ноутбуке)"""
+    residuals = Y_true - Y_pred
+    ss_res = (residuals ** 2).sum(axis=0)
+    ss_tot = ((Y_true - Y_true.mean(axis=0)) ** 2).sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r2 = np.where(ss_tot > 0, 1.0 - ss_res / ss_tot, np.nan)
+        relative = np.where(Y_true != 0, np.abs(residuals / Y_true), np.nan)
+    mape = np.nanmean(relative, axis=0) * 100 if relative.size else np.full(Y_true.shape[1], np.nan)
+    return {
+        'R2': r2,
+        'MAE': np.abs(residuals).mean(axis=0),
+        'MAPE_percent': mape,
+    }
+
+
+def kfold_indices(n_rows: int, n_folds: int, random_state: int = 42) -> List[np.ndarray]:
+    """Перемешанные индексы тестовых частей для k-fold"""
+    order = np.random.default_rng(random_state).permutation(n_rows)
+    return np.array_split(order, n_folds)
+
+
+def cross_validate(X: np.ndarray, Y: np.ndarray, alpha: float = 0.0, n_folds: int = 5,
+                   random_state: int = 42, n_jobs: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """K-fold CV; фолды считаются параллельно, предсказания собираются в одну матрицу"""
+    folds = kfold_indices(len(X), n_folds, random_state)
+    predictions = np.empty_like(Y)
+
+    def run_fold(test_idx: np.ndarray):
+        train_mask = np.ones(len(X), dtype=bool)
+        train_mask[test_idx] = False
+        W, b = fit_multi_output(X[train_mask], Y[train_mask], alpha)
+        return test_idx, X[test_idx] @ W + b
+
+    with ThreadPoolExecutor(max_workers=n_jobs or min(n_folds, os.cpu_count() or 1)) as executor:
+        for test_idx, fold_pred in executor.map(run_fold, folds):
+            predictions[test_idx] = fold_pred
+
+    return regression_metrics(Y, predictions)
+
+
+def write_model_files(output_dir: str, acids: List[str], weights: np.ndarray, intercepts: np.ndarray):
+    """Пишет по одному *_model.pkl на кислоту в формате LinearRegression"""
+    from sklearn.linear_model import LinearRegression
+
+    os.makedirs(output_dir, exist_ok=True)
+    for i, acid in enumerate(acids):
+        model = LinearRegression()
+        model.coef_ = weights[:, i].copy()
+        model.intercept_ = float(intercepts[i])
+        model.n_features_in_ = weights.shape[0]
+        with open(os.path.join(output_dir, f'{acid}_model.pkl'), 'wb') as f:
+            pickle.dump(model, f)
+
+
+class AcidModelTrainer:
+    """Обучение линейных моделей всех кислот одним многомерным решением"""
+
+    def __init__(self, alpha: float = 0.0, n_folds: int = 5, random_state: int = 42):
+        self.alpha = alpha
+        self.n_folds = n_folds
+        self.random_state = random_state
+        self.features = list(AppConfig.MODEL_FEATURES)
+
+    def train(self, X: np.ndarray, Y: np.ndarray, acids: List[str]) -> Dict:
+        """Обучает модели и считает CV-метрики; возвращает веса, метрики и статистику"""
+        complete = ~np.isnan(Y).any(axis=1)
+        dropped = int((~complete).sum())
+        if dropped:
+            print(f"⚠️ Удалено строк с пропусками в кислотах: {dropped}")
+        X, Y = X[complete], Y[complete]
+        if len(X) < self.n_folds:
+            raise ValueError(f"Недостаточно строк для обучения: {len(X)}")
+
+        W, intercepts = fit_multi_output(X, Y, self.alpha)
+        cv_metrics = cross_validate(X, Y, self.alpha, self.n_folds, self.random_state)
+        baseline = regression_metrics(Y, np.broadcast_to(Y.mean(axis=0), Y.shape))
+
+        metrics = {
+            acid: {
+                'model': {name: float(values[i]) for name, values in cv_metrics.items()},
+                'baseline': {name: float(values[i]) for name, values in baseline.items()},
+            }
+            for i, acid in enumerate(acids)
+        }
+        for acid in acids:
+            model_metrics = metrics[acid]['model']
+            print(f"   {acid}: R2={model_metrics['R2']:.3f}, MAE={model_metrics['MAE']:.3f}")
+
+        return {
+            'acids': acids,
+            'features': self.features,
+            'weights': W,
+            'intercepts': intercepts,
+            'metrics': metrics,
+            'rows_initial': int(len(complete)),
+            'rows_used': int(complete.sum()),
+            'rows_dropped_due_na_targets': dropped,
+            'alpha': self.alpha,
+            'n_folds': self.n_folds,
+        }
+
+    def save(self, result: Dict, output_dir: str):
+        """Сохраняет модели в формате, который загружает LinearAcidPredictor"""
+        write_model_files(output_dir, result['acids'], result['weights'], result['intercepts'])
+
+        summary = {key: value for key, value in result.items() if key not in ('weights', 'intercepts')}
+        summary['trained_at'] = datetime.now().isoformat(timespec='seconds')
+        with open(os.path.join(output_dir, METRICS_FILE), 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=4)
+
+        print(f"💾 Сохранено моделей: {len(result['acids'])} в {output_dir}")
@@ -0,0 +1,259 @@
+# services/uncertainty.py
+import json
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from ..models.diet import Diet
+from ..models.fatty_acid import PredictionResult
+from .model_registry import ModelSnapshot
+
+# Число сэмплов Монте-Карло на рацион
+MC_SAMPLES = 2000
+# Разброс количеств компонентов при раздаче: относительное СКО (±5-15% на практике)
+AMOUNT_CV = 0.1
+# Относительное СКО коэффициентов моделей, если нет метрик кросс-валидации
+COEF_CV = 0.1
+# Границы интервала прогноза, перцентили
+INTERVAL = (5.0, 95.0)
+# Сколько чисел держать в одном блоке вычислений (сэмплы x рационы x столбцы)
+MC_BLOCK_CELLS = 4_000_000
+DEFAULT_SEED = 42
+
+
+def residual_sd_from_metrics(metrics_path: str) -> Dict[str, float]:
+    """СКО остатков по кислотам из metrics.json тренера (MAE кросс-валидации).
+
+    Для нормальных остатков СКО = MAE * sqrt(pi / 2).
+    """
+    with open(metrics_path, 'r', encoding='utf-8') as f:
+        summary = json.load(f)
+    return {
+        acid: float(entry['model']['MAE']) * np.sqrt(np.pi / 2)
+        for acid, entry in summary.get('metrics', {}).items()
+        if 'MAE' in entry.get('model', {})
+    }
+
+
+def residual_sd_for_version(registry, version: str) -> Dict[str, float]:
+    """СКО остатков для версии моделей; пустой словарь, если metrics.json нет или он не читается"""
+    path = registry.metrics_path(version) if registry is not None else None
+    if path is None:
+        return {}
+    try:
+        return residual_sd_from_metrics(path)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"⚠️ Метрики моделей {version} не прочитаны: {e}")
+        return {}
+
+
+@dataclass
+class PredictionUncertainty:
+    """Интервалы прогноза и вероятность попасть в норму (рационы x кислоты)"""
+    acids: List[str]
+    point: np.ndarray                   # точечный прогноз
+    low: np.ndarray                     # нижняя граница интервала
+    median: np.ndarray
+    high: np.ndarray                    # верхняя граница интервала
+    probability_in_range: np.ndarray    # доля сэмплов в целевом диапазоне
+    samples: int
+    interval: tuple = INTERVAL
+    model_version: str = ''
+
+    def __len__(self) -> int:
+        return self.point.shape[0]
+
+    def acid_index(self, acid: str) -> Optional[int]:
+        try:
+            return self.acids.index(acid)
+        except ValueError:
+            return None
+
+    def apply(self, results: Sequence[PredictionResult]) -> List[PredictionResult]:
+        """Копии результатов прогноза с интервалами в AcidPrediction.
+
+        Исходные результаты не меняются: predictor.predict отдает их из кэша.
+        """
+        columns = {acid: i for i, acid in enumerate(self.acids)}
+        applied = []
+        for row, result in enumerate(results):
+            acids = {}
+            for acid_name, acid_pred in result.acids.items():
+                column = columns.get(acid_name)
+                if column is None:
+                    acids[acid_name] = acid_pred
+                    continue
+                acids[acid_name] = replace(
+                    acid_pred,
+                    interval_low=float(self.low[row, column]),
+                    interval_high=float(self.high[row, column]),
+                    probability_in_range=float(self.probability_in_range[row, column]),
+                )
+            applied.append(PredictionResult(acids=acids))
+        return applied
+
+
+class UncertaintyEstimator:
+    """Монте-Карло оценка неопределенности линейного прогноза.
+
+    Количества компонентов умножаются на случайные множители (СКО
+    amount_cv). Ошибка модели - шум остатков со СКО по MAE кросс-валидации
+    из metrics.json версии (trainer); если метрик нет, коэффициенты
+    умножаются на (1 + COEF_CV * шум). Признаки
+    всех сэмплов пакета собираются разреженными произведениями (как в
+    DietFeaturizer, включая доли нутриентов в СВ), а кислоты считаются
+    одним пакетным matmul сэмплы x рационы x признаки. Выборка
+    коэффициентов общая для всех рационов вызова: стадо оценивается
+    одной версией модели. Генератор фиксирован, поэтому повторный
+    расчет того же рациона дает тот же интервал.
+    """
+
+    def __init__(self, predictor, samples: int = MC_SAMPLES, amount_cv: float = AMOUNT_CV,
+                 coef_cv: Optional[float] = None, residual_sd: Optional[Dict[str, float]] = None,
+                 interval: tuple = INTERVAL, seed: int = DEFAULT_SEED):
+        self.predictor = predictor
+        self.featurizer = predictor.featurizer
+        self.samples = samples
+        self.amount_cv = amount_cv
+        # Заданные явно значения важнее метрик версии моделей
+        self.coef_cv = coef_cv
+        self.residual_sd = residual_sd
+        self.interval = interval
+        self.seed = seed
+        self._model_noise: Dict[str, Tuple[float, Dict[str, float]]] = {}
+
+    def model_noise(self, version: str) -> Tuple[float, Dict[str, float]]:
+        """(СКО коэффициентов, СКО остатков по кислотам) для версии моделей"""
+        noise = self._model_noise.get(version)
+        if noise is None:
+            residual_sd = self.residual_sd
+            if residual_sd is None:
+                residual_sd = residual_sd_for_version(getattr(self.predictor, 'registry', None), version)
+            coef_cv = self.coef_cv
+            if coef_cv is None:
+                coef_cv = 0.0 if residual_sd else COEF_CV
+            noise = self._model_noise[version] = (coef_cv, residual_sd)
+        return noise
+
+    def estimate(self, diet: Diet, snapshot: Optional[ModelSnapshot] = None) -> PredictionUncertainty:
+        return self.estimate_batch([diet], snapshot)
+
+    def estimate_batch(self, diets: Sequence[Diet],
+                       snapshot: Optional[ModelSnapshot] = None) -> PredictionUncertainty:
+        """Интервалы для набора рационов (например, всего стада) за один вызов"""
+        snapshot = snapshot or self.predictor.snapshot
+        diets = list(diets)
+        n_acids = len(snapshot.acids)
+        rng = np.random.default_rng(self.seed)
+
+        coef_cv, acid_residual_sd = self.model_noise(snapshot.version)
+        # Выборка коэффициентов: сэмплы x признаки x кислоты (сразу в виде для matmul)
+        weights = snapshot.weights.T[None, :, :]
+        if coef_cv:
+            weights = weights * (1.0 + coef_cv * rng.standard_normal((self.samples,) + snapshot.weights.T.shape))
+        residual_sd = np.array([acid_residual_sd.get(acid, 0.0) for acid in snapshot.acids])
+        limits = [self.predictor._get_acid_limits(acid) for acid in snapshot.acids]
+        target_min = np.array([limit['min'] for limit in limits])
+        target_max = np.array([limit['max'] for limit in limits])
+
+        point = np.zeros((len(diets), n_acids))
+        stats = np.zeros((3, len(diets), n_acids))
+        probability = np.zeros((len(diets), n_acids))
+
+        for start, stop in self._blocks(diets, n_acids):
+            block = diets[start:stop]
+            features = self.featurizer.featurize(block)
+            point[start:stop] = features @ snapshot.weights.T + snapshot.intercepts
+
+            sampled = self._sample_features(block, features, rng)
+            values = np.matmul(sampled, weights) + snapshot.intercepts
+            if residual_sd.any():
+                values += rng.standard_normal(values.shape) * residual_sd
+
+            low, high = self.interval
+            stats[:, start:stop] = np.percentile(values, [low, 50.0, high], axis=0)
+            probability[start:stop] = ((values >= target_min) & (values <= target_max)).mean(axis=0)
+
+        return PredictionUncertainty(list(snapshot.acids), point, stats[0], stats[1], stats[2],
+                                     probability, self.samples, self.interval, snapshot.version)
+
+    def predict_batch(self, diets: Sequence[Diet]) -> List[PredictionResult]:
+        """Прогноз с интервалами (AcidPrediction.interval_low/high, probability_in_range)"""
+        diets = list(diets)
+        snapshot = self.predictor.snapshot
+        results = self.predictor.predict_batch(diets, snapshot=snapshot)
+        if not snapshot.acid_models or not diets:
+            return results
+        return self.estimate_batch(diets, snapshot).apply(results)
+
+    def _blocks(self, diets: List[Diet], n_acids: int):
+        """Границы пакетов рационов, чтобы блок сэмплов помещался в MC_BLOCK_CELLS"""
+        width = max(n_acids, len(self.featurizer.features), 1)
+        start = 0
+        while start < len(diets):
+            stop, cells = start, 0
+            while stop < len(diets):
+                cells += self.samples * max(width, len(diets[stop].components))
+                if stop > start and cells > MC_BLOCK_CELLS:
+                    break
+                stop += 1
+            yield start, stop
+            start = stop
+
+    def _sample_features(self, diets: List[Diet], features: np.ndarray,
+                         rng: np.random.Generator) -> np.ndarray:
+        """Признаки сэмплов (сэмплы x рационы x признаки) при случайных количествах компонентов"""
+        featurizer = self.featurizer
+        n_diets, n_features = features.shape
+        # Нужные нутриенты и последний столбец - доля СВ
+        as_fed = featurizer.nutrient_as_fed()
+        library = featurizer.feed_library if as_fed is not None else None
+
+        rows, columns, lib_rows, amounts = [], [], [], []
+        for row, diet in enumerate(diets):
+            for comp_name, component in diet.components.items():
+                column = featurizer.component_column(comp_name)
+                lib_row = library.ingredient_row(comp_name) if library is not None else None
+                if column is None and lib_row is None:
+                    continue
+                rows.append(row)
+                columns.append(-1 if column is None else column)
+                lib_rows.append(-1 if lib_row is None else lib_row)
+                amounts.append(component.amount)
+
+        if not amounts:
+            return np.broadcast_to(features, (self.samples, n_diets, n_features)).copy()
+
+        rows, columns, lib_rows = np.asarray(rows), np.asarray(columns), np.asarray(lib_rows)
+        sampled = np.zeros((self.samples, n_diets, n_features))
+        base_direct = np.zeros((n_diets, n_features))
+        multipliers = np.clip(1.0 + self.amount_cv * rng.standard_normal((self.samples, len(amounts))), 0.0, None)
+        # Транспонировано: компоненты x сэмплы, чтобы умножать разреженную матрицу слева
+        perturbed = (multipliers * np.asarray(amounts, dtype=float)).T
+
+        direct = columns >= 0
+        if direct.any():
+            entries = np.flatnonzero(direct)
+            projection = sparse.csr_matrix(
+                (np.ones(len(entries)), (rows[entries] * n_features + columns[entries], entries)),
+                shape=(n_diets * n_features, len(amounts))
+            )
+            np.add.at(base_direct, (rows[entries], columns[entries]), np.asarray(amounts, dtype=float)[entries])
+            sampled[:] = (projection @ perturbed).T.reshape(self.samples, n_diets, n_features)
+
+        in_library = lib_rows >= 0
+        if library is not None and in_library.any():
+            width = as_fed.shape[1]
+
+            entries = np.flatnonzero(in_library)
+            per_entry = as_fed[lib_rows[entries]].tocoo()
+            projection = sparse.csr_matrix(
+                (per_entry.data, (rows[entries][per_entry.row] * width + per_entry.col, entries[per_entry.row])),
+                shape=(n_diets * width, len(amounts))
+            )
+            totals = (projection @ perturbed).T.reshape(self.samples, n_diets, width)
+            # Источник нутриента выбирается по исходному рациону, а не по сэмплу
+            featurizer.blend_nutrients(sampled, totals, direct=base_direct)
+        return sampled
@@ -1,15 +1,23 @@
+import copy
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import os
-from typing import Optional, List
+from typing import Optional, List, Tuple
 
 from ..models.diet import Diet
-from ..services.predictor import AcidPredictor
-from ..services.recommender import DietRecommender
 from .widgets.diet_editor import DietEditor
 from .widgets.acid_predictions import AcidPredictionDisplay
 from .widgets.recommendations import RecommendationsDisplay
-from ..services.excel_parser import ExcelParser
+from .widgets.acid_chart import AcidChartPanel
+from .widgets.diet_selector import DietSelector
+from ..services.diet_index import DietIndex
+from ..utils.profiling import memory_profiler
+# Сервисы прогноза (numpy/scipy) импортируются в методах: окно открывается без них
+
+# Задержка живого прогноза после последнего ввода, мс
+LIVE_DEBOUNCE_MS = 150
+# Рекомендации обновляются после паузы в правках, мс
+RECOMMEND_IDLE_MS = 700
 
 
 class DietPredictionView:
@@ -21,14 +29,33 @@ class DietPredictionView:
         
         self.current_diets = [] 
         self.current_diet = None 
+        # Поиск и выбор рациона без просмотра current_diets
+        self.diet_index = DietIndex()
         
-        self.predictor = AcidPredictor()
-        self.recommender = DietRecommender(self.predictor)
+        self._live = None  # LivePrediction текущего рациона
+        self._live_edits = {}
+        self._live_after = None
+        self._recommend_after = None
         
         self.frame = ttk.Frame(parent, padding="10")
         self.editor_visible = True 
+        self.live_var = tk.BooleanVar(value=True)
+        # Режим неопределенности: интервалы прогноза и вероятность нормы (Монте-Карло)
+        self.uncertainty_var = tk.BooleanVar(value=False)
+        self._uncertainty = None  # UncertaintyEstimator текущего предиктора
         self.create_widgets()
-        
+
+    @property
+    def predictor(self):
+        """Общий с приложением предиктор (модели загружаются один раз, в фоне)"""
+        return self.app.predictor
+
+    @property
+    def recommender(self):
+        return self.app.recommender
+
+    def on_models_loaded(self):
+        """Вызывается главным окном после фоновой загрузки моделей"""
         self._test_model_loading()
 
     def _test_model_loading(self):
@@ -81,8 +108,17 @@ class DietPredictionView:
                   command=self.calculate_prediction,
                   style='Accent.TButton').grid(row=5, column=0, pady=20)
         
-        self.prediction_display = AcidPredictionDisplay(main_container, self)
-        self.prediction_display.frame.grid(row=6, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
+        results_frame = ttk.Frame(main_container)
+        results_frame.grid(row=6, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
+        results_frame.columnconfigure(0, weight=1)
+        results_frame.columnconfigure(1, weight=1)
+        results_frame.rowconfigure(0, weight=1)
+        
+        self.prediction_display = AcidPredictionDisplay(results_frame, self)
+        self.prediction_display.frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), padx=(0, 5))
+        
+        self.chart_panel = AcidChartPanel(results_frame, self)
+        self.chart_panel.frame.grid(row=0, column=1, sticky=(tk.W, tk.E, tk.N, tk.S))
         
         self.recommendations_display = RecommendationsDisplay(main_container, self)
         self.recommendations_display.frame.grid(row=7, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
@@ -100,6 +136,19 @@ class DietPredictionView:
         )
         self.toggle_editor_btn.grid(row=0, column=0, sticky=tk.W)
         
+        ttk.Checkbutton(
+            control_frame,
+            text="Живой прогноз при изменении количеств",
+            variable=self.live_var
+        ).grid(row=0, column=1, sticky=tk.E)
+        
+        ttk.Checkbutton(
+            control_frame,
+            text="Интервалы и вероятность нормы",
+            variable=self.uncertainty_var,
+            command=self._on_uncertainty_toggled
+        ).grid(row=0, column=2, sticky=tk.E, padx=(10, 0))
+        
     def toggle_editor_visibility(self):
         """Переключение видимости редактора рациона"""
         if self.editor_visible:
@@ -133,169 +182,190 @@ class DietPredictionView:
         self.file_status_label.grid(row=1, column=0, columnspan=3, sticky=tk.W, pady=(10, 0))
     
     def create_diet_selection_section(self, parent, row: int):
-        """Секция выбора рациона"""
-        selection_frame = ttk.LabelFrame(parent, text="Выбор рациона", padding="10")
-        selection_frame.grid(row=row, column=0, sticky=(tk.W, tk.E), pady=(0, 10))
-        selection_frame.columnconfigure(1, weight=1)
-        
-        ttk.Label(selection_frame, text="Выберите рацион:").grid(row=0, column=0, sticky=tk.W, padx=(0, 10))
-        
-        self.diet_combobox = ttk.Combobox(selection_frame, state="readonly", width=30)
-        self.diet_combobox.grid(row=0, column=1, sticky=(tk.W, tk.E))
-        self.diet_combobox.bind('<<ComboboxSelected>>', self.on_diet_selected)
-        
-        ttk.Button(selection_frame,
-                  text="Обновить",
-                  command=self.update_diet_combobox).grid(row=0, column=2, padx=(10, 0))
+        """Секция выбора рациона (поиск по ID, названию и файлу)"""
+        self.diet_selector = DietSelector(parent, self, self.diet_index)
+        self.diet_selector.frame.grid(row=row, column=0, sticky=(tk.W, tk.E), pady=(0, 10))
+        self.diet_selector.refresh()
     
-    def on_diet_selected(self, event):
-        """Обработчик выбора рациона из списка"""
-        selected_index = self.diet_combobox.current()
-        if 0 <= selected_index < len(self.current_diets):
-            selected_diet = self.current_diets[selected_index]
-            self.set_current_diet(selected_diet)
-            self.update_diet_display()
-            self.file_status_label.config(text=f"Выбран: {selected_diet.diet_id}")
+    def select_diet(self, diet: Diet):
+        """Обработчик выбора рациона из списка совпадений"""
+        self.set_current_diet(diet)
+        self.diet_selector.show_current()
+        self.file_status_label.config(text=f"Выбран: {diet.diet_id}")
             
-    def update_diet_combobox(self):
-        """Обновляет выпадающий список с рационами"""
-        diet_names = [diet.name for diet in self.current_diets]
-        self.diet_combobox['values'] = diet_names
-        
-        if self.current_diet and self.current_diet in self.current_diets:
-            current_index = self.current_diets.index(self.current_diet)
-            self.diet_combobox.current(current_index)
-        elif self.current_diets:
-            self.diet_combobox.current(0)
+    def update_diet_selector(self):
+        """Обновляет список совпадений и выделение текущего рациона"""
+        self.diet_selector.refresh()
     
     def load_all_diets(self):
-        """Загружает все рационы из CSV файла"""
-        try:
-            file_path = filedialog.askopenfilename(
-                title="Выберите CSV файл с рационами",
-                filetypes=[("CSV files", "*.csv"), ("Excel files", "*.xlsx *.xls"), ("All files", "*.*")]
-            )
-            
-            if not file_path:
-                return
-                
-            print(f"\n🔄 Загрузка всех рационов из: {file_path}")
-            
-            parser = ExcelParser()
-            all_diets = parser.parse_all_diets(file_path)
+        """Загружает все рационы из CSV файла (разбор идет в фоне)"""
+        file_path = filedialog.askopenfilename(
+            title="Выберите CSV файл с рационами",
+            filetypes=[("CSV files", "*.csv"), ("Excel files", "*.xlsx *.xls"), ("All files", "*.*")]
+        )
+        
+        if not file_path:
+            return
             
-            if all_diets:
-                self.current_diets = all_diets  # Заменяем, а не добавляем
-                if all_diets:
-                    self.set_current_diet(all_diets[0])
-                
-                self.update_diet_combobox()
-                self.update_diet_display()
-                self.file_status_label.config(text=f"Загружено рационов: {len(all_diets)}")
-                print(f"✅ Загружено {len(all_diets)} рационов")
-            else:
-                self.file_status_label.config(text="Ошибка загрузки файла")
-                messagebox.showerror("Ошибка", "Не удалось загрузить рационы из файла")
-                
-        except Exception as e:
-            error_msg = f"Ошибка загрузки всех рационов: {e}"
-            print(f"❌ {error_msg}")
-            messagebox.showerror("Ошибка", error_msg)
+        print(f"\n🔄 Загрузка всех рационов из: {file_path}")
+        self.file_status_label.config(text=f"Загрузка: {os.path.basename(file_path)}...")
+        self.main_window.tasks.submit(
+            'load', self._parse_all_task, file_path,
+            on_success=self._on_all_diets_loaded,
+            on_error=lambda e: self._on_load_error(f"Ошибка загрузки всех рационов: {e}"),
+            description="Загрузка рационов"
+        )
     
-    def load_diet_file(self) -> Optional[Diet]:
-        """Загружает одиночный рацион"""
-        try:
-            file_path = filedialog.askopenfilename(
-                title="Выберите файл с рационом",
-                filetypes=[
-                    ("Все поддерживаемые форматы", "*.pdf *.csv *.xlsx *.xls"),
-                    ("PDF files", "*.pdf"),
-                    ("Excel files", "*.xlsx *.xls"),
-                    ("CSV files", "*.csv"),
-                    ("All files", "*.*")
-                ]
-            )
-            
-            if not file_path:
-                return None
-                
-            parser = ExcelParser()            
-            diet = parser.parse_diet(file_path)
-            
-            if diet:
-                file_name = os.path.basename(file_path)
-                diet.name = f"Рацион из {file_name}"
-                self.current_diets.append(diet)
-                self.set_current_diet(diet)
+    def _parse_all_task(self, task, file_path: str) -> Tuple[List[Diet], DietIndex]:
+        # Разбор, схлопывание повторов и запись новых рационов в хранилище - через приложение
+        groups = self.app.load_diet_groups(file_path, progress=task.report)
+        # Индекс поиска строится здесь же, в фоне; у рациона видны все его строки в файле
+        diet_index = DietIndex()
+        for group in groups:
+            diet_index.add(group.diet, source=group.source_label())
+        return [group.diet for group in groups], diet_index
+    
+    def _on_all_diets_loaded(self, loaded: Tuple[List[Diet], DietIndex]):
+        all_diets, diet_index = loaded
+        if all_diets:
+            self.current_diets = all_diets  # Заменяем, а не добавляем
+            self.diet_index = self.diet_selector.index = diet_index
+            self.set_current_diet(all_diets[0])
             
-                self.update_diet_combobox()
-                self.update_diet_display()
-                self.file_status_label.config(text=f"Загружен: {file_name}")
-                self.print_current_diet_info()
-                return diet
-            else:
-                self.file_status_label.config(text="Ошибка загрузки файла")
-                messagebox.showerror("Ошибка", "Не удалось загрузить рацион из файла")
-                return None
-                
-        except Exception as e:
-            error_msg = f"Ошибка загрузки файла: {e}"
-            print(f"❌ {error_msg}")
-            messagebox.showerror("Ошибка", error_msg)
-            return None
+            self.update_diet_selector()
+            self.file_status_label.config(text=f"Загружено рационов: {len(all_diets)}")
+            print(f"✅ Загружено {len(all_diets)} рационов")
+            self.main_window.on_diets_loaded(all_diets)
+        else:
+            self._on_load_error("Не удалось загрузить рационы из файла")
     
-    def create_new_diet(self):
-        """Создание нового пустого рациона"""
-        from ..models.diet import DietComponent 
+    def _on_load_error(self, error_msg: str):
+        print(f"❌ {error_msg}")
+        self.file_status_label.config(text="Ошибка загрузки файла")
+        messagebox.showerror("Ошибка", error_msg)
+    
+    def load_diet_file(self):
+        """Загружает одиночный рацион (разбор идет в фоне)"""
+        file_path = filedialog.askopenfilename(
+            title="Выберите файл с рационом",
+            filetypes=[
+                ("Все поддерживаемые форматы", "*.pdf *.csv *.xlsx *.xls"),
+                ("PDF files", "*.pdf"),
+                ("Excel files", "*.xlsx *.xls"),
+                ("CSV files", "*.csv"),
+                ("All files", "*.*")
+            ]
+        )
         
-        new_diet = Diet(
-            diet_id=f"diet_{len(self.current_diets) + 1}",
-            name=f"Новый рацион {len(self.current_diets) + 1}",
-            components={}
+        if not file_path:
+            return
+        
+        self.file_status_label.config(text=f"Загрузка: {os.path.basename(file_path)}...")
+        self.main_window.tasks.submit(
+            'load', lambda task: self.app.load_diet_from_file(file_path, progress=task.report),
+            on_success=lambda diet: self._on_diet_file_loaded(diet, file_path),
+            on_error=lambda e: self._on_load_error(f"Ошибка загрузки файла: {e}"),
+            description="Загрузка рациона"
         )
+    
+    def _on_diet_file_loaded(self, diet: Optional[Diet], file_path: str):
+        if not diet:
+            self._on_load_error("Не удалось загрузить рацион из файла")
+            return
+        
+        file_name = os.path.basename(file_path)
+        self.current_diets.append(diet)
+        self.diet_index.add(diet, source=file_name)
+        self.set_current_diet(diet)
+        
+        self.update_diet_selector()
+        self.file_status_label.config(text=f"Загружен: {file_name}")
+        self.print_current_diet_info()
+    
+    def create_new_diet(self):
+        """Создание нового пустого рациона"""
+        new_diet = self.app.create_new_diet()
         self.current_diets.append(new_diet)
+        self.diet_index.add(new_diet)
         self.set_current_diet(new_diet)
-        self.update_diet_combobox()
-        self.update_diet_display()
+        self.update_diet_selector()
         self.file_status_label.config(text="Создан новый рацион")
         
     def set_current_diet(self, diet: Diet):
         """Устанавливает текущий рацион"""
         self.current_diet = diet
         if hasattr(self, 'diet_editor'):
-            self.diet_editor.load_diet(diet)
+            with memory_profiler.stage('render.editor', items=1):
+                self.diet_editor.load_diet(diet)
         
     def update_diet_display(self):
         """Обновление отображения рациона"""
         if self.current_diet and hasattr(self, 'diet_editor'):
-            self.diet_editor.load_diet(self.current_diet)
+            with memory_profiler.stage('render.editor', items=1):
+                self.diet_editor.load_diet(self.current_diet)
             
     def calculate_prediction(self):
-        """Расчет прогноза на основе текущего рациона"""
+        """Расчет прогноза на основе текущего рациона (в фоне; повторные нажатия объединяются)"""
         if not self.current_diet:
             messagebox.showwarning("Внимание", "Сначала загрузите или создайте рацион")
             return
-            
-        try:
-            if hasattr(self.main_window, 'set_status'):
-                self.main_window.set_status("Расчет прогноза...")
-            
-            prediction_result = self.predictor.predict(self.current_diet)
-            
-            recommendations = self.recommender.generate_recommendations(
-                self.current_diet, prediction_result)
-                
-            self.prediction_display.show_prediction(prediction_result)
+        
+        # Рабочий поток считает по копии: рацион можно править во время расчета
+        self.main_window.tasks.submit(
+            'predict', self._prediction_task, copy.deepcopy(self.current_diet), self.uncertainty_var.get(),
+            on_success=self._show_prediction,
+            on_error=lambda e: messagebox.showerror("Ошибка", f"Ошибка расчета прогноза: {e}"),
+            description="Расчет прогноза"
+        )
+    
+    @property
+    def uncertainty(self):
+        """Оценщик интервалов (UncertaintyEstimator) поверх текущего предиктора"""
+        from ..services.uncertainty import UncertaintyEstimator
+        predictor = self.predictor
+        if self._uncertainty is None or self._uncertainty.predictor is not predictor:
+            self._uncertainty = UncertaintyEstimator(predictor)
+        return self._uncertainty
+    
+    def _on_uncertainty_toggled(self):
+        """Пересчет показанного прогноза с интервалами или без них"""
+        if self.current_diet and self.app.models_ready:
+            self._refresh_live_prediction()
+    
+    def _with_uncertainty(self, prediction_result, diet: Diet, snapshot=None):
+        """Прогноз с интервалами (копия): пара тысяч сэмплов считается за миллисекунды"""
+        if not self.predictor.acid_models:
+            return prediction_result
+        return self.uncertainty.estimate(diet, snapshot).apply([prediction_result])[0]
+    
+    def _prediction_task(self, task, diet: Diet, with_uncertainty: bool = False):
+        from ..services.rec_engine import apply_adjustments
+        # До окончания фоновой загрузки моделей обращение к predictor ждет ее здесь, а не в окне
+        predictor, recommender = self.predictor, self.recommender
+        task.check()
+        # Прогноз через приложение: рацион и прогноз сохраняются в хранилище
+        prediction_result = self.app.predict_acids(diet)
+        with memory_profiler.stage('explain', items=1):
+            explanation = predictor.explain_batch([diet]) if predictor.acid_models else None
+            if with_uncertainty:
+                prediction_result = self._with_uncertainty(prediction_result, diet)
+        task.check()
+        with memory_profiler.stage('recommend', items=1):
+            recommendations, displayed = recommender.generate_with_details(diet, prediction_result, explanation)
+        task.check()
+        # Состояние "после" для графика: прогноз рациона с показанными изменениями количеств
+        adjusted = [rec for rec in displayed if rec.adjustments]
+        after = predictor.predict(apply_adjustments(diet, adjusted)) if adjusted else None
+        return prediction_result, explanation, recommendations, after
+    
+    def _show_prediction(self, result):
+        prediction_result, explanation, recommendations, after = result
+        with memory_profiler.stage('render.predictions', items=1):
+            self.prediction_display.show_prediction(prediction_result, explanation)
             self.recommendations_display.show_recommendations(recommendations)
-            
-            if hasattr(self.main_window, 'set_status'):
-                self.main_window.set_status("Прогноз рассчитан")
-            
-        except Exception as e:
-            error_msg = f"Ошибка расчета прогноза: {str(e)}"
-            print(f"❌ {error_msg}")
-            messagebox.showerror("Ошибка", error_msg)
-            
+            self.chart_panel.show(prediction_result, after)
+        self.main_window.set_status("Прогноз рассчитан")
+    
     def print_current_diet_info(self):
         """Выводит информацию о текущем рационе в терминал"""
         if not self.current_diet:
@@ -324,4 +394,71 @@ class DietPredictionView:
             if component_name in self.current_diet.components:
                 self.current_diet.components[component_name].amount = new_value
             else:
-                self.current_diet.components[component_name] = DietComponent(component_name, new_value)
\ No newline at end of file
+                self.current_diet.components[component_name] = DietComponent(component_name, new_value)
+            if self._live is not None and self._live.diet is self.current_diet:
+                self._live.set_amount(component_name, new_value)
+    
+    def on_component_edited(self, component_name: str, text: str):
+        """Ввод количества в редакторе: правки копятся и применяются одной пачкой после паузы"""
+        if not self.live_var.get():
+            return
+        try:
+            value = float(text.replace(',', '.'))
+        except ValueError:
+            return
+        if value < 0:
+            return
+        
+        self._live_edits[component_name] = value
+        if self._live_after is not None:
+            self.frame.after_cancel(self._live_after)
+        self._live_after = self.frame.after(LIVE_DEBOUNCE_MS, self._flush_live_edits)
+    
+    def _flush_live_edits(self):
+        self._live_after = None
+        edits, self._live_edits = self._live_edits, {}
+        if not self.current_diet:
+            return
+        for component_name, value in edits.items():
+            self.update_diet_component(component_name, value)
+        self._refresh_live_prediction()
+    
+    def _live_prediction(self):
+        """Инкрементальный прогноз текущего рациона (LivePrediction); пересоздается при смене рациона или моделей"""
+        from ..services.live_prediction import LivePrediction
+        predictor = self.predictor
+        live = self._live
+        if live is None or live.diet is not self.current_diet or live.snapshot is not predictor.snapshot:
+            live = self._live = LivePrediction(predictor, self.current_diet)
+        return live
+    
+    def _refresh_live_prediction(self):
+        """Пересчет по дельтам правок и обновление строк таблицы на месте"""
+        if not self.app.models_ready:
+            return
+        live = self._live_prediction()
+        prediction_result = live.prediction()
+        explanation = live.explanation() if live.snapshot.acid_models else None
+        if self.uncertainty_var.get():
+            prediction_result = self._with_uncertainty(prediction_result, self.current_diet, live.snapshot)
+        self.prediction_display.show_prediction(prediction_result, explanation)
+        # Прежнее состояние "после оптимизации" к измененному рациону уже не относится
+        self.chart_panel.show(prediction_result)
+        
+        if self._recommend_after is not None:
+            self.frame.after_cancel(self._recommend_after)
+        self._recommend_after = self.frame.after(
+            RECOMMEND_IDLE_MS, lambda: self._refresh_recommendations(prediction_result, explanation))
+    
+    def _refresh_recommendations(self, prediction_result, explanation=None):
+        """Рекомендации в фоне; более новый запуск заменяет незавершенный"""
+        self._recommend_after = None
+        if not self.current_diet:
+            return
+        self.main_window.tasks.submit(
+            'recommend',
+            lambda task, diet: self.recommender.generate_recommendations(diet, prediction_result, explanation),
+            copy.deepcopy(self.current_diet),
+            on_success=self.recommendations_display.show_recommendations,
+            description="Обновление рекомендаций", replace=True
+        )
@@ -0,0 +1,286 @@
+import base64
+import tkinter as tk
+from tkinter import ttk, filedialog
+from typing import List, Optional
+
+import numpy as np
+
+from ..models.diet import Diet
+from ..services.deduplicator import iter_unique_diets
+from ..services.herd_charts import HerdChartRenderer
+from ..services.herd_table import HerdTable, NAME_COLUMN, OUT_OF_RANGE_COLUMN
+
+# Число строк таблицы (строки Treeview создаются один раз и переиспользуются)
+VISIBLE_ROWS = 25
+# С какого числа кислот вне нормы строка считается проблемной
+BAD_OUT_OF_RANGE = 3
+
+
+class HerdDashboardView:
+    """Вкладка сводки по стаду: прогноз всех загруженных рационов одной таблицей.
+
+    Все рационы оцениваются одним пакетным прогнозом в фоне. Сортировка и
+    фильтр работают с массивами HerdTable, а в Treeview живет только
+    VISIBLE_ROWS строк, в которые подставляется видимое окно - поэтому
+    десятки тысяч рационов прокручиваются и сортируются без задержек.
+    """
+
+    def __init__(self, parent, app, main_window):
+        self.app = app
+        self.main_window = main_window
+
+        self.table: Optional[HerdTable] = None
+        self._diets: List[Diet] = []
+        # Индексы строк таблицы в порядке показа (после сортировки и фильтра)
+        self._view = np.arange(0)
+        self._first = 0
+        self._sort_column: Optional[str] = None
+        self._sort_descending = False
+        self._items: List[str] = []
+        self.chart_renderer = HerdChartRenderer()
+        self._chart_window = None
+
+        self.frame = ttk.Frame(parent, padding="10")
+        self.frame.columnconfigure(0, weight=1)
+        self.frame.rowconfigure(1, weight=1)
+
+        self.filter_var = tk.StringVar()
+        self.problems_var = tk.BooleanVar(value=False)
+        self.create_widgets()
+
+    def create_widgets(self):
+        """Создание виджетов вкладки"""
+        controls = ttk.Frame(self.frame)
+        controls.grid(row=0, column=0, sticky=(tk.W, tk.E), pady=(0, 10))
+        controls.columnconfigure(6, weight=1)
+
+        ttk.Button(controls, text="🔄 Оценить все рационы", command=self.score_loaded_diets).grid(row=0, column=0, padx=(0, 10))
+
+        ttk.Label(controls, text="Поиск:").grid(row=0, column=1, padx=(0, 5))
+        filter_entry = ttk.Entry(controls, textvariable=self.filter_var, width=30)
+        filter_entry.grid(row=0, column=2, padx=(0, 10))
+        self.filter_var.trace_add('write', lambda *_: self.apply_filter())
+
+        ttk.Checkbutton(controls, text="Только с отклонениями", variable=self.problems_var,
+                        command=self.apply_filter).grid(row=0, column=3, padx=(0, 10))
+
+        ttk.Button(controls, text="📊 График по стаду", command=self.show_herd_chart).grid(row=0, column=4, padx=(0, 10))
+        ttk.Button(controls, text="💾 Экспорт отчетов", command=self.export_reports).grid(row=0, column=5, padx=(0, 10))
+
+        self.summary_label = ttk.Label(controls, text="Рационы не загружены", foreground='gray')
+        self.summary_label.grid(row=0, column=6, sticky=tk.E)
+
+        table_frame = ttk.Frame(self.frame)
+        table_frame.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        table_frame.columnconfigure(0, weight=1)
+
+        self.tree = ttk.Treeview(table_frame, show='headings', height=VISIBLE_ROWS, selectmode='browse')
+        self.tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N))
+        self.tree.tag_configure('ok', background='#e8f5e9')
+        self.tree.tag_configure('warn', background='#fff8e1')
+        self.tree.tag_configure('bad', background='#ffebee')
+
+        self.scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.scrollbar.set(0.0, 1.0)
+
+        self.tree.bind('<MouseWheel>', lambda e: self._scroll_by(-3 if e.delta > 0 else 3))
+        self.tree.bind('<Button-4>', lambda e: self._scroll_by(-3))
+        self.tree.bind('<Button-5>', lambda e: self._scroll_by(3))
+        self.tree.bind('<Prior>', lambda e: self._scroll_by(-VISIBLE_ROWS))
+        self.tree.bind('<Next>', lambda e: self._scroll_by(VISIBLE_ROWS))
+        self.tree.bind('<Double-1>', self.on_row_activated)
+
+        ttk.Label(self.frame, text="▲/▼ - значение выше/ниже целевого диапазона; двойной щелчок открывает рацион",
+                  foreground='gray').grid(row=2, column=0, sticky=tk.W, pady=(5, 0))
+
+    def score_loaded_diets(self):
+        """Оценивает рационы, загруженные на вкладке прогнозирования"""
+        self.score(self.main_window.diet_prediction_view.current_diets)
+
+    def score(self, diets: List[Diet]):
+        """Пакетный прогноз всех рационов в фоне"""
+        if not diets:
+            self.summary_label.config(text="Рационы не загружены", foreground='gray')
+            return
+        # Повторы по составу (например, тот же рацион из другого файла) оцениваются один раз
+        diets = list(iter_unique_diets(diets))
+        self.summary_label.config(text=f"Оценка {len(diets)} рационов...", foreground='gray')
+        self.main_window.tasks.submit(
+            'herd', lambda task: HerdTable.from_diets(self.app.predictor, diets),
+            on_success=lambda table: self.show_table(table, diets),
+            on_error=lambda e: self.summary_label.config(text=f"Ошибка оценки: {e}", foreground='red'),
+            description="Оценка стада", replace=True
+        )
+
+    def show_table(self, table: HerdTable, diets: List[Diet]):
+        """Показывает новую сводку; сортировка и фильтр сохраняются"""
+        columns_changed = self.table is None or table.acids != self.table.acids
+        self.table = table
+        self._diets = diets
+        if columns_changed:
+            self._setup_columns()
+        if self._sort_column not in (None, NAME_COLUMN, OUT_OF_RANGE_COLUMN) and self._sort_column not in table.acids:
+            self._sort_column = None
+        self.apply_filter()
+        self.main_window.set_status(f"Стадо: оценено {len(table)} рационов (модели версии {table.model_version})")
+
+    def show_herd_chart(self):
+        """График по стаду: рисуется в фоне вне экрана, повторно берется из кеша"""
+        if self.table is None:
+            return
+        table = self.table
+        self.main_window.tasks.submit(
+            'herd_chart', lambda task: self.chart_renderer.render(table),
+            on_success=lambda png: self._show_chart_window(png, len(table)),
+            on_error=lambda e: self.main_window.show_error("Ошибка", f"Не удалось построить график: {e}"),
+            description="График по стаду", replace=True
+        )
+
+    def export_reports(self):
+        """Отчеты по всем загруженным рационам (CSV, Excel, PDF) в выбранный каталог, в фоне"""
+        diets = list(self.main_window.diet_prediction_view.current_diets)
+        if not diets:
+            self.main_window.show_info("Экспорт", "Сначала загрузите рационы")
+            return
+        output_dir = filedialog.askdirectory(title="Каталог для отчетов")
+        if not output_dir:
+            return
+
+        def export_task(task):
+            from ..services.report_exporter import ReportExporter
+            exporter = ReportExporter(self.app.predictor, self.app.recommender)
+            return exporter.export(diets, output_dir, progress=task.report)
+
+        self.main_window.tasks.submit(
+            'export', export_task,
+            on_success=lambda written: self.main_window.show_info(
+                "Экспорт", f"Сохранено файлов: {sum(len(paths) for paths in written.values())}\n{output_dir}"),
+            on_error=lambda e: self.main_window.show_error("Ошибка", f"Ошибка экспорта: {e}"),
+            description="Экспорт отчетов"
+        )
+
+    def _show_chart_window(self, png: bytes, diet_count: int):
+        if self._chart_window is None or not self._chart_window.winfo_exists():
+            self._chart_window = tk.Toplevel(self.frame)
+            self._chart_label = ttk.Label(self._chart_window)
+            self._chart_label.grid(row=0, column=0)
+        self._chart_window.title(f"Стадо: {diet_count} рационов")
+        # Ссылка на изображение хранится в метке, иначе его соберет сборщик мусора
+        self._chart_label.image = tk.PhotoImage(master=self._chart_window, data=base64.b64encode(png))
+        self._chart_label.config(image=self._chart_label.image)
+        self._chart_window.lift()
+
+    def _setup_columns(self):
+        columns = [NAME_COLUMN, OUT_OF_RANGE_COLUMN] + self.table.acids
+        self.tree.configure(columns=columns)
+        self.tree.column(NAME_COLUMN, width=200, minwidth=120, stretch=True)
+        self.tree.column(OUT_OF_RANGE_COLUMN, width=80, minwidth=60, anchor=tk.CENTER, stretch=False)
+        for acid in self.table.acids:
+            self.tree.column(acid, width=70, minwidth=50, anchor=tk.E, stretch=False)
+        self._update_headings()
+
+    def _update_headings(self):
+        titles = {NAME_COLUMN: "Рацион", OUT_OF_RANGE_COLUMN: "Вне нормы"}
+        for column in [NAME_COLUMN, OUT_OF_RANGE_COLUMN] + self.table.acids:
+            text = titles.get(column, column)
+            if column == self._sort_column:
+                text += " ▼" if self._sort_descending else " ▲"
+            self.tree.heading(column, text=text, command=lambda c=column: self.sort_by(c))
+
+    def sort_by(self, column: str):
+        """Сортировка по столбцу; повторный щелчок меняет направление"""
+        if self.table is None:
+            return
+        if column == self._sort_column:
+            self._sort_descending = not self._sort_descending
+        else:
+            self._sort_column = column
+            # Сначала худшие: больше отклонений - выше
+            self._sort_descending = column == OUT_OF_RANGE_COLUMN
+        self._update_headings()
+        self.apply_filter()
+
+    def apply_filter(self):
+        """Пересчитывает порядок показа по массивам и перерисовывает видимое окно"""
+        if self.table is None:
+            return
+        order = self.table.order(self._sort_column, self._sort_descending)
+        self._view = self.table.select(order, self.filter_var.get(), self.problems_var.get())
+        self._first = 0
+        self._render()
+
+        problems = int(np.count_nonzero(self.table.out_of_range))
+        self.summary_label.config(
+            text=f"Показано {len(self._view)} из {len(self.table)} · с отклонениями: {problems}",
+            foreground=''
+        )
+
+    def _render(self):
+        """Подставляет строки окна [_first, _first + VISIBLE_ROWS) в пул строк Treeview"""
+        visible = min(VISIBLE_ROWS, len(self._view))
+        self._first = max(0, min(self._first, len(self._view) - visible))
+
+        while len(self._items) < visible:
+            self._items.append(self.tree.insert('', 'end'))
+        while len(self._items) > visible:
+            self.tree.delete(self._items.pop())
+
+        # Строки пула переиспользуются - выделение относилось бы к другому рациону
+        self.tree.selection_remove(self.tree.selection())
+        for item, index in zip(self._items, self._view[self._first:self._first + visible]):
+            values, tag = self._row(int(index))
+            self.tree.item(item, values=values, tags=(tag,))
+
+        self._update_scrollbar(visible)
+
+    def _row(self, index: int):
+        table = self.table
+        cells = []
+        for value, status in zip(table.values[index], table.status[index]):
+            mark = " ▲" if status > 0 else " ▼" if status < 0 else ""
+            cells.append(f"{value:.2f}{mark}")
+        out_of_range = int(table.out_of_range[index])
+        if out_of_range == 0:
+            tag = 'ok'
+        elif out_of_range < BAD_OUT_OF_RANGE:
+            tag = 'warn'
+        else:
+            tag = 'bad'
+        return (table.names[index], out_of_range, *cells), tag
+
+    def _update_scrollbar(self, visible: int):
+        total = len(self._view)
+        if total <= visible:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self._first / total, (self._first + visible) / total)
+
+    def _scroll_to(self, first: int):
+        first = max(0, min(first, len(self._view) - VISIBLE_ROWS))
+        if first != self._first:
+            self._first = first
+            self._render()
+
+    def _scroll_by(self, rows: int):
+        self._scroll_to(self._first + rows)
+        return 'break'
+
+    def _on_scrollbar(self, *args):
+        """Команда полосы прокрутки: moveto доля | scroll n units/pages"""
+        if args[0] == 'moveto':
+            self._scroll_to(int(round(float(args[1]) * len(self._view))))
+        elif args[0] == 'scroll':
+            step = int(args[1]) * (VISIBLE_ROWS if args[2] == 'pages' else 1)
+            self._scroll_by(step)
+
+    def on_row_activated(self, event):
+        """Двойной щелчок: рацион открывается на вкладке прогнозирования"""
+        item = self.tree.identify_row(event.y)
+        if not item or item not in self._items:
+            return
+        diet = self._diets[int(self._view[self._first + self._items.index(item)])]
+        view = self.main_window.diet_prediction_view
+        if view.diet_index.position(diet) is not None:
+            view.select_diet(diet)
+            self.main_window.notebook.select(self.main_window.prediction_frame)
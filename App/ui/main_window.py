@@ -1,10 +1,13 @@
 import tkinter as tk
 from tkinter import ttk
 
+from .task_runner import BackgroundTaskRunner
+
 class MainWindow:
     def __init__(self, root, app):
         self.root = root
         self.app = app
+        self.tasks = BackgroundTaskRunner(root, self.set_status)
         self.setup_window()
         self.create_widgets()
         
@@ -13,6 +16,7 @@ class MainWindow:
         self.root.title("Анализ рационов коров")
         self.root.geometry("1200x800") 
         self.root.minsize(1000, 600)  
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
         self.root.columnconfigure(0, weight=1)
         self.root.rowconfigure(0, weight=1)
@@ -41,10 +45,53 @@ class MainWindow:
             row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S)
         )
         
+        self.herd_frame = ttk.Frame(self.notebook, padding="10")
+        self.notebook.add(self.herd_frame, text="Стадо")
+        self.herd_frame.columnconfigure(0, weight=1)
+        self.herd_frame.rowconfigure(0, weight=1)
+        
+        from .herd_dashboard_view import HerdDashboardView
+        self.herd_dashboard_view = HerdDashboardView(self.herd_frame, self.app, self)
+        self.herd_dashboard_view.frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        
+        status_frame = ttk.Frame(self.root)
+        status_frame.grid(row=1, column=0, sticky=(tk.W, tk.E))
+        status_frame.columnconfigure(0, weight=1)
+        
         self.status_var = tk.StringVar()
-        self.status_bar = ttk.Label(self.root, textvariable=self.status_var, relief=tk.SUNKEN)
-        self.status_bar.grid(row=1, column=0, sticky=(tk.W, tk.E))
-        self.set_status("Готов")
+        self.status_bar = ttk.Label(status_frame, textvariable=self.status_var, relief=tk.SUNKEN)
+        self.status_bar.grid(row=0, column=0, sticky=(tk.W, tk.E))
+        
+        self.cancel_button = ttk.Button(status_frame, text="Отмена", command=self.tasks.cancel, state='disabled')
+        self.cancel_button.grid(row=0, column=1, padx=(5, 0))
+        self.tasks.on_activity_changed = self._on_tasks_activity
+        
+        self.set_status("⏳ Загрузка моделей...")
+        # Загрузка стартует после первой отрисовки окна
+        self.root.after_idle(self.start_loading_models)
+    
+    def start_loading_models(self):
+        """Фоновая загрузка моделей через общий исполнитель задач"""
+        self.tasks.submit('models', lambda task: self.app.start_loading_models().result()[0],
+                          on_success=self._on_models_loaded,
+                          on_error=lambda e: self.set_status(f"Ошибка загрузки моделей: {e}"),
+                          description="Загрузка моделей", cancellable=False)
+    
+    def _on_models_loaded(self, predictor):
+        self.diet_prediction_view.on_models_loaded()
+        self.set_status(f"Готов (модели версии {predictor.model_version})")
+    
+    def on_diets_loaded(self, diets):
+        """Новый набор рационов: сводка по стаду пересчитывается одним пакетом"""
+        self.herd_dashboard_view.score(diets)
+    
+    def _on_tasks_activity(self, busy: bool):
+        self.cancel_button.config(state='normal' if busy else 'disabled')
+    
+    def on_close(self):
+        """Закрытие окна: фоновые задачи отменяются, потоки не держат процесс"""
+        self.tasks.shutdown()
+        self.root.destroy()
     
     def set_status(self, message: str):
         """Установка статуса"""
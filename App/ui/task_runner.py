@@ -0,0 +1,177 @@
+# ui/task_runner.py
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+# Период опроса очереди результатов из главного потока Tk, мс
+POLL_INTERVAL_MS = 50
+
+
+class TaskCancelled(BaseException):
+    """Задача отменена пользователем.
+
+    Наследуется от BaseException (как asyncio.CancelledError), чтобы
+    отмену не перехватывали широкие except Exception в сервисах.
+    """
+
+
+class BackgroundTask:
+    """Дескриптор фоновой задачи; передается функции первым аргументом"""
+
+    def __init__(self, runner: 'BackgroundTaskRunner', key: str, description: str,
+                 cancellable: bool = True):
+        self.runner = runner
+        self.key = key
+        self.description = description
+        self.cancellable = cancellable
+        self._cancel_event = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def check(self):
+        """Прерывает задачу, если ее отменили"""
+        if self._cancel_event.is_set():
+            raise TaskCancelled(self.description)
+
+    def report(self, done: int, total: int, message: Optional[str] = None):
+        """Прогресс из рабочего потока; подходит как progress-колбэк парсера"""
+        self.check()
+        self.runner._results.put(('progress', self, (done, total, message)))
+
+
+class BackgroundTaskRunner:
+    """Выполняет долгие операции интерфейса в пуле потоков.
+
+    Tk не потокобезопасен, поэтому рабочие потоки только кладут события в
+    очередь, а главный поток забирает их через root.after и вызывает
+    колбэки. Повторный запуск задачи с тем же ключом, пока она идет,
+    либо игнорируется (повторные нажатия), либо отменяет старую
+    (replace=True) - тогда ее результат отбрасывается.
+    """
+
+    def __init__(self, root, status_callback: Optional[Callable[[str], None]] = None,
+                 max_workers: int = 4):
+        self.root = root
+        self.status_callback = status_callback
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='gui-task')
+        self._results: queue.Queue = queue.Queue()
+        self._active: Dict[str, BackgroundTask] = {}
+        self._polling = False
+        self.on_activity_changed: Optional[Callable[[bool], None]] = None
+
+    @property
+    def busy(self) -> bool:
+        return bool(self._active)
+
+    def is_running(self, key: str) -> bool:
+        return key in self._active
+
+    def submit(self, key: str, func: Callable, *args,
+               on_success: Optional[Callable] = None,
+               on_error: Optional[Callable[[Exception], None]] = None,
+               description: str = "Выполняется", replace: bool = False,
+               cancellable: bool = True) -> Optional[BackgroundTask]:
+        """Запускает func(task, *args) в фоне; колбэки вызываются в главном потоке.
+
+        Возвращает None, если задача с этим ключом уже выполняется и
+        replace=False (повторное нажатие объединяется с текущим запуском).
+        """
+        current = self._active.get(key)
+        if current is not None:
+            if not replace:
+                return None
+            current.cancel()
+
+        task = BackgroundTask(self, key, description, cancellable)
+        self._active[key] = task
+        self._notify_activity()
+        self._set_status(f"⏳ {description}...")
+        self._executor.submit(self._run, task, func, args, on_success, on_error)
+        self._ensure_polling()
+        return task
+
+    def _run(self, task: BackgroundTask, func, args, on_success, on_error):
+        try:
+            task.check()
+            result = func(task, *args)
+            task.check()
+            self._results.put(('done', task, (result, on_success)))
+        except TaskCancelled:
+            self._results.put(('cancelled', task, None))
+        except Exception as e:
+            self._results.put(('error', task, (e, on_error)))
+
+    def cancel(self, key: Optional[str] = None):
+        """Отменяет задачу по ключу или все отменяемые задачи"""
+        tasks = list(self._active.values()) if key is None else [self._active.get(key)]
+        tasks = [task for task in tasks if task is not None and task.cancellable]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            self._set_status("⏹ Отмена...")
+
+    def shutdown(self):
+        self.cancel()
+        self._executor.shutdown(wait=False)
+
+    def _ensure_polling(self):
+        if not self._polling:
+            self._polling = True
+            self.root.after(POLL_INTERVAL_MS, self._poll)
+
+    def _poll(self):
+        """Обработка событий рабочих потоков в главном потоке"""
+        while True:
+            try:
+                kind, task, payload = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._handle(kind, task, payload)
+
+        if self._active:
+            self.root.after(POLL_INTERVAL_MS, self._poll)
+        else:
+            self._polling = False
+
+    def _handle(self, kind: str, task: BackgroundTask, payload):
+        current = self._active.get(task.key) is task
+        if kind == 'progress':
+            if current and not task.cancelled:
+                done, total, message = payload
+                percent = f" {done * 100 // total}%" if total else ""
+                self._set_status(f"⏳ {message or task.description}:{percent} ({done}/{total})")
+            return
+
+        # Устаревшая (замененная) задача: результат отбрасывается
+        if not current:
+            return
+        del self._active[task.key]
+        self._notify_activity()
+
+        if kind == 'done':
+            result, on_success = payload
+            self._set_status(f"✅ {task.description}: готово")
+            if on_success:
+                on_success(result)
+        elif kind == 'cancelled':
+            self._set_status(f"⏹ {task.description}: отменено")
+        else:
+            error, on_error = payload
+            print(f"❌ {task.description}: {error}")
+            self._set_status(f"❌ {task.description}: ошибка")
+            if on_error:
+                on_error(error)
+
+    def _set_status(self, message: str):
+        if self.status_callback:
+            self.status_callback(message)
+
+    def _notify_activity(self):
+        if self.on_activity_changed:
+            self.on_activity_changed(self.busy)
@@ -0,0 +1,147 @@
+import tkinter as tk
+from tkinter import ttk
+from typing import List, Optional
+
+import numpy as np
+
+from ...models.fatty_acid import PredictionResult
+
+# Шкала в ширинах целевого диапазона: 0..1 - норма, значения за пределами шкалы прижимаются к краю
+AXIS_LIMITS = (-1.0, 2.0)
+# Середина нормы - начало столбиков
+CENTER = 0.5
+BAR_HEIGHT = 0.4
+
+COLOR_OK = '#43a047'
+COLOR_OUT = '#e53935'
+COLOR_AFTER = '#1e88e5'
+
+
+class AcidChartPanel:
+    """График прогноза кислот относительно целевых диапазонов (TARGET_LIMITS).
+
+    Каждая кислота - столбик от середины нормы до прогноза в ширинах
+    диапазона, ниже него - столбик после оптимизации рациона. Фигура и
+    столбики создаются один раз: при обновлении меняются только их
+    размеры и цвет, а перерисовка идет блиттингом поверх сохраненного
+    фона - поэтому график успевает за живым прогнозом. matplotlib
+    импортируется при первом показе, чтобы не замедлять запуск.
+    """
+
+    def __init__(self, parent, view):
+        self.view = view
+        self.frame = ttk.LabelFrame(parent, text="Кислоты относительно нормы", padding="5")
+        self.frame.columnconfigure(0, weight=1)
+        self.frame.rowconfigure(0, weight=1)
+
+        self.placeholder = ttk.Label(self.frame, text="График появится после первого прогноза", foreground='gray')
+        self.placeholder.grid(row=0, column=0)
+
+        self.figure = None
+        self.canvas = None
+        self._acids: List[str] = []
+        self._before = []
+        self._after = []
+        self._background = None
+
+    def _ensure_figure(self, acids: List[str]) -> bool:
+        """Создает фигуру (один раз) и столбики (при смене набора кислот)"""
+        if self.canvas is None:
+            try:
+                from matplotlib.figure import Figure
+                from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+            except ImportError:
+                self.placeholder.config(text="Для графика установите matplotlib")
+                return False
+            self.figure = Figure(figsize=(5, 3.6), dpi=80)
+            self.canvas = FigureCanvasTkAgg(self.figure, master=self.frame)
+            self.canvas.get_tk_widget().grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+            self.canvas.mpl_connect('draw_event', self._on_draw)
+            self.placeholder.grid_remove()
+
+        if acids != self._acids:
+            self._build_axes(acids)
+        return True
+
+    def _build_axes(self, acids: List[str]):
+        from matplotlib.patches import Patch
+
+        self.figure.clear()
+        ax = self.figure.add_subplot(111)
+        y = np.arange(len(acids))
+        ax.axvspan(0.0, 1.0, color='#e8f5e9', zorder=0)
+        ax.axvline(CENTER, color='gray', linewidth=0.8, zorder=1)
+        ax.set_xlim(*AXIS_LIMITS)
+        ax.set_xticks([0.0, 1.0])
+        ax.set_xticklabels(['мин', 'макс'])
+        ax.set_yticks(y)
+        ax.set_yticklabels(acids, fontsize=8)
+        ax.set_ylim(len(acids) - 0.5, -0.5)
+
+        zeros = np.zeros(len(acids))
+        self._before = list(ax.barh(y - BAR_HEIGHT / 2, zeros, height=BAR_HEIGHT, left=CENTER, animated=True))
+        self._after = list(ax.barh(y + BAR_HEIGHT / 2, zeros, height=BAR_HEIGHT, left=CENTER,
+                                   color=COLOR_AFTER, alpha=0.7, animated=True))
+        # Легенда по заместителям: у анимированных столбиков она бы не рисовалась в общем проходе
+        ax.legend(handles=[Patch(color=COLOR_OK, label='Прогноз'),
+                           Patch(color=COLOR_AFTER, alpha=0.7, label='После оптимизации')],
+                  loc='lower center', bbox_to_anchor=(0.5, 1.0), ncol=2, fontsize=7, frameon=False)
+        self.figure.tight_layout()
+
+        self._acids = list(acids)
+        self._background = None
+        self.canvas.draw_idle()
+
+    @staticmethod
+    def _positions(prediction: PredictionResult, acids: List[str]) -> np.ndarray:
+        """Прогноз в ширинах целевого диапазона, прижатый к краям шкалы"""
+        positions = []
+        for acid in acids:
+            pred = prediction.acids[acid]
+            width = pred.target_max - pred.target_min
+            positions.append((pred.predicted_value - pred.target_min) / (width if width > 0 else 1.0))
+        return np.clip(positions, *AXIS_LIMITS)
+
+    def show(self, prediction: Optional[PredictionResult], after: Optional[PredictionResult] = None):
+        """Обновляет столбики; after - прогноз после оптимизации (None - скрыть)"""
+        if not prediction or not prediction.acids:
+            return
+        acids = list(prediction.acids)
+        if not self._ensure_figure(acids):
+            return
+
+        for bar, position in zip(self._before, self._positions(prediction, acids)):
+            bar.set_width(position - CENTER)
+            bar.set_color(COLOR_OK if 0.0 <= position <= 1.0 else COLOR_OUT)
+
+        has_after = after is not None and list(after.acids) == acids
+        after_positions = self._positions(after, acids) if has_after else np.full(len(acids), CENTER)
+        for bar, position in zip(self._after, after_positions):
+            bar.set_width(position - CENTER)
+            bar.set_visible(has_after)
+
+        self._blit()
+
+    def _animated(self):
+        return self._before + self._after
+
+    def _on_draw(self, event):
+        """Полная перерисовка (первый показ, смена размера): запоминаем фон без столбиков"""
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        ax = self.figure.axes[0] if self.figure.axes else None
+        if ax is None:
+            return
+        for artist in self._animated():
+            ax.draw_artist(artist)
+
+    def _blit(self):
+        if self._background is None:
+            # Фон еще не готов - столбики нарисует обработчик draw_event
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self._background)
+        self._draw_animated()
+        self.canvas.blit(self.figure.bbox)
@@ -1,8 +1,9 @@
 # gui/widgets/acid_predictions.py
 import tkinter as tk
 from tkinter import ttk
-from typing import Dict
+from typing import Dict, Optional
 from ...models.fatty_acid import AcidPrediction, PredictionResult
+from ...services.explanation import PredictionExplanation
 
 class AcidPredictionDisplay:
     def __init__(self, parent, controller):
@@ -11,51 +12,95 @@ class AcidPredictionDisplay:
         self.frame.columnconfigure(0, weight=1)
         self.frame.rowconfigure(0, weight=1)
         
-        self.tree = ttk.Treeview(self.frame, columns=('acid', 'value', 'target', 'status'), show='headings', height=8)
+        self.tree = ttk.Treeview(self.frame, columns=('acid', 'value', 'interval', 'probability', 'target', 'status', 'drivers'), show='headings', height=8)
         self.tree.heading('acid', text='Жирная кислота')
         self.tree.heading('value', text='Предсказание, %')
+        self.tree.heading('interval', text='Интервал 90%')
+        self.tree.heading('probability', text='P(в норме)')
         self.tree.heading('target', text='Целевой диапазон')
         self.tree.heading('status', text='Статус')
+        self.tree.heading('drivers', text='Главные факторы (вклад, п.п.)')
         
         self.tree.column('acid', width=150)
         self.tree.column('value', width=120)
+        self.tree.column('interval', width=110)
+        self.tree.column('probability', width=80)
         self.tree.column('target', width=120)
         self.tree.column('status', width=100)
+        self.tree.column('drivers', width=260)
         
         self.tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
         scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.tree.yview)
         scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
         self.tree.configure(yscrollcommand=scrollbar.set)
+        
+        # Строки дерева по кислотам и показанные в них значения (для обновления на месте)
+        self._items: Dict[str, str] = {}
+        self._shown: Dict[str, tuple] = {}
     
-    def show_prediction(self, prediction_result: PredictionResult):
-        """Показывает результаты предсказания"""
+    def show_prediction(self, prediction_result: PredictionResult,
+                        explanation: Optional[PredictionExplanation] = None):
+        """Показывает результаты предсказания; при том же наборе кислот меняются только изменившиеся строки.
+
+        explanation - разложение прогноза этого рациона (первый рацион пакета): главные факторы по кислотам.
+        Интервал и вероятность нормы показываются, если прогноз посчитан в режиме неопределенности.
+        """
+        if not prediction_result or not prediction_result.acids:
+            self._clear()
+            self.tree.insert('', 'end', values=('Нет данных', '', '', '', '', '', ''))
+            return
+        
+        rows = {acid_name: self._row_values(acid_name, acid_pred, self._drivers_text(explanation, acid_name))
+                for acid_name, acid_pred in prediction_result.acids.items()}
+        
+        if list(rows) != list(self._items):
+            self._clear()
+            for acid_name, values in rows.items():
+                self._items[acid_name] = self.tree.insert('', 'end', values=values)
+                self._shown[acid_name] = values
+            return
+        
+        for acid_name, values in rows.items():
+            if self._shown[acid_name] != values:
+                self.tree.item(self._items[acid_name], values=values)
+                self._shown[acid_name] = values
+    
+    def _clear(self):
         for item in self.tree.get_children():
             self.tree.delete(item)
+        self._items.clear()
+        self._shown.clear()
+    
+    @staticmethod
+    def _drivers_text(explanation: Optional[PredictionExplanation], acid_name: str) -> str:
+        if explanation is None or not len(explanation):
+            return ''
+        return ', '.join(f"{feature} {contribution:+.1f}"
+                         for feature, contribution in explanation.drivers(0, acid_name))
+    
+    @staticmethod
+    def _row_values(acid_name: str, acid_pred: AcidPrediction, drivers: str = '') -> tuple:
+        if acid_pred.is_within_target:
+            status_text = "✅ В норме"
+        elif acid_pred.predicted_value < acid_pred.target_min:
+            status_text = "❌ Ниже нормы"
+        else:
+            status_text = "❌ Выше нормы"
         
-        if not prediction_result or not prediction_result.acids:
-            self.tree.insert('', 'end', values=('Нет данных', '', '', ''))
-            return
+        if acid_pred.interval_low is not None and acid_pred.interval_high is not None:
+            interval_text = f"{acid_pred.interval_low:.2f}…{acid_pred.interval_high:.2f}"
+        else:
+            interval_text = ''
+        probability_text = (f"{acid_pred.probability_in_range:.0%}"
+                            if acid_pred.probability_in_range is not None else '')
         
-        for acid_name, acid_pred in prediction_result.acids.items():
-            if acid_pred.is_within_target:
-                status_text = "✅ В норме"
-                status_color = 'green'
-            else:
-                if acid_pred.predicted_value < acid_pred.target_min:
-                    status_text = "❌ Ниже нормы"
-                else:
-                    status_text = "❌ Выше нормы"
-                status_color = 'red'
-            
-            target_range = f"{acid_pred.target_min:.1f}-{acid_pred.target_max:.1f}%"
-            
-            item_id = self.tree.insert('', 'end', values=(
-                acid_name,
-                f"{acid_pred.predicted_value:.2f}%",
-                target_range,
-                status_text
-            ))
-            
-            if not acid_pred.is_within_target:
-                self.tree.set(item_id, 'status', status_text)
\ No newline at end of file
+        return (
+            acid_name,
+            f"{acid_pred.predicted_value:.2f}%",
+            interval_text,
+            probability_text,
+            f"{acid_pred.target_min:.1f}-{acid_pred.target_max:.1f}%",
+            status_text,
+            drivers
+        )
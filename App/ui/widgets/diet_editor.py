@@ -1,109 +1,237 @@
 import tkinter as tk
 from tkinter import ttk
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from ...models.diet import Diet, DietComponent
 
+# Высота строки компонента, пикселей (по ней считается число видимых строк)
+ROW_HEIGHT = 28
+# Видимая высота списка компонентов, пикселей
+VIEWPORT_HEIGHT = 200
+
+
 class DietEditor:
+    """Редактор состава рациона с виртуализированным списком компонентов.
+
+    Виджеты строк создаются один раз (по числу видимых строк) и
+    переиспользуются: при смене рациона или прокрутке в них подставляются
+    другие компоненты, поэтому переключение не зависит от размера рациона.
+    """
+
     def __init__(self, parent, view):
         self.view = view
         self.current_diet = None
-        
+        self._names: List[str] = []
+        self._first = 0
+        # Введенные, но еще не примененные значения (не теряются при прокрутке)
+        self._pending: Dict[str, str] = {}
+        self._rows: List[Dict] = []
+        # Подстановка значений в строки не считается правкой пользователя
+        self._rendering = False
+
         self.frame = ttk.LabelFrame(parent, text="Редактор рациона", padding="10")
         self.frame.columnconfigure(1, weight=1)
-        
+
         self.create_widgets()
-        
+
     def create_widgets(self):
         """Создание виджетов редактора"""
         title_label = ttk.Label(self.frame, text="Состав рациона (кг)", font=('Arial', 10, 'bold'))
         title_label.grid(row=0, column=0, columnspan=3, sticky=tk.W, pady=(0, 10))
-        
+
         self.create_scrollable_components()
-        
+
         self.status_label = ttk.Label(self.frame, text="Рацион не загружен", foreground='gray')
         self.status_label.grid(row=2, column=0, columnspan=3, sticky=tk.W, pady=(10, 0))
-    
+
     def create_scrollable_components(self):
-        """Создает прокручиваемую область для компонентов"""
+        """Создает область строк с прокруткой по индексу компонента"""
         container = ttk.Frame(self.frame)
         container.grid(row=1, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
-        
+
         container.columnconfigure(0, weight=1)
         container.rowconfigure(0, weight=1)
-        
-        self.canvas = tk.Canvas(container, height=200)
-        scrollbar = ttk.Scrollbar(container, orient="vertical", command=self.canvas.yview)
-        self.scrollable_frame = ttk.Frame(self.canvas)
-        
-        self.scrollable_frame.bind(
-            "<Configure>",
-            lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all"))
-        )
-        
-        self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
-        self.canvas.configure(yscrollcommand=scrollbar.set)
-        
-        self.canvas.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
-        scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
-        
-        self.component_widgets = {}
-    
-    def load_diet(self, diet: Diet):
-        """Загружает рацион в редактор"""
-        self.current_diet = diet
-        self.status_label.config(text=f"Редактируется: {diet.name}")
-        
-        for widget in self.scrollable_frame.winfo_children():
-            widget.destroy()
-        self.component_widgets.clear()
-        
-        if not diet.components:
-            ttk.Label(self.scrollable_frame, text="Рацион пуст").grid(row=0, column=0, sticky=tk.W)
-            return
-        
-        sorted_components = sorted(diet.components.items(), key=lambda x: x[0])
-        
-        for i, (comp_name, component) in enumerate(sorted_components):
-            name_label = ttk.Label(self.scrollable_frame, text=comp_name)
-            name_label.grid(row=i, column=0, sticky=tk.W, padx=(0, 10), pady=2)
-            
-            amount_var = tk.DoubleVar(value=component.amount)
-            amount_entry = ttk.Entry(
-                self.scrollable_frame, 
-                textvariable=amount_var, 
-                width=10
-            )
-            amount_entry.grid(row=i, column=1, padx=(0, 10), pady=2)
-            
-            unit_label = ttk.Label(self.scrollable_frame, text="кг")
-            unit_label.grid(row=i, column=2, sticky=tk.W, pady=2)
-            
-            update_btn = ttk.Button(
-                self.scrollable_frame,
-                text="Обновить",
-                command=lambda name=comp_name, var=amount_var: self.update_component(name, var.get())
-            )
-            update_btn.grid(row=i, column=3, padx=(10, 0), pady=2)
-            
-            self.component_widgets[comp_name] = {
+
+        self.rows_frame = ttk.Frame(container, height=VIEWPORT_HEIGHT)
+        self.rows_frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.rows_frame.grid_propagate(False)
+        self.rows_frame.columnconfigure(0, weight=1)
+
+        self.scrollbar = ttk.Scrollbar(container, orient="vertical", command=self._on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+
+        self.empty_label = ttk.Label(self.rows_frame, text="Рацион пуст")
+
+        self.rows_frame.bind("<Configure>", self._on_resize)
+        self._bind_wheel(self.rows_frame)
+        self._ensure_rows(self._visible_count())
+
+    def _visible_count(self) -> int:
+        height = self.rows_frame.winfo_height()
+        if height <= 1:
+            height = VIEWPORT_HEIGHT
+        return max(1, height // ROW_HEIGHT)
+
+    def _ensure_rows(self, count: int):
+        """Досоздает строки пула до нужного количества (только при росте окна)"""
+        while len(self._rows) < count:
+            i = len(self._rows)
+            row_frame = ttk.Frame(self.rows_frame, height=ROW_HEIGHT)
+            row_frame.columnconfigure(0, weight=1)
+
+            name_label = ttk.Label(row_frame, anchor=tk.W)
+            name_label.grid(row=0, column=0, sticky=(tk.W, tk.E), padx=(0, 10), pady=2)
+
+            amount_var = tk.StringVar()
+            amount_entry = ttk.Entry(row_frame, textvariable=amount_var, width=10)
+            amount_entry.grid(row=0, column=1, padx=(0, 10), pady=2)
+            amount_entry.bind('<Return>', lambda e, i=i: self._apply_row(i))
+            amount_var.trace_add('write', lambda *_, i=i: self._on_row_edited(i))
+
+            unit_label = ttk.Label(row_frame, text="кг")
+            unit_label.grid(row=0, column=2, sticky=tk.W, pady=2)
+
+            update_btn = ttk.Button(row_frame, text="Обновить", command=lambda i=i: self._apply_row(i))
+            update_btn.grid(row=0, column=3, padx=(10, 0), pady=2)
+
+            for widget in (row_frame, name_label, amount_entry, unit_label, update_btn):
+                self._bind_wheel(widget)
+
+            self._rows.append({
+                'frame': row_frame,
                 'name_label': name_label,
                 'amount_var': amount_var,
                 'amount_entry': amount_entry,
                 'unit_label': unit_label,
-                'update_btn': update_btn
-            }
-        
-        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
-    
+                'update_btn': update_btn,
+                'name': None,
+                'shown': '',
+            })
+
+    def _bind_wheel(self, widget):
+        widget.bind('<MouseWheel>', lambda e: self._scroll_by(-1 if e.delta > 0 else 1))
+        widget.bind('<Button-4>', lambda e: self._scroll_by(-1))
+        widget.bind('<Button-5>', lambda e: self._scroll_by(1))
+
+    @property
+    def component_widgets(self) -> Dict[str, Dict]:
+        """Строки, отображающие компоненты сейчас (имя компонента -> виджеты)"""
+        return {row['name']: row for row in self._rows if row['name'] is not None}
+
+    def load_diet(self, diet: Diet):
+        """Загружает рацион в редактор: значения подставляются в готовые строки"""
+        if diet is not self.current_diet:
+            # Непримененные правки прежнего рациона отбрасываются
+            for row in self._rows:
+                row['shown'] = row['amount_var'].get()
+            self._pending.clear()
+            self._first = 0
+        self.current_diet = diet
+        self.status_label.config(text=f"Редактируется: {diet.name}", foreground='')
+        self._names = sorted(diet.components.keys())
+        self._render()
+
+    def _render(self):
+        """Заполняет видимые строки компонентами начиная с self._first"""
+        self._rendering = True
+        try:
+            self._fill_rows()
+        finally:
+            self._rendering = False
+
+    def _fill_rows(self):
+        self._remember_edits()
+        visible = min(len(self._rows), self._visible_count())
+        self._first = max(0, min(self._first, len(self._names) - visible))
+
+        if self.current_diet is not None and not self._names:
+            self.empty_label.grid(row=0, column=0, sticky=tk.W)
+        else:
+            self.empty_label.grid_remove()
+
+        for i, row in enumerate(self._rows):
+            index = self._first + i
+            if i >= visible or index >= len(self._names):
+                if row['name'] is not None:
+                    row['frame'].grid_remove()
+                    row['name'] = None
+                continue
+
+            name = self._names[index]
+            shown = self._pending.get(name, self._format_amount(self.current_diet.components[name].amount))
+            if row['name'] != name:
+                row['name_label'].config(text=name)
+                row['name'] = name
+                row['frame'].grid(row=i, column=0, sticky=(tk.W, tk.E))
+            if row['amount_var'].get() != shown:
+                row['amount_var'].set(shown)
+            row['shown'] = shown
+
+        self._update_scrollbar(visible)
+
+    def _remember_edits(self):
+        """Сохраняет введенные в строки значения перед подстановкой других компонентов"""
+        for row in self._rows:
+            if row['name'] is not None and row['amount_var'].get() != row['shown']:
+                self._pending[row['name']] = row['amount_var'].get()
+
+    @staticmethod
+    def _format_amount(amount: float) -> str:
+        return f"{amount:g}"
+
+    def _update_scrollbar(self, visible: int):
+        total = len(self._names)
+        if total <= visible:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self._first / total, (self._first + visible) / total)
+
+    def _scroll_to(self, first: int):
+        if first != self._first:
+            self._first = first
+            self._render()
+
+    def _scroll_by(self, rows: int):
+        self._scroll_to(max(0, self._first + rows))
+
+    def _on_scrollbar(self, *args):
+        """Команда полосы прокрутки: moveto доля | scroll n units/pages"""
+        visible = min(len(self._rows), self._visible_count())
+        if args[0] == 'moveto':
+            self._scroll_to(max(0, int(round(float(args[1]) * len(self._names)))))
+        elif args[0] == 'scroll':
+            step = int(args[1]) * (visible if args[2] == 'pages' else 1)
+            self._scroll_by(step)
+
+    def _on_resize(self, event):
+        self._ensure_rows(self._visible_count())
+        self._render()
+
+    def _on_row_edited(self, i: int):
+        """Ввод в поле количества: сообщаем представлению (живой прогноз с задержкой)"""
+        row = self._rows[i]
+        on_edit = getattr(self.view, 'on_component_edited', None)
+        if self._rendering or row['name'] is None or on_edit is None:
+            return
+        on_edit(row['name'], row['amount_var'].get())
+
+    def _apply_row(self, i: int):
+        row = self._rows[i]
+        if row['name'] is not None:
+            self.update_component(row['name'], row['amount_var'].get())
+
     def update_component(self, component_name: str, new_value: float):
         """Обновляет компонент рациона"""
         if self.current_diet:
             try:
-                new_value = float(new_value)
+                new_value = float(str(new_value).replace(',', '.'))
                 if new_value >= 0:
                     self.view.update_diet_component(component_name, new_value)
-                    self.status_label.config(text=f"Обновлено: {component_name} = {new_value} кг")
+                    self._pending.pop(component_name, None)
+                    for row in self._rows:
+                        if row['name'] == component_name:
+                            row['shown'] = row['amount_var'].get()
+                    self.status_label.config(text=f"Обновлено: {component_name} = {new_value} кг", foreground='')
                 else:
                     self.status_label.config(text="Ошибка: значение не может быть отрицательным", foreground='red')
             except ValueError:
-                self.status_label.config(text="Ошибка: введите числовое значение", foreground='red')
\ No newline at end of file
+                self.status_label.config(text="Ошибка: введите числовое значение", foreground='red')
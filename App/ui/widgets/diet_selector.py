@@ -0,0 +1,101 @@
+import tkinter as tk
+from tkinter import ttk
+from typing import List
+
+from ...services.diet_index import DietIndex, MAX_MATCHES
+
+# Строк в списке совпадений
+LIST_HEIGHT = 6
+
+
+class DietSelector:
+    """Выбор рациона с поиском по мере ввода (ID, название, файл).
+
+    В списке показываются только лучшие MAX_MATCHES совпадений из
+    DietIndex, поэтому размер списка не зависит от числа рационов.
+    """
+
+    def __init__(self, parent, view, index: DietIndex):
+        self.view = view
+        self.index = index
+        self._positions: List[int] = []
+
+        self.frame = ttk.LabelFrame(parent, text="Выбор рациона", padding="10")
+        self.frame.columnconfigure(1, weight=1)
+
+        self.query_var = tk.StringVar()
+        self.create_widgets()
+
+    def create_widgets(self):
+        """Создание виджетов выбора"""
+        ttk.Label(self.frame, text="Поиск рациона:").grid(row=0, column=0, sticky=tk.W, padx=(0, 10))
+
+        self.query_entry = ttk.Entry(self.frame, textvariable=self.query_var)
+        self.query_entry.grid(row=0, column=1, sticky=(tk.W, tk.E))
+        self.query_entry.bind('<Return>', lambda e: self._select_row(0))
+        self.query_entry.bind('<Down>', self._focus_list)
+        self.query_var.trace_add('write', lambda *_: self.refresh())
+
+        self.count_label = ttk.Label(self.frame, text="", foreground='gray')
+        self.count_label.grid(row=0, column=2, sticky=tk.E, padx=(10, 0))
+
+        list_frame = ttk.Frame(self.frame)
+        list_frame.grid(row=1, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(5, 0))
+        list_frame.columnconfigure(0, weight=1)
+
+        self.listbox = tk.Listbox(list_frame, height=LIST_HEIGHT, exportselection=False, activestyle='dotbox')
+        self.listbox.grid(row=0, column=0, sticky=(tk.W, tk.E))
+        self.listbox.bind('<<ListboxSelect>>', self._on_list_select)
+        self.listbox.bind('<Return>', self._on_list_select)
+
+        scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.listbox.yview)
+        scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.listbox.configure(yscrollcommand=scrollbar.set)
+
+    def refresh(self):
+        """Пересчитывает совпадения для текущего запроса"""
+        total, self._positions = self.index.search(self.query_var.get(), MAX_MATCHES)
+        self.listbox.delete(0, tk.END)
+        for position in self._positions:
+            self.listbox.insert(tk.END, self._label(position))
+
+        if not len(self.index):
+            self.count_label.config(text="Рационы не загружены")
+        elif total > len(self._positions):
+            self.count_label.config(text=f"Найдено: {total}, показаны первые {len(self._positions)}")
+        else:
+            self.count_label.config(text=f"Найдено: {total}")
+        self.show_current()
+
+    def _label(self, position: int) -> str:
+        diet = self.index.diets[position]
+        source = self.index.sources[position]
+        label = f"{diet.name}  [{diet.diet_id}]"
+        return f"{label}  · {source}" if source and source not in diet.name else label
+
+    def show_current(self):
+        """Выделяет текущий рацион представления, если он среди совпадений"""
+        self.listbox.selection_clear(0, tk.END)
+        current = self.view.current_diet
+        position = self.index.position(current) if current is not None else None
+        if position is not None and position in self._positions:
+            row = self._positions.index(position)
+            self.listbox.selection_set(row)
+            self.listbox.see(row)
+
+    def _focus_list(self, event):
+        if self._positions:
+            self.listbox.focus_set()
+            self.listbox.activate(0)
+        return 'break'
+
+    def _on_list_select(self, event):
+        selection = self.listbox.curselection()
+        if selection:
+            self._select_row(selection[0])
+
+    def _select_row(self, row: int):
+        if 0 <= row < len(self._positions):
+            diet = self.index.diets[self._positions[row]]
+            if diet is not self.view.current_diet:
+                self.view.select_diet(diet)
@@ -1,6 +1,23 @@
+import os
+
+
 class AppConfig:
     """Конфигурация приложения"""
     
+    # Каталог с локальными данными приложения (хранилище рационов и прогнозов)
+    DATA_DIR = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data'
+    )
+    DIET_STORE_PATH = os.path.join(DATA_DIR, 'diet_store.sqlite3')
+    # Состояние онлайн-дообучения
+    ONLINE_STATE_PATH = os.path.join(DATA_DIR, 'online_learner.npz')
+    # Реестр версий моделей (папки версий с манифестом и указатель CURRENT)
+    MODEL_REGISTRY_DIR = os.path.join(DATA_DIR, 'model_registry')
+    # История замеров памяти по этапам (режим COWDIET_MEMORY_PROFILE=1)
+    MEMORY_PROFILE_LOG = os.path.join(DATA_DIR, 'memory_profile.jsonl')
+    # Готовые PNG графиков по стаду (ключ - хеш входных данных)
+    CHART_CACHE_DIR = os.path.join(DATA_DIR, 'chart_cache')
+    
     # Основные кислоты для анализа
     MAIN_ACIDS = ['Лауриновая', 'Пальмитиновая', 'Стеариновая', 'Олеиновая']
     
@@ -39,6 +56,19 @@ class AppConfig:
         'тритикале', 'соевая оболочка', 'фуражи', 'концентраты', 'пивные дрожжи сухие'
     ]
     
+    # Признаки линейных моделей (порядок важен)
+    MODEL_FEATURES = [
+        'трав_сен', 'конц_зерн', 'масличн', 'жир', 'пром_отх',
+        'мин_техно', 'сп', 'крахмал', 'andfom', 'сахар (вру)',
+        'нву', 'ожк', 'k'
+    ]
+
+    # Признаки-группы ингредиентов (первые 6 признаков модели)
+    INGREDIENT_FEATURES = MODEL_FEATURES[:6]
+
+    # Признаки-нутриенты (% СВ рациона), рассчитываются по библиотеке кормов
+    NUTRIENT_FEATURES = MODEL_FEATURES[6:]
+
     NUTRITION_INDICATORS = [
         'протеин', 'жир', 'клетчатка', 'зола', 'кальций', 
         'фосфор', 'энергия'
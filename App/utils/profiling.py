@@ -0,0 +1,169 @@
+# utils/profiling.py
+import contextlib
+import json
+import os
+import threading
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Включение профилирования памяти без правки кода: COWDIET_MEMORY_PROFILE=1
+ENV_FLAG = 'COWDIET_MEMORY_PROFILE'
+
+
+@dataclass
+class AllocationSite:
+    """Место выделения памяти и прирост за этап"""
+    location: str
+    size_bytes: int
+    count: int
+
+
+@dataclass
+class StageMemory:
+    """Память одного этапа конвейера"""
+    stage: str
+    items: Optional[int]
+    peak_bytes: int
+    retained_bytes: int
+    top_sites: List[AllocationSite] = field(default_factory=list)
+
+    @property
+    def retained_per_10k(self) -> Optional[float]:
+        """Удерживаемые байты в пересчете на 10 тыс. рационов"""
+        if not self.items:
+            return None
+        return self.retained_bytes * 10_000 / self.items
+
+
+class MemoryProfiler:
+    """Учет памяти по этапам на основе снимков tracemalloc.
+
+    Выключен по умолчанию - stage() тогда ничего не делает. Во включенном
+    режиме для каждого этапа фиксируются пик (относительно начала этапа),
+    удержанный после этапа объем и главные места выделений. Вложенные
+    этапы допускаются: пик внешнего этапа учитывает пики внутренних.
+
+    Счетчики tracemalloc общие для процесса (reset_peak сбрасывает пик
+    всем потокам), поэтому этапы замеряются только в одном потоке за раз:
+    пока у потока есть открытый этап, этапы других потоков выполняются
+    без замера и считаются в skipped. Выделения других потоков во время
+    этапа попадают в его пик - точные цифры дает последовательный прогон
+    (benchmark).
+    """
+
+    def __init__(self, enabled: bool = False, top_n: int = 10, frames: int = 5):
+        self.enabled = enabled
+        self.top_n = top_n
+        self.frames = frames
+        self.stages: List[StageMemory] = []
+        # Этапы, пропущенные из-за замера в другом потоке: имя -> число
+        self.skipped: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._owner: Optional[int] = None
+        self._stack: List[Dict] = []
+
+    def _acquire(self, name: str) -> bool:
+        """Закрепляет замеры за текущим потоком; False - замеры уже идут в другом потоке"""
+        thread = threading.get_ident()
+        with self._lock:
+            if self._owner is None:
+                self._owner = thread
+            if self._owner == thread:
+                return True
+            self.skipped[name] = self.skipped.get(name, 0) + 1
+            return False
+
+    @classmethod
+    def from_env(cls) -> 'MemoryProfiler':
+        return cls(enabled=os.environ.get(ENV_FLAG, '').lower() in ('1', 'true', 'yes'))
+
+    def _filtered(self, snapshot: tracemalloc.Snapshot) -> tracemalloc.Snapshot:
+        return snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ))
+
+    @contextlib.contextmanager
+    def stage(self, name: str, items: Optional[int] = None):
+        """Замеряет память блока кода; items - число рационов для пересчета на 10 тыс."""
+        if not self.enabled or not self._acquire(name):
+            yield
+            return
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        current, peak = tracemalloc.get_traced_memory()
+        if self._stack:
+            outer = self._stack[-1]
+            outer['peak'] = max(outer['peak'], peak)
+        # Снимок берется до отсчета, чтобы его собственный объем не попал в этап
+        before = self._filtered(tracemalloc.take_snapshot())
+        tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0]
+        entry = {'start': start, 'peak': start, 'before': before, 'overhead': start - current}
+        self._stack.append(entry)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            current, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, entry['peak'])
+            after = self._filtered(tracemalloc.take_snapshot())
+            top_sites = [
+                AllocationSite(str(stat.traceback[0]), stat.size_diff, stat.count_diff)
+                for stat in after.compare_to(entry['before'], 'lineno')[:self.top_n]
+                if stat.size_diff > 0
+            ]
+            self.stages.append(StageMemory(name, items, peak - entry['start'],
+                                           current - entry['start'], top_sites))
+            if self._stack:
+                self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak - entry['overhead'])
+            # Снимки этого этапа не должны попасть в пик внешнего
+            del after, entry['before']
+            tracemalloc.reset_peak()
+            if not self._stack:
+                with self._lock:
+                    self._owner = None
+
+    def last(self, name: Optional[str] = None) -> Optional[StageMemory]:
+        """Последний замер (этапа с указанным именем)"""
+        for stage in reversed(self.stages):
+            if name is None or stage.stage == name:
+                return stage
+        return None
+
+    def report(self) -> List[Dict]:
+        rows = []
+        for stage in self.stages:
+            row = asdict(stage)
+            row['retained_per_10k'] = stage.retained_per_10k
+            rows.append(row)
+        return rows
+
+    def print_report(self):
+        """Выводит таблицу этапов и главные места выделений"""
+        if not self.stages:
+            return
+        print("\n🧠 ПАМЯТЬ ПО ЭТАПАМ:")
+        for stage in self.stages:
+            per_10k = f", {stage.retained_per_10k / 2 ** 20:.1f} МБ на 10 тыс." if stage.retained_per_10k else ""
+            print(f"   {stage.stage}: пик {stage.peak_bytes / 2 ** 20:.2f} МБ, "
+                  f"удержано {stage.retained_bytes / 2 ** 20:.2f} МБ{per_10k}")
+            for site in stage.top_sites[:3]:
+                print(f"      {site.size_bytes / 1024:8.1f} КБ  {site.location}")
+        if self.skipped:
+            skipped = ', '.join(f"{name} x{count}" for name, count in self.skipped.items())
+            print(f"   без замера (шли параллельно с замеряемым этапом): {skipped}")
+
+    def save(self, file_path: str):
+        """Дописывает отчет строкой JSON, чтобы отслеживать расход памяти во времени"""
+        os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+        record = {'timestamp': datetime.now().isoformat(timespec='seconds'), 'stages': self.report()}
+        with open(file_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+# Общий профилировщик процесса; включается переменной окружения
+memory_profiler = MemoryProfiler.from_env()
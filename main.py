@@ -9,6 +9,8 @@ warnings.filterwarnings("ignore", category=DeprecationWarning)
 import tkinter as tk
 from app.application import CowDietApp
 from app.ui.main_window import MainWindow
+from app.utils.config import AppConfig
+from app.utils.profiling import memory_profiler
 
 def main():
     """Точка входа в приложение"""
@@ -21,6 +23,10 @@ def main():
         
         root.mainloop()
         
+        if memory_profiler.enabled:
+            memory_profiler.print_report()
+            memory_profiler.save(AppConfig.MEMORY_PROFILE_LOG)
+        
     except Exception as e:
         print(f"Критическая ошибка при запуске приложения: {e}")
         input("Нажмите Enter для выхода...")
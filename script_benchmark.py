@@ -0,0 +1,44 @@
+import argparse
+import json
+import os
+from datetime import datetime
+
+from app.benchmark import DEFAULT_SIZES, STARTUP_RUNS, BenchmarkSuite, compare_reports, measure_startup, save_report
+from app.utils.config import AppConfig
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замер производительности парсера, признаков, прогнозов и интерфейса")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help="Количества рационов")
+    parser.add_argument('--source', default='rations.csv', help="Рационы для генерации данных")
+    parser.add_argument('--output', help="JSON с результатами (по умолчанию data/benchmarks/<время>.json)")
+    parser.add_argument('--compare', help="JSON предыдущего прогона для поиска регрессий")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Допустимое падение пропускной способности")
+    parser.add_argument('--no-memory', action='store_true', help="Не замерять пиковую память")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--startup', action='store_true', help="Замерить время запуска приложения")
+    parser.add_argument('--startup-runs', type=int, default=STARTUP_RUNS, help="Запусков для медианы")
+    args = parser.parse_args()
+
+    suite = BenchmarkSuite(args.sizes, seed=args.seed, source_csv=args.source,
+                           measure_memory=not args.no_memory)
+    report = suite.run()
+    if args.startup:
+        report['startup'] = measure_startup(args.startup_runs)
+
+    output = args.output or os.path.join(
+        AppConfig.DATA_DIR, 'benchmarks', datetime.now().strftime('benchmark_%Y%m%d_%H%M%S.json')
+    )
+    save_report(report, output)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print("\n📈 Сравнение с базовым прогоном:")
+        for row in compare_reports(baseline, report, args.tolerance):
+            mark = "❌ регрессия" if row['regression'] else "✅"
+            print(f"   {row['stage']:<22} {row['size']:>9}  x{row['ratio']:.2f}  {mark}")
+
+
+if __name__ == "__main__":
+    main()
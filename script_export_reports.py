@@ -0,0 +1,33 @@
+import argparse
+import os
+import time
+from itertools import chain
+
+from app.core import export_reports, load_diets
+from app.services.report_exporter import EXPORT_FORMATS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Выгрузка отчетов по рационам и стаду (CSV, Excel, PDF)")
+    parser.add_argument('files', nargs='+', help="CSV/Excel/PDF файлы с рационами")
+    parser.add_argument('--output-dir', default='reports', help="Каталог для отчетов")
+    parser.add_argument('--formats', nargs='+', choices=EXPORT_FORMATS, default=list(EXPORT_FORMATS),
+                        help="Форматы отчетов")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Процессов для PDF")
+    parser.add_argument('--no-recommendations', action='store_true', help="Не включать рекомендации")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    # Файлы читаются по одному: в памяти не больше одного файла рационов
+    diets = chain.from_iterable(load_diets(path) for path in args.files)
+    written = export_reports(diets, args.output_dir, args.formats, workers=args.workers,
+                             recommendations=not args.no_recommendations)
+
+    elapsed = time.perf_counter() - started
+    for fmt, paths in written.items():
+        print(f"📄 {fmt}: {len(paths)} файлов")
+    print(f"✅ Готово за {elapsed:.2f} с -> {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
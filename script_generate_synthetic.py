@@ -0,0 +1,24 @@
+import argparse
+import os
+
+from app.services.synthetic import SyntheticRationGenerator
+from app.utils.config import AppConfig
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Генерация синтетических рационов с кислотами для нагрузочных тестов")
+    parser.add_argument('--source', default='rations.csv', help="Рационы, задающие эмпирическое распределение")
+    parser.add_argument('--output', default=os.path.join(AppConfig.DATA_DIR, 'synthetic_rations.csv'), help="Файл результата (.csv или .parquet)")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="Количество рационов")
+    parser.add_argument('--chunk-size', type=int, default=100_000, help="Рационов в одной порции")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--noise', type=float, default=0.05,
+                        help="СКО шума кислот в долях ширины целевого диапазона")
+    args = parser.parse_args()
+
+    generator = SyntheticRationGenerator.from_csv(args.source, seed=args.seed, noise_scale=args.noise)
+    generator.write(args.output, args.rows, args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import argparse
+import csv
+import os
+import time
+
+from app.core import score_files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Параллельная оценка файлов с рационами (без интерфейса)")
+    parser.add_argument('files', nargs='+', help="CSV/Excel/PDF файлы с рационами")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Число процессов")
+    parser.add_argument('--output', default='scored_rations.csv', help="CSV с прогнозами кислот")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    scored = score_files(args.files, workers=args.workers)
+
+    rows = 0
+    with open(args.output, 'w', encoding='utf-8-sig', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['file', 'diet_id', 'model_version'] + (scored[0].acids if scored else []))
+        for result in scored:
+            for diet_id, values in zip(result.diet_ids, result.values):
+                writer.writerow([os.path.basename(result.file_path), diet_id, result.model_version]
+                                + [f"{value:.4f}" for value in values])
+                rows += 1
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ Оценено рационов: {rows} из {len(scored)} файлов за {elapsed:.2f} с -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
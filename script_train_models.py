@@ -0,0 +1,53 @@
+import argparse
+import os
+
+import numpy as np
+
+from app.services.model_registry import ModelRegistry
+from app.services.model_selection import RidgePathEvaluator
+from app.services.trainer import AcidModelTrainer, load_lab_training_data, load_training_data
+from app.utils.config import AppConfig
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Обучение линейных моделей жирных кислот на локальных CSV")
+    parser.add_argument('--data', default='rations_with_acids.csv',
+                        help="CSV с компонентами (или 13 признаками моделей) и колонками кислот")
+    parser.add_argument('--lab',
+                        help="CSV лабораторных анализов (название рациона + кислоты); тогда --recipes - рецепты")
+    parser.add_argument('--recipes', default='rations.csv',
+                        help="CSV рецептов рационов для сопоставления с --lab по названию")
+    parser.add_argument('--output', default=os.path.join(AppConfig.DATA_DIR, 'linear_models'),
+                        help="Папка для *_model.pkl и metrics.json")
+    parser.add_argument('--alpha', type=float, default=0.0, help="Коэффициент ridge-регуляризации (0 - МНК)")
+    parser.add_argument('--alphas', type=float, nargs='+',
+                        help="Путь alpha для выбора регуляризации по точной LOO-ошибке (вместо --alpha)")
+    parser.add_argument('--folds', type=int, default=5, help="Число фолдов кросс-валидации")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--publish', action='store_true',
+                        help="Зарегистрировать модели как новую текущую версию в реестре")
+    args = parser.parse_args()
+
+    if args.lab:
+        X, Y, acids = load_lab_training_data(args.recipes, args.lab)
+    else:
+        X, Y, acids = load_training_data(args.data)
+
+    alpha = args.alpha
+    if args.alphas:
+        complete = ~np.isnan(Y).any(axis=1)
+        evaluator = RidgePathEvaluator(X[complete], Y[complete])
+        for acid, table in evaluator.evaluate(acids, args.alphas).items():
+            print(f"\n{acid}\n{table.to_string(index=False)}")
+        alpha = float(evaluator.best_alpha(args.alphas))
+        print(f"\n🎯 Выбран alpha={alpha:g}")
+
+    trainer = AcidModelTrainer(alpha=alpha, n_folds=args.folds, random_state=args.seed)
+    result = trainer.train(X, Y, acids)
+    trainer.save(result, args.output)
+    if args.publish:
+        ModelRegistry().import_directory(args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import argparse
+import os
+
+from app.services.model_registry import ModelRegistry
+from app.services.online_learner import OnlineAcidLearner
+from app.services.trainer import load_training_data
+from app.utils.config import AppConfig
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Дообучение моделей кислот по новым лабораторным анализам")
+    parser.add_argument('data', help="CSV с новыми анализами: компоненты (или 13 признаков) и колонки кислот")
+    parser.add_argument('--state', default=AppConfig.ONLINE_STATE_PATH, help="Файл состояния дообучения (.npz)")
+    parser.add_argument('--registry', default=AppConfig.MODEL_REGISTRY_DIR,
+                        help="Папка реестра версий моделей")
+    parser.add_argument('--alpha', type=float, default=0.0,
+                        help="Коэффициент ridge-регуляризации (только для нового состояния)")
+    parser.add_argument('--seed-data', default='rations_with_acids.csv',
+                        help="Обучающая выборка, которой засевается новое состояние (как в script_train_models.py)")
+    parser.add_argument('--no-publish', action='store_true', help="Только обновить состояние")
+    args = parser.parse_args()
+
+    X, Y, acids = load_training_data(args.data)
+
+    learner = OnlineAcidLearner.load_state(args.state)
+    if learner is None:
+        print(f"ℹ️ Состояние не найдено, создается новое: {args.state}")
+        learner = OnlineAcidLearner(list(AppConfig.TARGET_LIMITS), alpha=args.alpha)
+        # Без засева первая публикация решала бы МНК по нескольким анализам
+        if args.seed_data and os.path.exists(args.seed_data):
+            seed_X, seed_Y, seed_acids = load_training_data(args.seed_data)
+            print(f"🌱 Состояние засеяно обучающей выборкой: {learner.partial_fit(seed_X, seed_Y, seed_acids)} строк")
+        else:
+            print("⚠️ Обучающая выборка для засева не найдена: кислоты с малым числом анализов "
+                  "останутся из текущей версии моделей")
+
+    added = learner.partial_fit(X, Y, acids)
+    learner.save_state(args.state)
+    print(f"✅ Учтено анализов: {added}")
+
+    if not args.no_publish:
+        try:
+            learner.publish(ModelRegistry(args.registry))
+        except ValueError as e:
+            print(f"❌ Версия не опубликована: {e}")
+
+
+if __name__ == "__main__":
+    main()
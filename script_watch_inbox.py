@@ -0,0 +1,32 @@
+import argparse
+
+from app.services.diet_store import DietStore
+from app.services.inbox_watcher import InboxWatcher
+from app.utils.config import AppConfig
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Отслеживание папки с рационами и их автоматическая оценка")
+    parser.add_argument('inbox', help="Папка, куда складываются PDF/Excel/CSV рационы")
+    parser.add_argument('--interval', type=float, default=0.25, help="Период опроса папки, с")
+    parser.add_argument('--store', default=AppConfig.DIET_STORE_PATH, help="Файл базы с результатами (SQLite)")
+    parser.add_argument('--once', action='store_true', help="Обработать текущие файлы и выйти")
+    args = parser.parse_args()
+
+    watcher = InboxWatcher(args.inbox, results_store=DietStore(args.store), poll_interval=args.interval)
+
+    if args.once:
+        # Два прохода: файл считается готовым, если не менялся между ними
+        watcher.scan()
+        processed = watcher.poll_once()
+        print(f"📊 Оценено рационов: {processed}")
+        return
+
+    try:
+        watcher.run_forever()
+    except KeyboardInterrupt:
+        watcher.stop()
+
+
+if __name__ == "__main__":
+    main()